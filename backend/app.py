@@ -1,12 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import user_router, family_router, family_member_router, health_router, auth_router, auth_new_router
+from core.crypto_executor import shutdown_crypto_executor
+from core.database import init_supabase_client, close_supabase_client
+from core.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from services.token_service import sync_revocations_forever
+from core.jobs import get_job_runner
+from routers import user_router, family_router, family_member_router, health_router, auth_router, auth_new_router, well_known_router, job_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start up and tear down per-worker resources"""
+    await init_supabase_client()
+    revocation_sync = asyncio.create_task(sync_revocations_forever())
+    yield
+    revocation_sync.cancel()
+    await get_job_runner().shutdown()
+    shutdown_crypto_executor()
+    await close_supabase_client()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="ApnaParivar Backend",
     description="A secure, multi-tenant family tree platform",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -16,15 +37,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination metadata on member lists
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
 # Include routers
 app.include_router(health_router.router)
+app.include_router(well_known_router.router)
 app.include_router(auth_new_router.router)  # New auth system
 app.include_router(auth_router.router)  # Legacy auth (can be deprecated)
 app.include_router(user_router.router)
 app.include_router(family_router.router)
 app.include_router(family_member_router.router)
+app.include_router(job_router.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,200 @@
+"""
+Auth user lookup benchmark
+
+Usage:
+    python -m core.auth_lookup_bench
+    python -m core.auth_lookup_bench --users 100000 --lookups 200 --rtt-ms 20 --output lookup.json
+
+Compares resolving an auth user by email with a single list_users() call
+(the old behaviour), paging through list_users(), the indexed
+auth_user_id_by_email() RPC and the per-worker cache, against synthetic
+auth users behind a simulated network round trip. With --database, the
+RPC is also timed against the local Postgres on DATABASE_URL (after the
+sql/ scripts have been loaded), seeding the synthetic users into auth.users.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from core.crypto_bench import _percentile
+from services import auth_identity_service
+from services.auth_identity_service import LIST_USERS_PAGE_SIZE, AuthIdentityService
+
+
+class _User:
+    __slots__ = ("id", "email")
+
+    def __init__(self, user_id: str, email: str):
+        self.id = user_id
+        self.email = email
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SimulatedSupabase:
+    """In-memory auth admin API and RPC with a fixed round-trip time per call"""
+
+    def __init__(self, users: list, rtt_seconds: float):
+        self.users = users
+        self.by_email = {user.email: user.id for user in users}
+        self.rtt_seconds = rtt_seconds
+        self.calls = 0
+        self.auth = self
+        self.admin = self
+
+    async def list_users(self, page: int = 1, per_page: int = 50):
+        self.calls += 1
+        await asyncio.sleep(self.rtt_seconds)
+        start = (page - 1) * per_page
+        return self.users[start:start + per_page]
+
+    def rpc(self, function: str, params: dict):
+        client = self
+
+        class _Call:
+            async def execute(self):
+                client.calls += 1
+                await asyncio.sleep(client.rtt_seconds)
+                return _Response(client.by_email.get(params["p_email"]))
+
+        return _Call()
+
+
+def _synthetic_users(count: int) -> list:
+    return [_User(str(uuid.uuid4()), f"user{i}@example.com") for i in range(count)]
+
+
+def _summarize(latencies: list, found: int, calls: int) -> dict:
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "lookups": len(latencies_ms),
+        "found_ratio": round(found / len(latencies_ms), 4),
+        "calls_per_lookup": round(calls / len(latencies_ms), 2),
+        "p50_ms": round(_percentile(latencies_ms, 50), 3),
+        "p99_ms": round(_percentile(latencies_ms, 99), 3),
+        "mean_ms": round(statistics.mean(latencies_ms), 3),
+    }
+
+
+async def _bench(lookup, emails: list, client: _SimulatedSupabase) -> dict:
+    client.calls = 0
+    latencies, found = [], 0
+    for email in emails:
+        started = time.perf_counter()
+        if await lookup(email):
+            found += 1
+        latencies.append(time.perf_counter() - started)
+    return _summarize(latencies, found, client.calls)
+
+
+async def bench_simulated(users: int, lookups: int, rtt_ms: float) -> dict:
+    population = _synthetic_users(users)
+    client = _SimulatedSupabase(population, rtt_ms / 1000)
+    emails = [random.choice(population).email for _ in range(lookups)]
+    service = AuthIdentityService(client)
+
+    async def single_page(email):
+        # What create_onboarding_request used to do: one list_users() call, default page
+        for user in await client.list_users():
+            if user.email == email:
+                return user.id
+        return None
+
+    async def paginated(email):
+        return await service._scan(email)
+
+    async def indexed(email):
+        auth_identity_service._lookup_rpc_missing = False
+        return await service._lookup(email)
+
+    async def cached(email):
+        return await service.get_user_id_by_email(email)
+
+    auth_identity_service.auth_user_id_cache.clear()
+    # Warm the cache with every email the cached run will look up
+    for email in set(emails):
+        await cached(email)
+
+    # Paging through 100k users at a realistic RTT takes seconds per lookup; sample fewer
+    scan_emails = emails[:max(1, min(lookups, 5))]
+    return {
+        "single_list_users_call": await _bench(single_page, emails, client),
+        "paginated_list_users": await _bench(paginated, scan_emails, client),
+        "indexed_rpc": await _bench(indexed, emails, client),
+        "cached": await _bench(cached, emails, client),
+    }
+
+
+async def bench_database(users: int, lookups: int) -> dict:
+    """Seed auth.users on the local Postgres and time auth_user_id_by_email()"""
+    import asyncpg
+    from core.config import DATABASE_URL
+
+    connection = await asyncpg.connect(DATABASE_URL)
+    try:
+        marker = f"bench-{uuid.uuid4().hex[:8]}"
+        await connection.execute(
+            "INSERT INTO auth.users (id, email) "
+            "SELECT gen_random_uuid(), $1 || '-' || g || '@example.com' FROM generate_series(1, $2) g",
+            marker, users
+        )
+        emails = [f"{marker}-{random.randint(1, users)}@example.com" for _ in range(lookups)]
+        statement = await connection.prepare("SELECT auth_user_id_by_email($1)")
+        latencies, found = [], 0
+        for email in emails:
+            started = time.perf_counter()
+            if await statement.fetchval(email):
+                found += 1
+            latencies.append(time.perf_counter() - started)
+        await connection.execute("DELETE FROM auth.users WHERE email LIKE $1", f"{marker}-%")
+        return _summarize(latencies, found, lookups)
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark auth user lookup by email")
+    parser.add_argument("--users", type=int, default=100000, help="Synthetic auth users")
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups per strategy")
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="Simulated round trip per API call")
+    parser.add_argument("--database", action="store_true", help="Also time the RPC on DATABASE_URL")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "users": args.users,
+        "page_size": LIST_USERS_PAGE_SIZE,
+        "rtt_ms": args.rtt_ms,
+        "simulated": asyncio.run(bench_simulated(args.users, args.lookups, args.rtt_ms)),
+    }
+    if args.database:
+        results["database_rpc"] = asyncio.run(bench_database(args.users, args.lookups))
+
+    print(f"Auth user lookup, {args.users} users, {args.rtt_ms} ms per call")
+    for name, stats in results["simulated"].items():
+        print(
+            f"  {name:24s} found {stats['found_ratio']:>6.1%}  calls {stats['calls_per_lookup']:>7}  "
+            f"p50 {stats['p50_ms']:>10} ms  p99 {stats['p99_ms']:>10} ms"
+        )
+    if "database_rpc" in results:
+        stats = results["database_rpc"]
+        print(f"  {'database_rpc':24s} found {stats['found_ratio']:>6.1%}  p50 {stats['p50_ms']} ms  p99 {stats['p99_ms']} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
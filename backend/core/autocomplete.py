@@ -0,0 +1,310 @@
+"""
+In-memory member name autocomplete
+Each indexed family keeps its members' names in sorted arrays (whole names
+and single words, searched by bisection for prefixes) plus trigram postings
+(for matches inside a word), so a keystroke is answered from memory instead
+of a database round trip. Families are indexed on first use and evicted
+least recently used. Member writes in this worker patch the index in place;
+entries expire after ttl_seconds so writes made by other workers show up.
+"""
+
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from core.text_search import words
+
+_EMPTY = frozenset()
+_MAX_CHAR = chr(0x10FFFF)
+
+# Larger write batches drop the family's index instead of patching it: each
+# re-indexed name shifts the sorted lists, costing O(members) per member
+_PATCH_LIMIT = 64
+
+
+def _grams(word: str) -> set:
+    # Words under three characters are their own key, so every word is reachable
+    if len(word) < 3:
+        return {word}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _prefixed(entries: list, prefix: str):
+    """(key, member id) entries of a sorted list whose key starts with prefix"""
+    i = bisect.bisect_left(entries, (prefix,))
+    while i < len(entries) and entries[i][0].startswith(prefix):
+        yield entries[i]
+        i += 1
+
+
+class FamilyNameIndex:
+    """
+    Name index of one family's members
+
+    Whole names and words are kept as sorted (key, member id) lists; trigrams
+    (or a shorter word itself) map to the distinct words containing them,
+    which stay far fewer than the members since names repeat.
+    """
+
+    def __init__(self, members: Iterable[dict]):
+        self.members = {}
+        self._lowered = {}
+        self._names = []
+        self._words = []
+        self._grams = {}
+        for member in members:
+            self._add(member, sort=False)
+        self._names.sort()
+        self._words.sort()
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _has_word(self, word: str) -> bool:
+        i = bisect.bisect_left(self._words, (word,))
+        return i < len(self._words) and self._words[i][0] == word
+
+    def _add(self, member: dict, sort: bool = True):
+        member_id = str(member["id"])
+        lowered = (member.get("name") or "").lower()
+        self.members[member_id] = member
+        self._lowered[member_id] = lowered
+        insert = bisect.insort if sort else list.append
+        insert(self._names, (lowered, member_id))
+        for word in set(words(lowered)):
+            for gram in _grams(word):
+                self._grams.setdefault(gram, set()).add(word)
+            insert(self._words, (word, member_id))
+
+    @staticmethod
+    def _delete(entries: list, entry: tuple):
+        i = bisect.bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def remove(self, member_id: str) -> bool:
+        if member_id not in self.members:
+            return False
+        del self.members[member_id]
+        lowered = self._lowered.pop(member_id)
+        self._delete(self._names, (lowered, member_id))
+        for word in set(words(lowered)):
+            self._delete(self._words, (word, member_id))
+            if self._has_word(word):
+                continue
+            # Last member with this word
+            for gram in _grams(word):
+                postings = self._grams.get(gram)
+                if postings is not None:
+                    postings.discard(word)
+                    if not postings:
+                        del self._grams[gram]
+        return True
+
+    def upsert(self, member: dict):
+        member_id = str(member["id"])
+        if (member.get("name") or "").lower() == self._lowered.get(member_id):
+            # Name unchanged: only the returned fields need replacing
+            self.members[member_id] = member
+            return
+        self.remove(member_id)
+        self._add(member)
+
+    def _word_range(self, prefix: str) -> int:
+        """How many (word, member) entries start with prefix"""
+        return (bisect.bisect_left(self._words, (prefix + _MAX_CHAR,))
+                - bisect.bisect_left(self._words, (prefix,)))
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        """
+        Members whose name contains every word of query, at most limit
+
+        Ordered: names starting with the query (alphabetically), then names
+        with a word starting with one of the query's words, then names where
+        that word occurs inside a word (both by the matching word). The query
+        word with the fewest prefix matches drives the word lookups.
+        """
+        query = " ".join(query.lower().split())
+        tokens = query.split()
+        if not tokens or limit < 1:
+            return []
+        found = []
+        seen = set()
+
+        def take(member_id: str) -> bool:
+            if member_id not in seen and all(token in self._lowered[member_id] for token in tokens):
+                seen.add(member_id)
+                found.append(member_id)
+            return len(found) >= limit
+
+        def result() -> List[dict]:
+            return [self.members[member_id] for member_id in found]
+
+        for _, member_id in _prefixed(self._names, query):
+            if take(member_id):
+                return result()
+
+        keys = [word for token in tokens for word in words(token)]
+        if not keys:
+            return result()
+        key = min(keys, key=lambda word: (self._word_range(word), -len(word)))
+        for _, member_id in _prefixed(self._words, key):
+            if take(member_id):
+                return result()
+
+        if len(key) >= 3:
+            postings = sorted((self._grams.get(gram, _EMPTY) for gram in _grams(key)), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            # Too short for a trigram: any word containing it has a key containing it
+            candidates = set().union(*(postings for gram, postings in self._grams.items() if key in gram))
+        for word in sorted(word for word in candidates if key in word):
+            if word.startswith(key):
+                continue
+            for _, member_id in _prefixed(self._words, word):
+                if _ != word:
+                    break
+                if take(member_id):
+                    return result()
+        return result()
+
+
+class MemberAutocomplete:
+    """Per-worker FamilyNameIndex per family, LRU by family and bounded by members indexed"""
+
+    def __init__(self, max_families: int, max_members: int, ttl_seconds: float):
+        self.max_families = max_families
+        self.max_members = max_members
+        self.ttl_seconds = ttl_seconds
+        self._families: "OrderedDict[str, Tuple[FamilyNameIndex, float]]" = OrderedDict()
+        self._building: dict = {}
+        # Families written to while their index was being built
+        self._stale: set = set()
+        self._members = 0
+
+        # Metrics
+        self.hits = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.evictions = 0
+        self.invalidations = 0
+        self.updates = 0
+
+    def _get(self, family_id: str) -> Optional[FamilyNameIndex]:
+        entry = self._families.get(family_id)
+        if entry is None:
+            return None
+        index, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._drop(family_id)
+            return None
+        self._families.move_to_end(family_id)
+        return index
+
+    def _drop(self, family_id: str) -> bool:
+        entry = self._families.pop(family_id, None)
+        if entry is None:
+            return False
+        self._members -= len(entry[0])
+        return True
+
+    def _store(self, family_id: str, index: FamilyNameIndex):
+        self._drop(family_id)
+        self._families[family_id] = (index, time.monotonic() + self.ttl_seconds)
+        self._members += len(index)
+        # Always keep the family just indexed, even if it alone is over budget
+        while len(self._families) > 1 and (
+            len(self._families) > self.max_families or self._members > self.max_members
+        ):
+            evicted, (evicted_index, _) = self._families.popitem(last=False)
+            self._members -= len(evicted_index)
+            self.evictions += 1
+
+    async def _build(self, family_id: str, loader: Callable[[], Awaitable[Iterable[dict]]]) -> FamilyNameIndex:
+        members = await loader()
+        started = time.perf_counter()
+        # Sorting a large family's names takes a while; keep it off the event loop
+        index = await asyncio.to_thread(FamilyNameIndex, members)
+        self.builds += 1
+        self.build_seconds += time.perf_counter() - started
+        if family_id in self._stale:
+            # A write landed mid-build and may be missing: answer this search, rebuild next time
+            self._stale.discard(family_id)
+        else:
+            self._store(family_id, index)
+        return index
+
+    async def index(self, family_id: str, loader: Callable[[], Awaitable[Iterable[dict]]]) -> FamilyNameIndex:
+        """The family's index, built with loader() once even for concurrent callers"""
+        index = self._get(family_id)
+        if index is not None:
+            self.hits += 1
+            return index
+        building = self._building.get(family_id)
+        if building is None:
+            building = asyncio.ensure_future(self._build(family_id, loader))
+            self._building[family_id] = building
+            building.add_done_callback(lambda _: self._building.pop(family_id, None))
+        return await asyncio.shield(building)
+
+    def _written(self, family_id: str) -> Optional[FamilyNameIndex]:
+        if family_id in self._building:
+            self._stale.add(family_id)
+        entry = self._families.get(family_id)
+        return entry[0] if entry else None
+
+    def upsert(self, family_id: str, members: List[dict]):
+        """Add or re-index members of an indexed family"""
+        family_id = str(family_id)
+        index = self._written(family_id)
+        if index is None or not members:
+            return
+        if len(members) > _PATCH_LIMIT:
+            self.invalidate(family_id)
+            return
+        self._members -= len(index)
+        for member in members:
+            index.upsert(member)
+        self._members += len(index)
+        self.updates += len(members)
+
+    def remove(self, family_id: Optional[str], member_ids: List[str]):
+        """Drop members; without family_id every indexed family is checked"""
+        family_ids = [str(family_id)] if family_id else list(self._families) + list(self._building)
+        for candidate in family_ids:
+            index = self._written(candidate)
+            if index is None:
+                continue
+            if len(member_ids) > _PATCH_LIMIT:
+                self.invalidate(candidate)
+                continue
+            for member_id in member_ids:
+                if index.remove(str(member_id)):
+                    self._members -= 1
+                    self.updates += 1
+
+    def invalidate(self, family_id: str):
+        """Forget a family's index, e.g. after a bulk import"""
+        family_id = str(family_id)
+        self._written(family_id)
+        if self._drop(family_id):
+            self.invalidations += 1
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.builds
+        return {
+            "families": len(self._families),
+            "max_families": self.max_families,
+            "members": self._members,
+            "max_members": self.max_members,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "builds": self.builds,
+            "build_seconds": round(self.build_seconds, 3),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "updates": self.updates,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -7,13 +7,40 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_CLIENT_MODE = os.getenv("SUPABASE_CLIENT_MODE", "async")  # async or sync
+
+# PostgREST HTTP pool (per worker, async client mode)
+POSTGREST_HTTP2 = os.getenv("POSTGREST_HTTP2", "True").lower() == "true"
+POSTGREST_MAX_CONNECTIONS = int(os.getenv("POSTGREST_MAX_CONNECTIONS", "20"))
+POSTGREST_MAX_KEEPALIVE = int(os.getenv("POSTGREST_MAX_KEEPALIVE", "10"))
+POSTGREST_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("POSTGREST_KEEPALIVE_EXPIRY_SECONDS", "30"))
+POSTGREST_CONNECT_TIMEOUT_SECONDS = float(os.getenv("POSTGREST_CONNECT_TIMEOUT_SECONDS", "5"))
+POSTGREST_READ_TIMEOUT_SECONDS = float(os.getenv("POSTGREST_READ_TIMEOUT_SECONDS", "30"))
+POSTGREST_POOL_TIMEOUT_SECONDS = float(os.getenv("POSTGREST_POOL_TIMEOUT_SECONDS", "5"))
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")  # supabase (PostgREST) or postgres (direct, DATABASE_URL)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))  # Prepared statements per connection
+DB_COMMAND_TIMEOUT_SECONDS = float(os.getenv("DB_COMMAND_TIMEOUT_SECONDS", "10"))
 
 # JWT Configuration
-JWT_ALGORITHM = "HS256"
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")  # HS256, EdDSA or ES256
 JWT_EXPIRATION_HOURS = 24
+# Short-lived: clients renew access tokens via /api/auth/refresh on a 401
+ACCESS_TOKEN_EXPIRATION_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRATION_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRATION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRATION_DAYS", "30"))
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+JWT_SIGNING_KEYS_DIR = os.getenv("JWT_SIGNING_KEYS_DIR")  # <kid>.pem private keys for EdDSA/ES256
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")  # Defaults to the last kid in sort order
+# Migration only: while switching from HS256 to EdDSA/ES256, also accept HS256
+# tokens signed with JWT_SECRET_KEY until JWT_LEGACY_HS256_UNTIL (ISO date or
+# datetime, UTC), which is required. Set it to the switch time plus the access
+# token lifetime, then turn this off: anyone with the shared secret can mint tokens.
+JWT_ACCEPT_LEGACY_HS256 = os.getenv("JWT_ACCEPT_LEGACY_HS256", "False").lower() == "true"
+JWT_LEGACY_HS256_UNTIL = os.getenv("JWT_LEGACY_HS256_UNTIL")
 
 # Application Configuration
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
@@ -27,3 +54,83 @@ SUPERADMIN_EMAIL = os.getenv("SUPERADMIN_EMAIL", "admin@apnaparivar.com")
 # Security
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 
+# Crypto Executor Configuration
+# CRYPTO_WORKERS defaults to the number of available CPU cores when unset,
+# CRYPTO_MAX_IN_FLIGHT (calls handed to the pool at once) to 4 per worker
+CRYPTO_WORKERS = int(os.getenv("CRYPTO_WORKERS", "0")) or None
+CRYPTO_MAX_IN_FLIGHT = int(os.getenv("CRYPTO_MAX_IN_FLIGHT", "0")) or None
+CRYPTO_EXECUTOR_MODE = os.getenv("CRYPTO_EXECUTOR_MODE", "process")  # process or thread
+
+# Crypto Admission Control (login load shedding)
+CRYPTO_ADMISSION_MAX_CONCURRENT = int(os.getenv("CRYPTO_ADMISSION_MAX_CONCURRENT", "0")) or CRYPTO_WORKERS or os.cpu_count() or 1
+CRYPTO_ADMISSION_MAX_QUEUE = int(os.getenv("CRYPTO_ADMISSION_MAX_QUEUE", "64"))
+CRYPTO_ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("CRYPTO_ADMISSION_MAX_WAIT_SECONDS", "2.0"))
+CRYPTO_ADMISSION_PER_IP_LIMIT = int(os.getenv("CRYPTO_ADMISSION_PER_IP_LIMIT", "4"))
+CRYPTO_ADMISSION_PER_FAMILY_LIMIT = int(os.getenv("CRYPTO_ADMISSION_PER_FAMILY_LIMIT", "16"))
+
+# Password Hashing (new hashes use these; older hashes are upgraded on login)
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2-sha256")  # pbkdf2-sha256 or scrypt
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "480000"))
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+SCRYPT_N = int(os.getenv("SCRYPT_N", "16384"))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+
+# Verified-token cache (per worker)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Family resolution cache (per worker)
+FAMILY_CACHE_SIZE = int(os.getenv("FAMILY_CACHE_SIZE", "1024"))
+FAMILY_CACHE_TTL_SECONDS = float(os.getenv("FAMILY_CACHE_TTL_SECONDS", "30"))
+
+# Auth user lookup cache (per worker, email -> auth user ID)
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "300"))
+
+# Family member list pagination
+MEMBER_PAGE_DEFAULT_LIMIT = int(os.getenv("MEMBER_PAGE_DEFAULT_LIMIT", "100"))
+MEMBER_PAGE_MAX_LIMIT = int(os.getenv("MEMBER_PAGE_MAX_LIMIT", "500"))
+
+# PostgREST max-rows (1000 on Supabase unless raised): longer responses are cut
+# to this many rows without an error
+POSTGREST_MAX_ROWS = int(os.getenv("POSTGREST_MAX_ROWS", "1000"))
+
+# Family member export (rows fetched per keyset page while streaming); kept
+# under POSTGREST_MAX_ROWS so a page and its look-ahead row come back in one response
+EXPORT_PAGE_SIZE = min(int(os.getenv("EXPORT_PAGE_SIZE", "999")), POSTGREST_MAX_ROWS - 1)
+
+# Family member import (rows per insert, concurrent inserts, reported errors, longest
+# record, largest upload spooled to disk for a background import)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_CONCURRENCY = int(os.getenv("IMPORT_MAX_CONCURRENCY", "4"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+IMPORT_MAX_RECORD_BYTES = int(os.getenv("IMPORT_MAX_RECORD_BYTES", "65536"))
+IMPORT_MAX_UPLOAD_BYTES = int(os.getenv("IMPORT_MAX_UPLOAD_BYTES", "104857600"))
+
+# Background jobs (per worker)
+JOB_STORE = os.getenv("JOB_STORE", "database")  # database (jobs table) or memory
+# Concurrent jobs per type, e.g. "member_import=2,admin_approval=4"; other types use JOB_DEFAULT_CONCURRENCY
+JOB_CONCURRENCY = os.getenv("JOB_CONCURRENCY", "member_import=2,admin_approval=4")
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "2"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2"))
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "60"))
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("JOB_PROGRESS_INTERVAL_SECONDS", "1"))
+# Finished jobs kept by the memory store
+JOB_MEMORY_RETENTION = int(os.getenv("JOB_MEMORY_RETENTION", "1000"))
+
+# Family member bulk update/delete (IDs per request, concurrent update statements)
+MEMBER_BULK_MAX_IDS = int(os.getenv("MEMBER_BULK_MAX_IDS", "500"))
+MEMBER_BULK_MAX_CONCURRENCY = int(os.getenv("MEMBER_BULK_MAX_CONCURRENCY", "4"))
+
+# Family member search (results per request, and the trigram similarity a fuzzy match needs)
+MEMBER_SEARCH_DEFAULT_LIMIT = int(os.getenv("MEMBER_SEARCH_DEFAULT_LIMIT", "20"))
+MEMBER_SEARCH_MAX_LIMIT = int(os.getenv("MEMBER_SEARCH_MAX_LIMIT", "100"))
+MEMBER_SEARCH_MIN_SIMILARITY = float(os.getenv("MEMBER_SEARCH_MIN_SIMILARITY", "0.3"))
+
+# Family member autocomplete (per-worker in-memory name index; LRU by family,
+# bounded by families and by members indexed; TTL picks up other workers' writes)
+MEMBER_AUTOCOMPLETE_MAX_FAMILIES = int(os.getenv("MEMBER_AUTOCOMPLETE_MAX_FAMILIES", "256"))
+MEMBER_AUTOCOMPLETE_MAX_MEMBERS = int(os.getenv("MEMBER_AUTOCOMPLETE_MAX_MEMBERS", "200000"))
+MEMBER_AUTOCOMPLETE_TTL_SECONDS = float(os.getenv("MEMBER_AUTOCOMPLETE_TTL_SECONDS", "300"))
+MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT = int(os.getenv("MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT", "10"))
+MEMBER_AUTOCOMPLETE_MAX_LIMIT = int(os.getenv("MEMBER_AUTOCOMPLETE_MAX_LIMIT", "50"))
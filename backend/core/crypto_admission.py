@@ -0,0 +1,210 @@
+"""
+Admission control for password key derivations
+Caps how many PBKDF2 verifications run at once, queues the rest fairly
+per family / client IP, and sheds load quickly when saturated
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from core.config import (
+    CRYPTO_ADMISSION_MAX_CONCURRENT,
+    CRYPTO_ADMISSION_MAX_QUEUE,
+    CRYPTO_ADMISSION_MAX_WAIT_SECONDS,
+    CRYPTO_ADMISSION_PER_FAMILY_LIMIT,
+    CRYPTO_ADMISSION_PER_IP_LIMIT,
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted to the crypto pool"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class CryptoAdmissionController:
+    """
+    Global concurrency cap with per-family round-robin queues
+
+    Waiters are grouped by family (or by IP when no family is known) and
+    slots are handed out round-robin across groups, so one family under a
+    login storm cannot starve everybody else. Per-IP and per-family caps
+    on outstanding requests return 429; a full queue or a wait longer than
+    max_wait_seconds returns 503.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_wait_seconds: float,
+        per_ip_limit: int,
+        per_family_limit: int,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.per_ip_limit = per_ip_limit
+        self.per_family_limit = per_family_limit
+
+        self._active = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._queued = 0
+        self._outstanding_by_ip: dict = {}
+        self._outstanding_by_family: dict = {}
+
+        # Metrics
+        self.admitted = 0
+        self.rejected_rate_limited = 0
+        self.rejected_overloaded = 0
+        self.timed_out = 0
+        self._avg_hold_seconds = 0.0
+
+    def _retry_after(self) -> int:
+        """Rough estimate of seconds until a slot frees up"""
+        backlog = self._queued + 1
+        hold = self._avg_hold_seconds or 0.25
+        return max(1, math.ceil(backlog * hold / max(1, self.max_concurrent)))
+
+    def _reject(self, status_code: int, detail: str) -> AdmissionRejected:
+        if status_code == 429:
+            self.rejected_rate_limited += 1
+        else:
+            self.rejected_overloaded += 1
+        return AdmissionRejected(status_code, detail, self._retry_after())
+
+    @staticmethod
+    def _inc(counter: dict, key: Optional[str]):
+        if key:
+            counter[key] = counter.get(key, 0) + 1
+
+    @staticmethod
+    def _dec(counter: dict, key: Optional[str]):
+        if key:
+            remaining = counter.get(key, 0) - 1
+            if remaining > 0:
+                counter[key] = remaining
+            else:
+                counter.pop(key, None)
+
+    def _wake_next(self):
+        """Hand a free slot to the next waiter, rotating across queue keys"""
+        while self._queues and self._active < self.max_concurrent:
+            key, waiters = next(iter(self._queues.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+    def _abandon(self, future: asyncio.Future, queue_key: str, client_ip: Optional[str], family_key: Optional[str]):
+        """Clean up after a waiter that gave up before using its slot"""
+        self._dec(self._outstanding_by_ip, client_ip)
+        self._dec(self._outstanding_by_family, family_key)
+        if future.done() and not future.cancelled():
+            # Slot was granted just as we gave up; pass it on
+            self._release(0.0)
+            return
+        future.cancel()
+        waiters = self._queues.get(queue_key)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[queue_key]
+
+    def _release(self, held_seconds: float):
+        self._active -= 1
+        self._avg_hold_seconds = 0.9 * self._avg_hold_seconds + 0.1 * held_seconds if self._avg_hold_seconds else held_seconds
+        self._wake_next()
+
+    @asynccontextmanager
+    async def admit(self, client_ip: Optional[str] = None, family_key: Optional[str] = None):
+        """
+        Hold a crypto slot for the duration of the block
+
+        Raises:
+            AdmissionRejected: 429 when the IP or family is over its limit,
+                503 when the queue is full or the wait exceeds the maximum
+        """
+        if client_ip and self._outstanding_by_ip.get(client_ip, 0) >= self.per_ip_limit:
+            raise self._reject(429, "Too many concurrent login attempts from this client")
+        if family_key and self._outstanding_by_family.get(family_key, 0) >= self.per_family_limit:
+            raise self._reject(429, "Too many concurrent login attempts for this family")
+
+        if self._active >= self.max_concurrent or self._queued:
+            if self._queued >= self.max_queue:
+                raise self._reject(503, "Login service is busy, please retry shortly")
+
+            queue_key = f"family:{family_key}" if family_key else f"ip:{client_ip}"
+            future = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(queue_key, deque()).append(future)
+            self._queued += 1
+
+            self._inc(self._outstanding_by_ip, client_ip)
+            self._inc(self._outstanding_by_family, family_key)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait_seconds)
+            except asyncio.TimeoutError:
+                self._abandon(future, queue_key, client_ip, family_key)
+                self.timed_out += 1
+                raise self._reject(503, "Login service is busy, please retry shortly")
+            except asyncio.CancelledError:
+                self._abandon(future, queue_key, client_ip, family_key)
+                raise
+        else:
+            self._active += 1
+            self._inc(self._outstanding_by_ip, client_ip)
+            self._inc(self._outstanding_by_family, family_key)
+
+        self.admitted += 1
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._dec(self._outstanding_by_ip, client_ip)
+            self._dec(self._outstanding_by_family, family_key)
+            self._release(time.perf_counter() - started_at)
+
+    def metrics(self) -> dict:
+        """Snapshot of admission state and counters"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self._active,
+            "queued": self._queued,
+            "queue_keys": len(self._queues),
+            "admitted": self.admitted,
+            "rejected_rate_limited": self.rejected_rate_limited,
+            "rejected_overloaded": self.rejected_overloaded,
+            "timed_out": self.timed_out,
+            "avg_hold_ms": round(self._avg_hold_seconds * 1000, 3),
+        }
+
+
+_admission_controller: CryptoAdmissionController = None
+
+
+def get_admission_controller() -> CryptoAdmissionController:
+    """Get or create the shared admission controller"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = CryptoAdmissionController(
+            max_concurrent=CRYPTO_ADMISSION_MAX_CONCURRENT,
+            max_queue=CRYPTO_ADMISSION_MAX_QUEUE,
+            max_wait_seconds=CRYPTO_ADMISSION_MAX_WAIT_SECONDS,
+            per_ip_limit=CRYPTO_ADMISSION_PER_IP_LIMIT,
+            per_family_limit=CRYPTO_ADMISSION_PER_FAMILY_LIMIT,
+        )
+    return _admission_controller
@@ -0,0 +1,192 @@
+"""
+KDF cost calibration and crypto micro-benchmarks
+
+Usage:
+    python -m core.crypto_bench
+    python -m core.crypto_bench --workers 8 --samples 20 --target-ms 250 --output bench.json
+
+Benchmarks EncryptionService / PasswordHashingService operations
+single-threaded and at 1..N parallel worker processes, prints throughput
+and p50/p99 latency, and recommends PBKDF2 iterations or scrypt
+parameters for a target verify latency.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import secrets
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from core.encryption import EncryptionService, PasswordHashingService
+
+SAMPLE_PASSWORD = "BenchmarkPassword123"
+SAMPLE_FAMILY_PASSWORD = "fam-pass"
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _operations() -> dict:
+    """Name -> (function, args) for every benchmarked operation"""
+    stored_hash = PasswordHashingService.hash_password(SAMPLE_PASSWORD)
+    encrypted = EncryptionService.encrypt(SAMPLE_FAMILY_PASSWORD, SAMPLE_PASSWORD)
+    return {
+        "derive_key": (EncryptionService.derive_key, (SAMPLE_PASSWORD, secrets.token_bytes(16))),
+        "hash_password": (PasswordHashingService.hash_password, (SAMPLE_PASSWORD,)),
+        "verify_password": (PasswordHashingService.verify_password, (SAMPLE_PASSWORD, stored_hash)),
+        "encrypt": (EncryptionService.encrypt, (SAMPLE_FAMILY_PASSWORD, SAMPLE_PASSWORD)),
+        "decrypt": (EncryptionService.decrypt, (encrypted, SAMPLE_PASSWORD)),
+    }
+
+
+def _timed_call(func, args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def _summarize(latencies: list, wall_seconds: float) -> dict:
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "samples": len(latencies_ms),
+        "throughput_per_sec": round(len(latencies_ms) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": round(_percentile(latencies_ms, 50), 3),
+        "p99_ms": round(_percentile(latencies_ms, 99), 3),
+        "mean_ms": round(statistics.mean(latencies_ms), 3),
+    }
+
+
+def bench_single(func, args, samples: int) -> dict:
+    """Run an operation serially in this process"""
+    started = time.perf_counter()
+    latencies = [_timed_call(func, args) for _ in range(samples)]
+    return _summarize(latencies, time.perf_counter() - started)
+
+
+def bench_parallel(func, args, samples: int, workers: int) -> dict:
+    """Run samples-per-worker calls spread across a process pool"""
+    total = samples * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm the workers so process start-up is not measured
+        list(pool.map(_timed_call, [func] * workers, [args] * workers))
+        started = time.perf_counter()
+        latencies = list(pool.map(_timed_call, [func] * total, [args] * total))
+        wall = time.perf_counter() - started
+    return _summarize(latencies, wall)
+
+
+def recommend_pbkdf2_iterations(target_ms: float, probe_iterations: int = 100000) -> dict:
+    """Scale a probe derivation to the iteration count that fits target_ms"""
+    salt = secrets.token_bytes(16)
+    probes = []
+    for _ in range(3):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", SAMPLE_PASSWORD.encode(), salt, probe_iterations, 32)
+        probes.append(time.perf_counter() - started)
+    per_iteration_ms = min(probes) * 1000 / probe_iterations
+    iterations = int(target_ms / per_iteration_ms) // 10000 * 10000
+    return {
+        "algorithm": PasswordHashingService.PBKDF2,
+        "iterations": max(iterations, 10000),
+        "estimated_ms": round(max(iterations, 10000) * per_iteration_ms, 3),
+    }
+
+
+def recommend_scrypt_params(target_ms: float, r: int = 8, p: int = 1) -> dict:
+    """Pick the largest power-of-two N whose derivation fits target_ms"""
+    salt = secrets.token_bytes(16)
+    best = None
+    for log_n in range(12, 21):
+        n = 2 ** log_n
+        started = time.perf_counter()
+        hashlib.scrypt(
+            SAMPLE_PASSWORD.encode(),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * n * r * p + 1024 * 1024,
+            dklen=32,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > target_ms:
+            break
+        best = {"algorithm": PasswordHashingService.SCRYPT, "n": n, "r": r, "p": p, "estimated_ms": round(elapsed_ms, 3)}
+    return best or {"algorithm": PasswordHashingService.SCRYPT, "n": 2 ** 12, "r": r, "p": p, "estimated_ms": None}
+
+
+def run(samples: int, max_workers: int, target_ms: float) -> dict:
+    """Run the full suite and return a JSON-serialisable result"""
+    operations = _operations()
+    results = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "encryption_iterations": EncryptionService.ITERATIONS,
+            "password_hash_params": PasswordHashingService._target_params(),
+        },
+        "single": {},
+        "parallel": {},
+    }
+
+    for name, (func, args) in operations.items():
+        results["single"][name] = bench_single(func, args, samples)
+        print(f"[single] {name:16s} {_format(results['single'][name])}")
+
+    for name, (func, args) in operations.items():
+        results["parallel"][name] = {}
+        for workers in range(1, max_workers + 1):
+            summary = bench_parallel(func, args, samples, workers)
+            results["parallel"][name][str(workers)] = summary
+            print(f"[x{workers:<3d}]  {name:16s} {_format(summary)}")
+
+    results["recommendation"] = {
+        "target_verify_ms": target_ms,
+        "pbkdf2": recommend_pbkdf2_iterations(target_ms),
+        "scrypt": recommend_scrypt_params(target_ms),
+    }
+    return results
+
+
+def _format(summary: dict) -> str:
+    return (
+        f"{summary['throughput_per_sec']:>9.2f} ops/s  "
+        f"p50 {summary['p50_ms']:>9.3f} ms  p99 {summary['p99_ms']:>9.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password KDFs and recommend cost parameters")
+    parser.add_argument("--samples", type=int, default=10, help="Calls per operation (per worker when parallel)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Highest parallel worker count to test")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target verify latency in milliseconds")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.samples, args.workers, args.target_ms)
+
+    recommendation = results["recommendation"]
+    print()
+    print(f"Recommended for ~{args.target_ms:.0f} ms verify latency:")
+    print(f"  PASSWORD_HASH_ALGORITHM=pbkdf2-sha256 PASSWORD_HASH_ITERATIONS={recommendation['pbkdf2']['iterations']}")
+    scrypt = recommendation["scrypt"]
+    print(f"  PASSWORD_HASH_ALGORITHM=scrypt SCRYPT_N={scrypt['n']} SCRYPT_R={scrypt['r']} SCRYPT_P={scrypt['p']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Async executor for CPU-heavy password cryptography
+Runs PBKDF2 work from core.encryption in a bounded process pool so
+login and registration handlers never block the event loop
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from core.config import CRYPTO_EXECUTOR_MODE, CRYPTO_MAX_IN_FLIGHT, CRYPTO_WORKERS
+from core.encryption import EncryptionService, PasswordHashingService
+
+
+class CryptoExecutor:
+    """Bounded worker pool for key derivations with queue and timing metrics"""
+
+    def __init__(self, workers: Optional[int] = None, max_in_flight: Optional[int] = None, mode: str = "process"):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.mode = mode
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Metrics
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crypto")
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._slots
+
+    async def run(self, func, *args):
+        """
+        Run a crypto function in the pool and await its result
+
+        At most max_in_flight calls are handed to the pool at once; further
+        callers wait here, which is what queue depth reports. This wait is
+        not bounded: login traffic is shed before it gets here by the
+        admission controller (core.crypto_admission).
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots()
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.running += 1
+        try:
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.total_run_seconds += elapsed
+            self.max_run_seconds = max(self.max_run_seconds, elapsed)
+            self.running -= 1
+            slots.release()
+
+    def metrics(self) -> dict:
+        """Snapshot of pool utilisation and timings"""
+        finished = self.completed + self.failed
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.waiting,
+            "in_flight": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 3) if finished else 0.0,
+            "avg_run_ms": round(self.total_run_seconds / finished * 1000, 3) if finished else 0.0,
+            "max_run_ms": round(self.max_run_seconds * 1000, 3),
+        }
+
+    def shutdown(self):
+        """Stop the worker pool (called on application shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._slots = None
+
+
+_crypto_executor: CryptoExecutor = None
+
+
+def get_crypto_executor() -> CryptoExecutor:
+    """Get or create the shared crypto executor"""
+    global _crypto_executor
+    if _crypto_executor is None:
+        _crypto_executor = CryptoExecutor(
+            workers=CRYPTO_WORKERS,
+            max_in_flight=CRYPTO_MAX_IN_FLIGHT,
+            mode=CRYPTO_EXECUTOR_MODE,
+        )
+    return _crypto_executor
+
+
+def shutdown_crypto_executor():
+    """Shut down the shared crypto executor if it was started"""
+    global _crypto_executor
+    if _crypto_executor is not None:
+        _crypto_executor.shutdown()
+        _crypto_executor = None
+
+
+async def hash_password_async(password: str) -> str:
+    """Awaitable PasswordHashingService.hash_password"""
+    return await get_crypto_executor().run(PasswordHashingService.hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Awaitable PasswordHashingService.verify_password"""
+    return await get_crypto_executor().run(PasswordHashingService.verify_password, password, hashed_password)
+
+
+async def encrypt_async(family_password: str, admin_password: str) -> str:
+    """Awaitable EncryptionService.encrypt"""
+    return await get_crypto_executor().run(EncryptionService.encrypt, family_password, admin_password)
+
+
+async def decrypt_async(encrypted_data_b64: str, admin_password: str) -> str:
+    """Awaitable EncryptionService.decrypt"""
+    return await get_crypto_executor().run(EncryptionService.decrypt, encrypted_data_b64, admin_password)
+
+
+async def envelope_encrypt_async(family_password: str, admin_password: str) -> tuple[str, str]:
+    """Awaitable EncryptionService.envelope_encrypt"""
+    return await get_crypto_executor().run(EncryptionService.envelope_encrypt, family_password, admin_password)
+
+
+async def envelope_decrypt_async(encrypted_payload_b64: str, wrapped_key_b64: str, admin_password: str) -> str:
+    """Awaitable EncryptionService.envelope_decrypt"""
+    return await get_crypto_executor().run(
+        EncryptionService.envelope_decrypt, encrypted_payload_b64, wrapped_key_b64, admin_password
+    )
+
+
+async def rewrap_data_keys_async(wrapped_keys_b64: list, old_password: str, new_password: str) -> list:
+    """Awaitable EncryptionService.rewrap_data_keys"""
+    return await get_crypto_executor().run(
+        EncryptionService.rewrap_data_keys, wrapped_keys_b64, old_password, new_password
+    )
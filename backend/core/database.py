@@ -1,11 +1,112 @@
-from supabase import create_client, Client
-from core.config import SUPABASE_URL, SUPABASE_KEY
+"""
+Supabase client setup
+In async mode (default) each worker uses the supabase AsyncClient, created
+on application startup, so concurrent requests overlap their PostgREST
+calls. Services go through execute()/call(), which accept either client:
+async builders are awaited directly, sync ones run in a worker thread.
+The async client's HTTP pool is configured in core/http_pool.py.
+
+With DATA_BACKEND=postgres, table queries go straight to Postgres over an
+asyncpg pool (see core/postgres.py) and only auth calls use Supabase.
+"""
+
+import asyncio
+import inspect
+from typing import Optional, Union
+import httpx
+from supabase import create_client, acreate_client, Client, AsyncClient, AsyncClientOptions
+from core.config import SUPABASE_URL, SUPABASE_KEY, SUPABASE_CLIENT_MODE, DATA_BACKEND
+from core.http_pool import create_http_client, http_pool_config
 
 _supabase_client: Client = None
+_async_supabase_client: AsyncClient = None
+_postgres_client = None
+_http_client: httpx.AsyncClient = None
+
+
+async def init_supabase_client() -> None:
+    """Create the per-worker async client and/or Postgres pool (called from the app lifespan)"""
+    global _async_supabase_client, _postgres_client, _http_client
+    if SUPABASE_CLIENT_MODE == "async" and _async_supabase_client is None and SUPABASE_URL:
+        _http_client = create_http_client()
+        _async_supabase_client = await acreate_client(
+            SUPABASE_URL, SUPABASE_KEY,
+            options=AsyncClientOptions(httpx_client=_http_client, postgrest_client_timeout=_http_client.timeout)
+        )
+    if DATA_BACKEND == "postgres" and _postgres_client is None:
+        from core.postgres import PostgresClient, create_pool
+        auth_client = _async_supabase_client
+        if auth_client is None and SUPABASE_URL:
+            auth_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        _postgres_client = PostgresClient(await create_pool(), auth_client)
+
+
+async def close_supabase_client() -> None:
+    """Drop the per-worker clients and close the Postgres pool (called on application shutdown)"""
+    global _async_supabase_client, _supabase_client, _postgres_client, _http_client
+    if _postgres_client is not None:
+        await _postgres_client.pool.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+    _postgres_client = None
+    _http_client = None
+    _async_supabase_client = None
+    _supabase_client = None
 
-def get_supabase_client() -> Client:
-    """Get or create Supabase client"""
+
+def get_supabase_client() -> Union[AsyncClient, Client]:
+    """Get the Postgres or async client if one has been started, otherwise the sync client"""
     global _supabase_client
+    if _postgres_client is not None:
+        return _postgres_client
+    if _async_supabase_client is not None:
+        return _async_supabase_client
     if _supabase_client is None:
         _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _supabase_client
+
+
+def http_pool_metrics() -> Optional[dict]:
+    """PostgREST connection pool metrics when the async client is active"""
+    if _http_client is None:
+        return None
+    return {**http_pool_config(), **_http_client._transport.metrics()}
+
+
+def database_metrics() -> Optional[dict]:
+    """Connection pool metrics when the direct Postgres backend is active"""
+    if _postgres_client is None:
+        return None
+    return _postgres_client.metrics()
+
+
+async def execute(query):
+    """Execute a PostgREST query built from either client without blocking the loop"""
+    if inspect.iscoroutinefunction(query.execute):
+        return await query.execute()
+    return await asyncio.to_thread(query.execute)
+
+
+def is_missing_function(error: Exception) -> bool:
+    """True if an rpc() failed because the database function isn't installed (PostgREST or asyncpg)"""
+    code = getattr(error, "code", None) or getattr(error, "sqlstate", None)
+    return code in ("PGRST202", "42883")
+
+
+def is_missing_table(error: Exception) -> bool:
+    """True if a query failed because the table doesn't exist (PostgREST or asyncpg)"""
+    code = getattr(error, "code", None) or getattr(error, "sqlstate", None)
+    return code in ("PGRST205", "42P01")
+
+
+def is_data_error(error: Exception) -> bool:
+    """True if a write was rejected for its data (SQLSTATE class 22 or 23, e.g. a unique violation)"""
+    code = str(getattr(error, "code", None) or getattr(error, "sqlstate", None) or "")
+    return code[:2] in ("22", "23")
+
+
+async def call(func, *args, **kwargs):
+    """Call a client method (e.g. supabase.auth.*) from either client without blocking the loop"""
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
@@ -1,8 +1,15 @@
 """
 Encryption utility for securing family passwords
 Uses PBKDF2 for key derivation and AES-256-GCM for encryption
+
+Family passwords use envelope encryption: a random per-family data key
+encrypts the payload, and that data key is wrapped with a key derived
+from the admin password. Rotating the admin password only rewraps the
+data key; the payload is never re-encrypted.
 """
 
+import hashlib
+import hmac
 import os
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -10,6 +17,15 @@ from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import secrets
 import base64
 
+from core.config import (
+    PASSWORD_HASH_ALGORITHM,
+    PASSWORD_HASH_ITERATIONS,
+    PASSWORD_SALT_LENGTH,
+    SCRYPT_N,
+    SCRYPT_R,
+    SCRYPT_P,
+)
+
 
 class EncryptionService:
     """Service for encrypting and decrypting family passwords"""
@@ -129,36 +145,250 @@ class EncryptionService:
         except Exception as e:
             raise Exception(f"Decryption failed: {str(e)}")
 
+    # ==================== ENVELOPE ENCRYPTION ====================
+
+    DATA_KEY_AAD = b"apnaparivar-family-data-key"
 
-class PasswordHashingService:
-    """Service for hashing passwords (for admin and family member login)"""
-    
     @staticmethod
-    def hash_password(password: str) -> str:
+    def _derive_kek(admin_password: str, salt: bytes) -> bytes:
+        """Derive the key-encryption key that wraps family data keys"""
+        key_b64, _ = EncryptionService.derive_key(admin_password, salt)
+        return base64.b64decode(key_b64.encode())
+
+    @staticmethod
+    def _wrap_with_kek(data_key: bytes, kek: bytes, salt: bytes) -> str:
+        nonce = secrets.token_bytes(EncryptionService.NONCE_LENGTH)
+        wrapped = AESGCM(kek).encrypt(nonce, data_key, EncryptionService.DATA_KEY_AAD)
+        return base64.b64encode(salt + nonce + wrapped).decode()
+
+    @staticmethod
+    def _split_wrapped(wrapped_key_b64: str) -> tuple[bytes, bytes, bytes]:
+        """Split a wrapped data key into (salt, nonce, wrapped_key)"""
+        data = base64.b64decode(wrapped_key_b64.encode())
+        salt_end = EncryptionService.SALT_LENGTH
+        nonce_end = salt_end + EncryptionService.NONCE_LENGTH
+        return data[:salt_end], data[salt_end:nonce_end], data[nonce_end:]
+
+    @staticmethod
+    def _unwrap_with_kek(wrapped_key_b64: str, kek: bytes) -> bytes:
+        _, nonce, wrapped = EncryptionService._split_wrapped(wrapped_key_b64)
+        return AESGCM(kek).decrypt(nonce, wrapped, EncryptionService.DATA_KEY_AAD)
+
+    @staticmethod
+    def wrap_data_key(data_key: bytes, admin_password: str) -> str:
         """
-        Hash password using PBKDF2 with random salt
+        Wrap a family data key with a key derived from the admin password
+        
+        Returns:
+            Wrapped key as base64 string in format: base64(salt + nonce + wrapped_key)
+        """
+        salt = secrets.token_bytes(EncryptionService.SALT_LENGTH)
+        kek = EncryptionService._derive_kek(admin_password, salt)
+        return EncryptionService._wrap_with_kek(data_key, kek, salt)
+
+    @staticmethod
+    def unwrap_data_key(wrapped_key_b64: str, admin_password: str) -> bytes:
+        """Recover a family data key using the admin password (one KDF)"""
+        salt, _, _ = EncryptionService._split_wrapped(wrapped_key_b64)
+        kek = EncryptionService._derive_kek(admin_password, salt)
+        return EncryptionService._unwrap_with_kek(wrapped_key_b64, kek)
+
+    @staticmethod
+    def envelope_encrypt(family_password: str, admin_password: str) -> tuple[str, str]:
+        """
+        Encrypt family password under a new random data key
         
         Args:
-            password: Plain text password
+            family_password: The family password to encrypt
+            admin_password: The admin's password (wraps the data key)
         
         Returns:
-            Hashed password as base64 string in format: base64(salt + hash)
+            Tuple of (encrypted_payload_b64, wrapped_data_key_b64); the
+            payload format is base64(nonce + ciphertext + tag)
         """
         try:
-            salt = secrets.token_bytes(16)
+            data_key = AESGCM.generate_key(bit_length=EncryptionService.KEY_LENGTH * 8)
+            nonce = secrets.token_bytes(EncryptionService.NONCE_LENGTH)
+            ciphertext = AESGCM(data_key).encrypt(nonce, family_password.encode(), None)
+            wrapped_key = EncryptionService.wrap_data_key(data_key, admin_password)
+            return base64.b64encode(nonce + ciphertext).decode(), wrapped_key
+        
+        except Exception as e:
+            raise Exception(f"Encryption failed: {str(e)}")
+
+    @staticmethod
+    def envelope_decrypt(encrypted_payload_b64: str, wrapped_key_b64: str, admin_password: str) -> str:
+        """
+        Decrypt family password: one KDF to unwrap the data key, then AES-GCM
+        
+        Args:
+            encrypted_payload_b64: Payload from envelope_encrypt
+            wrapped_key_b64: Wrapped data key from envelope_encrypt
+            admin_password: The admin's password
+        
+        Returns:
+            Decrypted family password
+        """
+        try:
+            data_key = EncryptionService.unwrap_data_key(wrapped_key_b64, admin_password)
+            data = base64.b64decode(encrypted_payload_b64.encode())
+            nonce = data[:EncryptionService.NONCE_LENGTH]
+            ciphertext = data[EncryptionService.NONCE_LENGTH:]
+            return AESGCM(data_key).decrypt(nonce, ciphertext, None).decode()
+        
+        except Exception as e:
+            raise Exception(f"Decryption failed: {str(e)}")
+
+    @staticmethod
+    def rewrap_data_keys(wrapped_keys_b64: list[str], old_password: str, new_password: str) -> list[str]:
+        """
+        Rewrap many data keys from an old admin password to a new one
+        
+        Derived keys are reused for data keys that share a salt, and all
+        rewrapped keys share one new salt, so rotating N families costs at
+        most (distinct old salts + 1) KDF runs and no payload re-encryption.
+        
+        Args:
+            wrapped_keys_b64: Wrapped data keys under old_password
+            old_password: Current admin password
+            new_password: New admin password
+        
+        Returns:
+            Wrapped data keys under new_password, in the same order
+        """
+        try:
+            new_salt = secrets.token_bytes(EncryptionService.SALT_LENGTH)
+            new_kek = EncryptionService._derive_kek(new_password, new_salt)
+            old_keks: dict[bytes, bytes] = {}
             
+            rewrapped = []
+            for wrapped_key_b64 in wrapped_keys_b64:
+                salt, _, _ = EncryptionService._split_wrapped(wrapped_key_b64)
+                if salt not in old_keks:
+                    old_keks[salt] = EncryptionService._derive_kek(old_password, salt)
+                data_key = EncryptionService._unwrap_with_kek(wrapped_key_b64, old_keks[salt])
+                rewrapped.append(EncryptionService._wrap_with_kek(data_key, new_kek, new_salt))
+            return rewrapped
+        
+        except Exception as e:
+            raise Exception(f"Key rewrap failed: {str(e)}")
+
+
+class PasswordHashingService:
+    """
+    Service for hashing passwords (for admin and family member login)
+
+    Hashes are stored in a self-describing format:
+        $pbkdf2-sha256$i=<iterations>,s=<salt_len>$<salt_b64>$<hash_b64>
+        $scrypt$n=<n>,r=<r>,p=<p>,s=<salt_len>$<salt_b64>$<hash_b64>
+
+    Legacy headerless base64(salt + hash) blobs (PBKDF2-SHA256, 480k
+    iterations, 16-byte salt) still verify and are reported by
+    needs_rehash() so they can be upgraded on the next successful login.
+    """
+
+    PBKDF2 = "pbkdf2-sha256"
+    SCRYPT = "scrypt"
+    HASH_LENGTH = 32
+
+    # Parameters of the original headerless format
+    LEGACY_ITERATIONS = 480000
+    LEGACY_SALT_LENGTH = 16
+
+    @staticmethod
+    def _target_params() -> dict:
+        """Parameters new hashes are created with (from configuration)"""
+        if PASSWORD_HASH_ALGORITHM == PasswordHashingService.SCRYPT:
+            return {
+                "algorithm": PasswordHashingService.SCRYPT,
+                "n": SCRYPT_N,
+                "r": SCRYPT_R,
+                "p": SCRYPT_P,
+                "s": PASSWORD_SALT_LENGTH,
+            }
+        return {
+            "algorithm": PasswordHashingService.PBKDF2,
+            "i": PASSWORD_HASH_ITERATIONS,
+            "s": PASSWORD_SALT_LENGTH,
+        }
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, params: dict) -> bytes:
+        if params["algorithm"] == PasswordHashingService.SCRYPT:
+            n, r, p = params["n"], params["r"], params["p"]
+            return hashlib.scrypt(
+                password.encode(),
+                salt=salt,
+                n=n,
+                r=r,
+                p=p,
+                maxmem=128 * n * r * p + 1024 * 1024,
+                dklen=PasswordHashingService.HASH_LENGTH,
+            )
+        if params["algorithm"] == PasswordHashingService.PBKDF2:
             kdf = PBKDF2HMAC(
                 algorithm=hashes.SHA256(),
-                length=32,
+                length=PasswordHashingService.HASH_LENGTH,
                 salt=salt,
-                iterations=480000,
+                iterations=params["i"],
             )
-            
-            hash_value = kdf.derive(password.encode())
-            
-            # Combine salt + hash and encode as base64
-            combined = salt + hash_value
-            return base64.b64encode(combined).decode()
+            return kdf.derive(password.encode())
+        raise ValueError(f"Unsupported password hash algorithm: {params['algorithm']}")
+
+    @staticmethod
+    def parse_hash(hashed_password: str) -> tuple[dict, bytes, bytes]:
+        """
+        Split a stored hash into its parameters, salt and hash value
+
+        Returns:
+            Tuple of (params, salt, hash_value)
+        """
+        if not hashed_password.startswith("$"):
+            combined = base64.b64decode(hashed_password.encode())
+            salt_length = PasswordHashingService.LEGACY_SALT_LENGTH
+            params = {
+                "algorithm": PasswordHashingService.PBKDF2,
+                "i": PasswordHashingService.LEGACY_ITERATIONS,
+                "s": salt_length,
+                "legacy": True,
+            }
+            return params, combined[:salt_length], combined[salt_length:]
+
+        _, algorithm, param_str, salt_b64, hash_b64 = hashed_password.split("$")
+        params = {"algorithm": algorithm}
+        for item in param_str.split(","):
+            key, value = item.split("=")
+            params[key] = int(value)
+        return params, base64.b64decode(salt_b64), base64.b64decode(hash_b64)
+
+    @staticmethod
+    def format_hash(params: dict, salt: bytes, hash_value: bytes) -> str:
+        """Encode parameters, salt and hash value into the stored format"""
+        keys = ("n", "r", "p", "s") if params["algorithm"] == PasswordHashingService.SCRYPT else ("i", "s")
+        param_str = ",".join(f"{key}={params[key]}" for key in keys)
+        return "${}${}${}${}".format(
+            params["algorithm"],
+            param_str,
+            base64.b64encode(salt).decode(),
+            base64.b64encode(hash_value).decode(),
+        )
+
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """
+        Hash password with the configured algorithm and a random salt
+        
+        Args:
+            password: Plain text password
+        
+        Returns:
+            Hashed password in the versioned format described above
+        """
+        try:
+            params = PasswordHashingService._target_params()
+            salt = secrets.token_bytes(params["s"])
+            hash_value = PasswordHashingService._derive(password, salt, params)
+            return PasswordHashingService.format_hash(params, salt, hash_value)
         
         except Exception as e:
             raise Exception(f"Password hashing failed: {str(e)}")
@@ -170,31 +400,35 @@ class PasswordHashingService:
         
         Args:
             password: Plain text password to verify
-            hashed_password: The stored hashed password (base64)
+            hashed_password: The stored hashed password (versioned or legacy)
         
         Returns:
             True if password matches, False otherwise
         """
         try:
-            # Decode base64
-            combined = base64.b64decode(hashed_password.encode())
-            
-            # Extract salt and stored hash
-            salt = combined[:16]
-            stored_hash = combined[16:]
-            
-            # Re-derive hash with the same salt
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=480000,
-            )
-            
-            hash_value = kdf.derive(password.encode())
-            
-            # Compare hashes
-            return hash_value == stored_hash
+            params, salt, stored_hash = PasswordHashingService.parse_hash(hashed_password)
+            hash_value = PasswordHashingService._derive(password, salt, params)
+            return hmac.compare_digest(hash_value, stored_hash)
         
         except Exception as e:
             raise Exception(f"Password verification failed: {str(e)}")
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """
+        Check whether a stored hash was made with outdated parameters
+
+        Args:
+            hashed_password: The stored hashed password
+
+        Returns:
+            True if the hash should be regenerated with the current settings
+        """
+        try:
+            params, _, _ = PasswordHashingService.parse_hash(hashed_password)
+        except Exception:
+            return False
+        if params.get("legacy"):
+            return True
+        target = PasswordHashingService._target_params()
+        return any(params.get(key) != value for key, value in target.items())
@@ -0,0 +1,238 @@
+"""
+Family member export benchmark
+
+Usage:
+    python -m core.export_bench
+    python -m core.export_bench --members 50000 --page-size 999 --rtt-ms 5 --output export.json
+
+Exports a synthetic family through MemberExportService (NDJSON and CSV,
+streamed page by page) and through the old list path (one query for every
+member, validated as List[FamilyMemberResponse], serialised as a single JSON
+array), against an in-memory table behind a simulated network round trip
+that, like PostgREST, returns at most max-rows rows per query. Reports time
+to first byte, total time, rows/s and peak Python memory, and fails if a
+streamed export comes back short.
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+
+from core.config import EXPORT_PAGE_SIZE, POSTGREST_MAX_ROWS
+from schemas.user import FamilyMemberResponse
+from services.member_export_service import MemberExportService
+
+FAMILY_ID = "00000000-0000-0000-0000-000000000001"
+_MAX_ID = "\U0010ffff"
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+        self.count = None
+
+
+class _Query:
+    """The subset of the PostgREST builder used by keyset pages over (name, id)"""
+
+    def __init__(self, table: "_SimulatedTable"):
+        self.table = table
+        self.columns: List[str] = []
+        self.filters: dict = {}
+        self.size = None
+
+    def select(self, columns: str, **kwargs):
+        self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def eq(self, column: str, value):
+        self.filters[("eq", column)] = value
+        return self
+
+    def gt(self, column: str, value):
+        self.filters[("gt", column)] = value
+        return self
+
+    def order(self, column: str, **kwargs):
+        return self
+
+    def limit(self, size: int):
+        self.size = size
+        return self
+
+    async def execute(self):
+        await self.table.round_trip()
+        keys, rows = self.table.keys, self.table.rows
+        if ("eq", "name") in self.filters:
+            name = self.filters[("eq", "name")]
+            start = bisect.bisect_right(keys, (name, self.filters[("gt", "id")]))
+            end = bisect.bisect_right(keys, (name, _MAX_ID))
+        elif ("gt", "name") in self.filters:
+            start, end = bisect.bisect_right(keys, (self.filters[("gt", "name")], _MAX_ID)), len(rows)
+        else:
+            start, end = 0, len(rows)
+        if self.size is not None:
+            end = min(end, start + self.size)
+        if self.table.max_rows is not None:
+            end = min(end, start + self.table.max_rows)
+        return _Response([{column: row[column] for column in self.columns} for row in rows[start:end]])
+
+
+class _SimulatedTable:
+    """One family's members, sorted by (name, id), with a fixed round trip and row cap per call"""
+
+    def __init__(self, rows: List[dict], rtt_seconds: float, max_rows: Optional[int] = POSTGREST_MAX_ROWS):
+        self.rows = sorted(rows, key=lambda row: (row["name"], row["id"]))
+        self.keys = [(row["name"], row["id"]) for row in self.rows]
+        self.rtt_seconds = rtt_seconds
+        self.max_rows = max_rows
+        self.calls = 0
+        self.field_keys = sorted({
+            f"{column}.{key}" for row in rows for column in ("relationships", "custom_fields") for key in row[column]
+        })
+
+    async def round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(self.rtt_seconds)
+
+    def table(self, name: str):
+        return _Query(self)
+
+    def rpc(self, function: str, params: dict):
+        table = self
+
+        class _Call:
+            async def execute(self):
+                await table.round_trip()
+                return _Response([{"field": key} for key in table.field_keys])
+
+        return _Call()
+
+
+def _synthetic_members(count: int) -> List[dict]:
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    members = []
+    for i in range(count):
+        timestamp = (created + timedelta(seconds=i)).isoformat()
+        members.append({
+            "id": str(uuid.uuid4()),
+            "family_id": FAMILY_ID,
+            "name": f"Member {i:06d}",
+            "photo_url": f"https://example.com/photos/{i}.jpg",
+            "relationships": {"father": f"Member {i // 2:06d}", "mother": "", "spouse": "", "email": f"m{i}@example.com"},
+            "custom_fields": {"Birthday": "1990-01-01", "City": "Pune", "Occupation": "Engineer"},
+            "created_at": timestamp,
+            "updated_at": timestamp,
+        })
+    return members
+
+
+async def _streamed(table: _SimulatedTable, export_format: str, page_size: int) -> dict:
+    service = MemberExportService(table, page_size=page_size)
+    started = time.perf_counter()
+    first_byte, size, lines = None, 0, 0
+    async for chunk in await service.export(FAMILY_ID, export_format):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+        lines += chunk.count(b"\n")
+    exported = lines - 1 if export_format == "csv" else lines
+    if exported != len(table.rows):
+        raise SystemExit(f"{export_format} export returned {exported} of {len(table.rows)} members")
+    return {"ttfb_s": first_byte, "total_s": time.perf_counter() - started, "bytes": size}
+
+
+async def _materialized(table: _SimulatedTable) -> dict:
+    """
+    The old path: every member in one response, validated and serialised as a whole
+
+    Measured as if max-rows were raised to fit the family; under the cap this
+    path only ever returned the first max-rows members.
+    """
+    started = time.perf_counter()
+    max_rows, table.max_rows = table.max_rows, None
+    try:
+        response = await table.table("family_members").select(
+            "id, family_id, name, photo_url, relationships, custom_fields, created_at, updated_at"
+        ).execute()
+    finally:
+        table.max_rows = max_rows
+    members = TypeAdapter(List[FamilyMemberResponse]).validate_python(response.data)
+    body = json.dumps([member.model_dump() for member in members]).encode()
+    elapsed = time.perf_counter() - started
+    return {"ttfb_s": elapsed, "total_s": elapsed, "bytes": len(body)}
+
+
+async def _measure(run, table: _SimulatedTable) -> dict:
+    table.calls = 0
+    stats = await run()
+    calls = table.calls
+
+    # Memory in a separate pass: tracing slows everything down
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = len(table.rows)
+    return {
+        "ttfb_ms": round(stats["ttfb_s"] * 1000, 1),
+        "total_ms": round(stats["total_s"] * 1000, 1),
+        "rows_per_s": round(rows / stats["total_s"]),
+        "bytes": stats["bytes"],
+        "calls": calls,
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+async def bench(members: int, page_size: int, rtt_ms: float, max_rows: int) -> dict:
+    table = _SimulatedTable(_synthetic_members(members), rtt_ms / 1000, max_rows)
+    return {
+        "stream_ndjson": await _measure(lambda: _streamed(table, "ndjson", page_size), table),
+        "stream_csv": await _measure(lambda: _streamed(table, "csv", page_size), table),
+        "materialized_json": await _measure(lambda: _materialized(table), table),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming family member export")
+    parser.add_argument("--members", type=int, default=50000, help="Members in the synthetic family")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE, help="Rows per keyset page")
+    parser.add_argument("--rtt-ms", type=float, default=5.0, help="Simulated round trip per query")
+    parser.add_argument("--max-rows", type=int, default=POSTGREST_MAX_ROWS, help="Rows returned per query at most")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "members": args.members,
+        "page_size": args.page_size,
+        "rtt_ms": args.rtt_ms,
+        "max_rows": args.max_rows,
+        "results": asyncio.run(bench(args.members, args.page_size, args.rtt_ms, args.max_rows)),
+    }
+
+    print(f"Member export, {args.members} members, {args.page_size} per page, {args.rtt_ms} ms per query")
+    for name, stats in results["results"].items():
+        print(
+            f"  {name:18s} ttfb {stats['ttfb_ms']:>9} ms  total {stats['total_ms']:>9} ms  "
+            f"{stats['rows_per_s']:>8} rows/s  {stats['bytes'] / 1024 / 1024:>7.1f} MB out  "
+            f"peak {stats['peak_memory_mb']:>7} MB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Per-worker HTTP connection pool for PostgREST (and Supabase auth) calls
+Replaces the supabase client's default httpx settings with configured pool
+limits, keep-alive, HTTP/2 and timeouts, and counts how connections are
+used so workers can be sized against the PostgREST connection limits.
+"""
+
+import time
+import weakref
+
+import httpx
+
+from core.config import (
+    POSTGREST_HTTP2, POSTGREST_MAX_CONNECTIONS, POSTGREST_MAX_KEEPALIVE,
+    POSTGREST_KEEPALIVE_EXPIRY_SECONDS, POSTGREST_CONNECT_TIMEOUT_SECONDS,
+    POSTGREST_READ_TIMEOUT_SECONDS, POSTGREST_POOL_TIMEOUT_SECONDS
+)
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that records request, timeout and connection-reuse counts"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._seen_connections: "weakref.WeakSet" = weakref.WeakSet()
+
+        # Metrics
+        self.requests = 0
+        self.in_flight = 0
+        self.connections_opened = 0
+        self.pool_timeouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        except httpx.TimeoutException:
+            self.timeouts += 1
+            raise
+        except httpx.TransportError:
+            self.errors += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_seconds += time.perf_counter() - started
+        self._track_connections()
+        return response
+
+    def _track_connections(self):
+        for connection in self._pool.connections:
+            if connection not in self._seen_connections:
+                self._seen_connections.add(connection)
+                self.connections_opened += 1
+
+    def metrics(self) -> dict:
+        connections = list(self._pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        # httpcore keeps queued requests on the pool; fall back to 0 if that changes
+        waiting = sum(1 for request in getattr(self._pool, "_requests", []) if request.is_queued())
+        return {
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "waiting": waiting,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reuse_ratio": round(1 - self.connections_opened / self.requests, 4) if self.requests else 0.0,
+            "pool_timeouts": self.pool_timeouts,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.requests * 1000, 2) if self.requests else 0.0,
+        }
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build the per-worker httpx client handed to the supabase AsyncClient"""
+    limits = httpx.Limits(
+        max_connections=POSTGREST_MAX_CONNECTIONS,
+        max_keepalive_connections=POSTGREST_MAX_KEEPALIVE,
+        keepalive_expiry=POSTGREST_KEEPALIVE_EXPIRY_SECONDS
+    )
+    timeout = httpx.Timeout(
+        connect=POSTGREST_CONNECT_TIMEOUT_SECONDS,
+        read=POSTGREST_READ_TIMEOUT_SECONDS,
+        write=POSTGREST_READ_TIMEOUT_SECONDS,
+        pool=POSTGREST_POOL_TIMEOUT_SECONDS
+    )
+    transport = InstrumentedTransport(http2=POSTGREST_HTTP2, limits=limits)
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=timeout,
+        follow_redirects=True
+    )
+
+
+def http_pool_config() -> dict:
+    """Configured limits, reported next to the live counters"""
+    return {
+        "http2": POSTGREST_HTTP2,
+        "max_connections": POSTGREST_MAX_CONNECTIONS,
+        "max_keepalive": POSTGREST_MAX_KEEPALIVE,
+        "keepalive_expiry_seconds": POSTGREST_KEEPALIVE_EXPIRY_SECONDS,
+        "connect_timeout_seconds": POSTGREST_CONNECT_TIMEOUT_SECONDS,
+        "read_timeout_seconds": POSTGREST_READ_TIMEOUT_SECONDS,
+        "pool_timeout_seconds": POSTGREST_POOL_TIMEOUT_SECONDS,
+    }
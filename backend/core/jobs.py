@@ -0,0 +1,410 @@
+"""
+In-process background jobs
+Long-running operations are submitted as jobs: the request gets a job ID back
+at once and the work runs in an asyncio task on the worker that accepted it,
+with a concurrency cap per job type, retries with exponential backoff,
+progress counters and cancellation. Job state lives in a JobStore: the jobs
+table (sql/jobs.sql), so any worker can answer GET /api/jobs/{id} and relay
+a cancellation, or memory for single-worker setups.
+
+Handlers are registered with @job_handler and receive (JobContext, payload).
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.config import (
+    JOB_CONCURRENCY,
+    JOB_DEFAULT_CONCURRENCY,
+    JOB_MEMORY_RETENTION,
+    JOB_PROGRESS_INTERVAL_SECONDS,
+    JOB_RETRY_BACKOFF_MAX_SECONDS,
+    JOB_RETRY_BACKOFF_SECONDS,
+    JOB_STORE,
+)
+from core.database import execute, get_supabase_client, is_missing_table
+from core.projections import projection
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parse_concurrency(value: str) -> Dict[str, int]:
+    """"member_import=2,admin_approval=4" -> {"member_import": 2, "admin_approval": 4}"""
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            job_type, limit = item.split("=", 1)
+            limits[job_type.strip()] = max(1, int(limit))
+    return limits
+
+
+# Job stores
+
+class MemoryJobStore:
+    """Jobs in this worker's memory; keeps the most recent finished jobs"""
+
+    def __init__(self, retention: int = JOB_MEMORY_RETENTION):
+        self.retention = retention
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+
+    async def create(self, job: dict) -> dict:
+        self._jobs[job["id"]] = dict(job)
+        finished = [job_id for job_id, row in self._jobs.items() if row["status"] in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
+        return dict(job)
+
+    async def update(self, job_id: str, changes: dict) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.update(changes, updated_at=_now())
+        return dict(job)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+
+class DatabaseJobStore:
+    """Jobs in the jobs table, shared by every worker"""
+
+    def _jobs(self):
+        return get_supabase_client().table("jobs")
+
+    async def create(self, job: dict) -> dict:
+        response = await execute(self._jobs().insert(job))
+        return response.data[0] if response.data else job
+
+    async def update(self, job_id: str, changes: dict) -> Optional[dict]:
+        response = await execute(self._jobs().update({**changes, "updated_at": _now()}).eq("id", job_id))
+        return response.data[0] if response.data else None
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        response = await execute(self._jobs().select(projection("jobs", "status")).eq("id", job_id))
+        return response.data[0] if response.data else None
+
+
+# Handlers
+
+class _JobType:
+    __slots__ = ("handler", "max_attempts", "retry_on", "cleanup")
+
+    def __init__(self, handler, max_attempts: int, retry_on: Callable[[Exception], bool], cleanup):
+        self.handler = handler
+        self.max_attempts = max_attempts
+        self.retry_on = retry_on
+        self.cleanup = cleanup
+
+
+_job_types: Dict[str, _JobType] = {}
+
+
+def _retryable(error: Exception) -> bool:
+    # ValueError means bad input: another attempt would fail the same way
+    return not isinstance(error, ValueError)
+
+
+def job_handler(
+    job_type: str,
+    max_attempts: int = 1,
+    retry_on: Callable[[Exception], bool] = _retryable,
+    cleanup: Optional[Callable[[Any], None]] = None,
+):
+    """
+    Register an async handler(context, payload) for a job type
+
+    Only make a job retryable (max_attempts > 1) if running it again after
+    a partial failure is safe. cleanup(payload) runs once the job is over
+    however it ended, including cancelled or shut down before the handler
+    ran; release what the payload holds (e.g. temp files) there, not in the
+    handler.
+    """
+    def register(handler: Callable[["JobContext", Any], Awaitable[Any]]):
+        _job_types[job_type] = _JobType(handler, max_attempts, retry_on, cleanup)
+        return handler
+    return register
+
+
+class JobContext:
+    """Passed to a handler to report progress and notice cancellation"""
+
+    def __init__(self, runner: "JobRunner", job_id: str, attempt: int):
+        self.runner = runner
+        self.job_id = job_id
+        self.attempt = attempt
+        self._last_write = 0.0
+        # Progress not written yet because of the interval
+        self.unsaved: dict = {}
+
+    async def progress(self, done: int, total: Optional[int] = None):
+        """
+        Record progress (persisted at most every JOB_PROGRESS_INTERVAL_SECONDS)
+
+        Raises:
+            JobCancelled: The job was cancelled from another worker
+        """
+        self.unsaved["progress_done"] = done
+        if total is not None:
+            self.unsaved["progress_total"] = total
+        now = time.monotonic()
+        if now - self._last_write < self.runner.progress_interval:
+            return
+        self._last_write = now
+        changes, self.unsaved = self.unsaved, {}
+        job = await self.runner._update(self.job_id, changes)
+        if job and job.get("cancel_requested"):
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Runs registered job types as asyncio tasks, capped per type"""
+
+    def __init__(
+        self,
+        store_kind: str,
+        concurrency: Dict[str, int],
+        default_concurrency: int,
+        backoff_seconds: float,
+        backoff_max_seconds: float,
+        progress_interval: float,
+    ):
+        self.store = DatabaseJobStore() if store_kind == "database" else MemoryJobStore()
+        self.concurrency = concurrency
+        self.default_concurrency = default_concurrency
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.progress_interval = progress_interval
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancelling: set = set()
+        self._contexts: Dict[str, JobContext] = {}
+        self._stats: Dict[str, dict] = {}
+
+    # Store access
+
+    async def _store_call(self, method: str, *args):
+        try:
+            return await getattr(self.store, method)(*args)
+        except Exception as e:
+            if not isinstance(self.store, DatabaseJobStore) or not is_missing_table(e):
+                raise
+            print("Warning: jobs table not found, keeping job state in worker memory")
+            self.store = MemoryJobStore()
+            return await getattr(self.store, method)(*args)
+
+    async def _update(self, job_id: str, changes: dict) -> Optional[dict]:
+        # Losing a status write must not kill the job itself
+        try:
+            return await self._store_call("update", job_id, changes)
+        except Exception as e:
+            print(f"Warning: could not record job {job_id} state: {str(e)}")
+            return None
+
+    def _semaphore(self, job_type: str) -> asyncio.Semaphore:
+        if job_type not in self._semaphores:
+            limit = self.concurrency.get(job_type, self.default_concurrency)
+            self._semaphores[job_type] = asyncio.Semaphore(limit)
+        return self._semaphores[job_type]
+
+    def _count(self, job_type: str, key: str, delta: int = 1):
+        stats = self._stats.setdefault(job_type, {
+            "submitted": 0, "queued": 0, "running": 0, "retries": 0,
+            "succeeded": 0, "failed": 0, "cancelled": 0,
+        })
+        stats[key] += delta
+
+    # Public API
+
+    async def submit(
+        self,
+        job_type: str,
+        payload: Any = None,
+        family_id: Optional[str] = None,
+        created_by: Optional[str] = None,
+        total: Optional[int] = None,
+    ) -> dict:
+        """
+        Record a queued job and start it in the background
+
+        The payload stays in this worker's memory (it is not persisted).
+
+        Raises:
+            ValueError: Unknown job type
+        """
+        if job_type not in _job_types:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = await self._store_call("create", {
+            "id": str(uuid.uuid4()),
+            "job_type": job_type,
+            "status": "queued",
+            "family_id": family_id,
+            "created_by": created_by,
+            "progress_done": 0,
+            "progress_total": total,
+            "attempts": 0,
+            "max_attempts": _job_types[job_type].max_attempts,
+            "cancel_requested": False,
+            "created_at": _now(),
+        })
+        self._count(job_type, "submitted")
+        self._tasks[job["id"]] = asyncio.create_task(self._run(job_type, job["id"], payload))
+        # Let the task start: one cancelled before its first step never enters
+        # _run, so its cleanup wouldn't run
+        await asyncio.sleep(0)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self._store_call("get", job_id)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Cancel a job
+
+        A job running in this worker is cancelled at once; one running in
+        another worker stops at its next progress report.
+        """
+        job = await self.get(job_id)
+        if not job or job["status"] in FINISHED_STATUSES:
+            return job
+        job = await self._update(job_id, {"cancel_requested": True}) or job
+        task = self._tasks.get(job_id)
+        if task:
+            self._cancelling.add(job_id)
+            task.cancel()
+        return job
+
+    async def shutdown(self):
+        """Stop this worker's jobs; they are recorded as failed"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        return {
+            "store": "database" if isinstance(self.store, DatabaseJobStore) else "memory",
+            "types": {job_type: dict(stats) for job_type, stats in self._stats.items()},
+        }
+
+    # Execution
+
+    async def _finish(self, job_type: str, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        self._count(job_type, status)
+        context = self._contexts.get(job_id)
+        await self._update(job_id, {
+            **(context.unsaved if context else {}),
+            "status": status,
+            "result": result,
+            "error": error,
+            "finished_at": _now(),
+        })
+
+    async def _attempt(self, job_type: str, job_id: str, payload: Any, attempt: int) -> Any:
+        """Wait for a slot of the job type, then run the handler once"""
+        self._count(job_type, "queued")
+        queued = True
+        try:
+            async with self._semaphore(job_type):
+                self._count(job_type, "queued", -1)
+                queued = False
+                self._count(job_type, "running")
+                try:
+                    job = await self._update(job_id, {
+                        "status": "running",
+                        "attempts": attempt,
+                        **({"started_at": _now()} if attempt == 1 else {}),
+                    })
+                    # Cancelled from another worker while queued
+                    if job and job.get("cancel_requested"):
+                        raise JobCancelled()
+                    context = self._contexts[job_id] = JobContext(self, job_id, attempt)
+                    return await _job_types[job_type].handler(context, payload)
+                finally:
+                    self._count(job_type, "running", -1)
+        finally:
+            if queued:
+                self._count(job_type, "queued", -1)
+
+    async def _run(self, job_type: str, job_id: str, payload: Any):
+        spec = _job_types[job_type]
+        try:
+            attempt = 1
+            while True:
+                try:
+                    result = await self._attempt(job_type, job_id, payload, attempt)
+                except (JobCancelled, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    if attempt >= spec.max_attempts or not spec.retry_on(e):
+                        await self._finish(job_type, job_id, "failed", error=str(e))
+                        return
+                    self._count(job_type, "retries")
+                    await self._update(job_id, {"status": "retrying", "error": str(e)})
+                    # Exponential backoff with full jitter; the slot is free meanwhile
+                    delay = min(self.backoff_seconds * 2 ** (attempt - 1), self.backoff_max_seconds)
+                    await asyncio.sleep(random.uniform(0, delay))
+                    attempt += 1
+                    continue
+                await self._finish(job_type, job_id, "succeeded", result=result)
+                return
+        except JobCancelled:
+            await self._finish(job_type, job_id, "cancelled", error="Cancelled")
+        except asyncio.CancelledError:
+            if job_id in self._cancelling:
+                await self._finish(job_type, job_id, "cancelled", error="Cancelled")
+            else:
+                await self._finish(job_type, job_id, "failed", error="Interrupted by worker shutdown")
+        except Exception as e:
+            print(f"Warning: job {job_id} ({job_type}) crashed: {str(e)}")
+        finally:
+            self._tasks.pop(job_id, None)
+            self._contexts.pop(job_id, None)
+            self._cancelling.discard(job_id)
+            if spec.cleanup:
+                try:
+                    spec.cleanup(payload)
+                except Exception as e:
+                    print(f"Warning: job {job_id} ({job_type}) cleanup failed: {str(e)}")
+
+
+_job_runner: Optional[JobRunner] = None
+
+
+def get_job_runner() -> JobRunner:
+    """Get or create this worker's job runner"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner(
+            store_kind=JOB_STORE,
+            concurrency=_parse_concurrency(JOB_CONCURRENCY),
+            default_concurrency=JOB_DEFAULT_CONCURRENCY,
+            backoff_seconds=JOB_RETRY_BACKOFF_SECONDS,
+            backoff_max_seconds=JOB_RETRY_BACKOFF_MAX_SECONDS,
+            progress_interval=JOB_PROGRESS_INTERVAL_SECONDS,
+        )
+    return _job_runner
+
+
+def job_accepted(job: dict) -> dict:
+    """Body of the 202 response for a submitted job"""
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/api/jobs/{job['id']}"}
+
+
+def job_metrics() -> dict:
+    return get_job_runner().metrics()
@@ -0,0 +1,47 @@
+"""
+Keyset pagination cursors
+A cursor is the sort key of the last row on a page, (sort, value, id), as
+URL-safe base64 JSON. Clients treat it as opaque and pass it back as
+?cursor= to get the rows strictly after that key.
+"""
+
+import base64
+import json
+from typing import Optional
+
+# Sortable columns; each is paired with id as a tie-breaker
+SORT_KEYS = ("name", "created_at")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(sort: str, row: dict) -> str:
+    raw = json.dumps([sort, row.get(sort), str(row["id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Return the (value, id) a page continues after
+
+    Raises:
+        ValueError: malformed cursor, or one issued for another sort order
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or value is None or not row_id:
+        raise ValueError("Cursor does not match the requested sort order")
+    return value, row_id
+
+
+def page_headers(next_cursor: Optional[str], total: Optional[int]) -> dict:
+    headers = {}
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        headers[TOTAL_COUNT_HEADER] = str(total)
+    return headers
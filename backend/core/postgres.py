@@ -0,0 +1,337 @@
+"""
+Direct Postgres data backend (DATA_BACKEND=postgres)
+Talks to the database over a per-worker asyncpg pool instead of going
+through PostgREST over HTTP. PostgresClient mirrors the subset of the
+supabase query builder the services use (table().select().eq()...), so
+services keep their method signatures and run unchanged on either backend.
+
+Each builder chain compiles to the same SQL text for the same query shape,
+so asyncpg's per-connection statement cache prepares hot queries (member
+listing, login lookups, approval) once and reuses them afterwards.
+"""
+
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Optional
+
+import asyncpg
+
+from core.config import (
+    DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+    DB_STATEMENT_CACHE_SIZE, DB_COMMAND_TIMEOUT_SECONDS
+)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _ident(name: str) -> str:
+    """Validate and quote a table/column identifier"""
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _columns(columns: str) -> str:
+    """Translate a PostgREST column list ("id, family_name" or "*") to SQL"""
+    if columns.strip() == "*":
+        return "*"
+    return ", ".join(_ident(column) for column in columns.split(","))
+
+
+def _row(record: asyncpg.Record) -> dict:
+    return dict(record.items())
+
+
+async def _init_connection(connection: asyncpg.Connection):
+    """Exchange values in the same shapes PostgREST returns (str ids/timestamps, decoded JSON)"""
+    for type_name in ("json", "jsonb"):
+        await connection.set_type_codec(
+            type_name, schema="pg_catalog", encoder=json.dumps, decoder=json.loads, format="text"
+        )
+    await connection.set_type_codec("uuid", schema="pg_catalog", encoder=str, decoder=str, format="text")
+    for type_name in ("timestamptz", "timestamp", "date"):
+        await connection.set_type_codec(
+            type_name, schema="pg_catalog",
+            encoder=lambda value: value.isoformat() if isinstance(value, (datetime, date)) else str(value),
+            decoder=lambda text: text.replace(" ", "T", 1),
+            format="text"
+        )
+
+
+class PgResponse:
+    """Result of an executed query (same shape as postgrest's APIResponse)"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class PgQuery:
+    """Builder for a single-table query, compiled to parameterised SQL on execute()"""
+
+    def __init__(self, client: "PostgresClient", table: str):
+        self.client = client
+        self.table = _ident(table)
+        self.operation = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.count: Optional[str] = None
+        self.filters: list[tuple[str, str, Any]] = []
+        self.ordering: list[str] = []
+        self.limit_count: Optional[int] = None
+        self.offset_count: Optional[int] = None
+
+    # Operations
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "PgQuery":
+        self.operation = "select"
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, json: Any, **kwargs) -> "PgQuery":
+        self.operation = "insert"
+        self.payload = json
+        return self
+
+    def upsert(self, json: Any, on_conflict: str = "", **kwargs) -> "PgQuery":
+        self.operation = "upsert"
+        self.payload = json
+        self.on_conflict = on_conflict or None
+        return self
+
+    def update(self, json: dict, **kwargs) -> "PgQuery":
+        self.operation = "update"
+        self.payload = json
+        return self
+
+    def delete(self, **kwargs) -> "PgQuery":
+        self.operation = "delete"
+        return self
+
+    # Filters
+
+    def _filter(self, column: str, operator: str, value: Any) -> "PgQuery":
+        self.filters.append((_ident(column), operator, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, "<>", value)
+
+    def gt(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "PgQuery":
+        return self._filter(column, "<=", value)
+
+    def like(self, column: str, pattern: str) -> "PgQuery":
+        return self._filter(column, "LIKE", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "PgQuery":
+        return self._filter(column, "ILIKE", pattern)
+
+    def in_(self, column: str, values: list) -> "PgQuery":
+        return self._filter(column, "IN", list(values))
+
+    def is_(self, column: str, value: Any) -> "PgQuery":
+        if value in (None, "null"):
+            return self._filter(column, "IS NULL", None)
+        return self._filter(column, "IS", value in (True, "true"))
+
+    # Modifiers
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "PgQuery":
+        self.ordering.append(f"{_ident(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size: int, **kwargs) -> "PgQuery":
+        self.limit_count = int(size)
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "PgQuery":
+        self.offset_count = int(start)
+        self.limit_count = int(end) - int(start) + 1
+        return self
+
+    # Compilation
+
+    def _where(self, params: list) -> str:
+        clauses = []
+        for column, operator, value in self.filters:
+            if operator == "IS NULL":
+                clauses.append(f"{column} IS NULL")
+            elif operator == "IN":
+                params.append(value)
+                clauses.append(f"{column} = ANY(${len(params)})")
+            elif operator == "IS":
+                clauses.append(f"{column} IS {'TRUE' if value else 'FALSE'}")
+            else:
+                params.append(value)
+                clauses.append(f"{column} {operator} ${len(params)}")
+        return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    def _values(self, params: list) -> tuple[list[str], str]:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        if not rows:
+            raise ValueError("Nothing to insert")
+        keys = list(rows[0].keys())
+        tuples = []
+        for row in rows:
+            placeholders = []
+            for key in keys:
+                params.append(row.get(key))
+                placeholders.append(f"${len(params)}")
+            tuples.append(f"({', '.join(placeholders)})")
+        return keys, ", ".join(tuples)
+
+    async def compile(self) -> tuple[str, list]:
+        """Return (sql, params) for this query"""
+        params: list = []
+
+        if self.operation == "select":
+            sql = f"SELECT {_columns(self.columns)} FROM {self.table}{self._where(params)}"
+            if self.ordering:
+                sql += f" ORDER BY {', '.join(self.ordering)}"
+            if self.limit_count is not None:
+                params.append(self.limit_count)
+                sql += f" LIMIT ${len(params)}"
+            if self.offset_count:
+                params.append(self.offset_count)
+                sql += f" OFFSET ${len(params)}"
+            return sql, params
+
+        if self.operation in ("insert", "upsert"):
+            keys, values = self._values(params)
+            sql = f"INSERT INTO {self.table} ({', '.join(_ident(key) for key in keys)}) VALUES {values}"
+            if self.operation == "upsert":
+                conflict = self.on_conflict or ", ".join(await self.client.primary_key(self.table))
+                target = ", ".join(_ident(column) for column in conflict.split(","))
+                updates = ", ".join(f"{_ident(key)} = EXCLUDED.{_ident(key)}" for key in keys)
+                sql += f" ON CONFLICT ({target}) DO UPDATE SET {updates}"
+            return sql + " RETURNING *", params
+
+        if self.operation == "update":
+            assignments = []
+            for key, value in self.payload.items():
+                params.append(value)
+                assignments.append(f"{_ident(key)} = ${len(params)}")
+            sql = f"UPDATE {self.table} SET {', '.join(assignments)}{self._where(params)}"
+            return sql + " RETURNING *", params
+
+        if self.operation == "delete":
+            return f"DELETE FROM {self.table}{self._where(params)} RETURNING *", params
+
+        raise ValueError(f"Unsupported operation: {self.operation}")
+
+    async def execute(self) -> PgResponse:
+        sql, params = await self.compile()
+        async with self.client.acquire() as connection:
+            records = await connection.fetch(sql, *params)
+            count = None
+            if self.count and self.operation == "select":
+                count_params: list = []
+                where = self._where(count_params)
+                count = await connection.fetchval(f"SELECT count(*) FROM {self.table}{where}", *count_params)
+        return PgResponse([_row(record) for record in records], count)
+
+
+class PgRpc:
+    """Call of a database function, mirroring supabase.rpc(name, params)"""
+
+    def __init__(self, client: "PostgresClient", function: str, params: Optional[dict]):
+        self.client = client
+        self.function = _ident(function)
+        self.params = params or {}
+
+    async def execute(self) -> PgResponse:
+        arguments = ", ".join(f"{_ident(name)} => ${i}" for i, name in enumerate(self.params, start=1))
+        sql = f"SELECT * FROM {self.function}({arguments})"
+        async with self.client.acquire() as connection:
+            records = await connection.fetch(sql, *self.params.values())
+        # Scalar functions come back as a single column named after the function
+        if len(records) == 1 and list(records[0].keys()) == [self.function.strip('"')]:
+            return PgResponse(records[0][0])
+        return PgResponse([_row(record) for record in records])
+
+
+class PostgresClient:
+    """
+    Supabase-compatible facade over an asyncpg pool
+    Auth calls (supabase.auth.*) are still delegated to the Supabase client.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, auth_client=None):
+        self.pool = pool
+        self._auth_client = auth_client
+        self._primary_keys: dict = {}
+
+    @property
+    def auth(self):
+        if self._auth_client is None:
+            raise RuntimeError("Supabase auth is not configured for the postgres data backend")
+        return self._auth_client.auth
+
+    def table(self, name: str) -> PgQuery:
+        return PgQuery(self, name)
+
+    def from_(self, name: str) -> PgQuery:
+        return PgQuery(self, name)
+
+    def rpc(self, function: str, params: Optional[dict] = None) -> PgRpc:
+        return PgRpc(self, function, params)
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    async def primary_key(self, table: str) -> list[str]:
+        """Primary-key columns of a table (default upsert conflict target)"""
+        if table not in self._primary_keys:
+            async with self.acquire() as connection:
+                rows = await connection.fetch(
+                    """
+                    SELECT a.attname FROM pg_index i
+                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                    WHERE i.indrelid = $1::regclass AND i.indisprimary
+                    """,
+                    table
+                )
+            self._primary_keys[table] = [row["attname"] for row in rows]
+        return self._primary_keys[table]
+
+    def metrics(self) -> dict:
+        """Pool sizing and usage for this worker"""
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        return {
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+        }
+
+
+async def create_pool() -> asyncpg.Pool:
+    """Create the per-worker connection pool from DATABASE_URL"""
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL must be set when DATA_BACKEND=postgres")
+    return await asyncpg.create_pool(
+        DATABASE_URL,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT_SECONDS,
+        init=_init_connection
+    )
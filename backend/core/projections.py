@@ -0,0 +1,136 @@
+"""
+Column projections per table and use case
+Queries select only the columns their caller needs instead of "*", so
+secrets (password hashes, encrypted family passwords) and large JSONB
+blobs are not fetched, serialised and shipped when they aren't used.
+"""
+
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+
+PROJECTIONS = {
+    "families": {
+        # Member login: verify the family password
+        "login": "id, family_name, admin_user_id, family_password_hash",
+        # Access checks and FamilyResponse
+        "access_check": "id, family_name, admin_user_id, created_at, updated_at",
+        "list": "id, family_name, created_at, updated_at",
+        "detail": "id, family_name, admin_user_id, created_at, updated_at",
+        # Family password retrieval by the admin
+        "family_password": "id, admin_user_id, family_password_encrypted, family_data_key_wrapped",
+        "key_rotation": "id, family_password_encrypted, family_data_key_wrapped",
+        "exists": "id",
+    },
+    "family_members": {
+        "login": "id, family_id, name, relationships",
+        "access_check": "id, family_id",
+        # Member lists show name, photo and relationships; custom_fields only on detail
+        "list": "id, family_id, name, photo_url, relationships, created_at, updated_at",
+        "detail": "id, family_id, name, photo_url, relationships, custom_fields, email, created_at, updated_at",
+        "export": "id, name, photo_url, relationships, custom_fields, created_at, updated_at",
+        # CSV export header discovery without the field_keys() function
+        "field_keys": "id, relationships, custom_fields",
+        # In-memory autocomplete index entries
+        "autocomplete": "id, name, photo_url",
+    },
+    "users": {
+        "login": "id, email, role, family_id, approval_status, full_name, password_hash",
+        "access_check": "id, role, family_id, approval_status",
+        "list": "id, email, family_id, role, approval_status, full_name, created_at, updated_at",
+        "detail": "id, email, family_id, role, approval_status, full_name, created_at, updated_at",
+        "password": "id, password_hash",
+        "exists": "id",
+        # Re-checked on every refresh token rotation
+        "token_subject": "id, email, role, family_id, approval_status",
+    },
+    "admin_onboarding_requests": {
+        "list": "id, email, full_name, family_name, status, rejection_reason, requested_at, reviewed_at, user_id",
+        "detail": "id, email, full_name, family_name, status, rejection_reason, requested_at, reviewed_at, reviewed_by, user_id",
+        # Approval copies the encrypted family password, wrapped key and hash to the family
+        "approval": (
+            "id, email, full_name, family_name, status, user_id, "
+            "family_password_encrypted, family_data_key_wrapped, family_password_hash"
+        ),
+        "exists": "id",
+    },
+    "refresh_tokens": {
+        "rotation": "id, chain_id, user_id, email, role, family_id, expires_at, revoked_at, replaced_by",
+        "chain": "chain_id",
+    },
+    "jobs": {
+        "status": (
+            "id, job_type, status, family_id, created_by, progress_done, progress_total, attempts, "
+            "max_attempts, cancel_requested, result, error, created_at, started_at, finished_at, updated_at"
+        ),
+    },
+}
+
+# Columns a client may request through ?fields= (never secrets)
+PUBLIC_COLUMNS = {
+    "families": {"id", "family_name", "admin_user_id", "created_at", "updated_at"},
+    "family_members": {
+        "id", "family_id", "name", "photo_url", "relationships", "custom_fields", "email",
+        "created_at", "updated_at"
+    },
+    "users": {"id", "email", "family_id", "role", "approval_status", "full_name", "created_at", "updated_at"},
+}
+
+
+def projection(table: str, use_case: str) -> str:
+    """Column list for a table's named use case"""
+    try:
+        return PROJECTIONS[table][use_case]
+    except KeyError:
+        raise KeyError(f"No projection '{use_case}' for table '{table}'")
+
+
+def resolve_fields(table: str, fields: Optional[str], default: str) -> str:
+    """
+    Turn an endpoint's ?fields= value into a column list
+
+    Accepts a projection name (e.g. "list") or comma-separated column names;
+    falls back to the default projection when fields is empty. Always includes
+    "id" so clients can address the rows they get back.
+
+    Raises:
+        ValueError: If a requested column is unknown or not public
+    """
+    if not fields or not fields.strip():
+        return projection(table, default)
+
+    fields = fields.strip()
+    named = PROJECTIONS.get(table, {}).get(fields)
+    requested = [column.strip() for column in (named or fields).split(",") if column.strip()]
+
+    allowed = PUBLIC_COLUMNS.get(table, set())
+    invalid = [column for column in requested if column not in allowed]
+    if invalid:
+        raise ValueError(f"Unknown or restricted fields: {', '.join(invalid)}")
+
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return ", ".join(dict.fromkeys(requested))
+
+
+def fields_query(table: str, default: str):
+    """
+    Dependency for an endpoint's ?fields= parameter
+
+    Resolves to None when the client didn't ask for specific fields (the
+    endpoint uses its default projection and response model), otherwise to
+    the validated column list.
+    """
+    async def dependency(
+        fields: Optional[str] = Query(
+            None, description="Projection name or comma-separated columns to return"
+        )
+    ) -> Optional[str]:
+        if not fields:
+            return None
+        try:
+            return resolve_fields(table, fields, default)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return dependency
@@ -0,0 +1,121 @@
+"""
+In-process revocation filter for access tokens
+A Bloom filter answers "definitely not revoked" for almost every request
+without touching the exact set; positives are confirmed against an exact
+jti -> expiry map. The filter is rebuilt from the revoked_tokens table on
+every sync, so entries for expired tokens drop out.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from typing import Optional
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        # Double hashing: h1 + i * h2 gives hash_count independent-enough positions
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationFilter:
+    """Bloom filter plus exact set of revoked token IDs (jti)"""
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._exact: dict = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self.last_synced_at: Optional[float] = None
+
+        # Metrics
+        self.checks = 0
+        self.bloom_positives = 0
+        self.revoked_hits = 0
+
+    def revoke(self, jti: str, expires_at: float):
+        """Mark a token ID as revoked until it would have expired anyway"""
+        with self._lock:
+            self._exact[jti] = expires_at
+            if len(self._exact) > self.capacity:
+                # Filter is over capacity; rebuild larger to keep the error rate
+                self._rebuild(self._exact)
+            else:
+                self._bloom.add(jti)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """O(1) check; tokens without a jti cannot be revoked individually"""
+        if not jti:
+            return False
+        self.checks += 1
+        if jti not in self._bloom:
+            return False
+        self.bloom_positives += 1
+        expires_at = self._exact.get(jti)
+        if expires_at is not None and expires_at > time.time():
+            self.revoked_hits += 1
+            return True
+        return False
+
+    def _rebuild(self, entries: dict):
+        now = time.time()
+        live = {jti: exp for jti, exp in entries.items() if exp > now}
+        self.capacity = max(self.capacity, len(live) * 2)
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        for jti in live:
+            bloom.add(jti)
+        self._exact = live
+        self._bloom = bloom
+
+    def replace(self, entries: dict):
+        """Swap in a fresh snapshot of revoked jti -> expiry (from a sync)"""
+        with self._lock:
+            # Keep local revocations that the snapshot may not include yet
+            merged = dict(entries)
+            for jti, expires_at in self._exact.items():
+                merged.setdefault(jti, expires_at)
+            self._rebuild(merged)
+            self.last_synced_at = time.time()
+
+    def metrics(self) -> dict:
+        return {
+            "revoked": len(self._exact),
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hash_count,
+            "checks": self.checks,
+            "bloom_positives": self.bloom_positives,
+            "revoked_hits": self.revoked_hits,
+            "last_synced_at": self.last_synced_at,
+        }
+
+
+_revocation_filter: RevocationFilter = None
+
+
+def get_revocation_filter() -> RevocationFilter:
+    """Get or create the shared revocation filter"""
+    global _revocation_filter
+    if _revocation_filter is None:
+        _revocation_filter = RevocationFilter()
+    return _revocation_filter
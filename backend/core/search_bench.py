@@ -0,0 +1,204 @@
+"""
+Family member search benchmark
+
+Usage:
+    python -m core.search_bench
+    python -m core.search_bench --members 100000 --runs 20 --output search.json
+
+Seeds a synthetic family into the Postgres on DATABASE_URL (with
+sql/schema.sql, member_pagination.sql and member_search.sql loaded) and times
+name searches three ways:
+
+    ilike_btree   the old path: ILIKE '%query%', every match, unranked, with
+                  only the btree indexes (the trigram index is dropped inside a
+                  transaction that is rolled back)
+    ilike_trgm    the same query once the trigram GIN index exists
+    ranked_rpc    search_family_members(): ranked, typo tolerant, limited
+
+Reports p50/p99 latency, rows returned, the query plan and,
+for queries with a typo, how often the intended member was found. The
+synthetic family is deleted afterwards. Run it against a local database: the
+ilike_btree pass holds a lock on family_members while it runs.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from core.config import MEMBER_SEARCH_DEFAULT_LIMIT, MEMBER_SEARCH_MIN_SIMILARITY
+from core.crypto_bench import _percentile
+from core.projections import projection
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Deepak", "Divya", "Gaurav", "Isha", "Kavita",
+    "Kiran", "Lakshmi", "Manish", "Meera", "Neha", "Nikhil", "Pooja", "Priya", "Rahul", "Rajesh",
+    "Ravi", "Rohan", "Sanjay", "Sarita", "Shreya", "Sunil", "Suresh", "Tanvi", "Vikram", "Vivek",
+]
+LAST_NAMES = [
+    "Agarwal", "Bhatt", "Chopra", "Desai", "Gupta", "Iyer", "Joshi", "Kapoor", "Kulkarni", "Mehta",
+    "Menon", "Nair", "Patel", "Pillai", "Rao", "Reddy", "Saxena", "Shah", "Sharma", "Singh",
+    "Srinivasan", "Thakur", "Trivedi", "Varma", "Yadav",
+]
+
+_ILIKE = f"SELECT {projection('family_members', 'list')} FROM family_members WHERE family_id = $1 AND name ILIKE $2"
+_RPC = "SELECT * FROM search_family_members($1, $2, $3, $4)"
+
+
+def _synthetic_names(count: int, rng: random.Random) -> list:
+    return [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice('ABCDEFGHJKLMNPRSTV')}. {rng.choice(LAST_NAMES)} {i}"
+        for i in range(count)
+    ]
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    """Drop, double or swap one letter"""
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(("drop", "double", "swap"))
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "double":
+        return word[:i] + word[i] + word[i:]
+    return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+
+def _queries(names: list, rng: random.Random) -> dict:
+    """Query sets by kind; typo queries keep the name they were made from"""
+    samples = rng.sample(names, 10)
+    return {
+        "first_name": [(rng.choice(FIRST_NAMES), None) for _ in range(5)],
+        "last_name": [(rng.choice(LAST_NAMES), None) for _ in range(5)],
+        "full_name": [(name, name) for name in samples[:5]],
+        "typo": [
+            (f"{_typo(name.split()[2], rng)} {name.split()[3]}", name)
+            for name in samples[5:]
+        ],
+    }
+
+
+async def _plan(connection, sql: str, args: list) -> dict:
+    plan = json.loads(await connection.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *args))[0]["Plan"]
+    nodes = []
+
+    def walk(node):
+        nodes.append(node["Node Type"] + (f" on {node['Index Name']}" if "Index Name" in node else ""))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan)
+    return {"nodes": nodes}
+
+
+async def _time(connection, sql: str, args_for, queries: dict, runs: int) -> dict:
+    latencies, rows, hits, typos = [], [], 0, 0
+    for kind, pairs in queries.items():
+        for query, intended in pairs:
+            statement = await connection.prepare(sql)
+            for _ in range(runs):
+                started = time.perf_counter()
+                records = await statement.fetch(*args_for(query))
+                latencies.append((time.perf_counter() - started) * 1000)
+            rows.append(len(records))
+            if kind == "typo":
+                typos += 1
+                hits += any(record["name"] == intended for record in records)
+    return {
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "mean_rows": round(statistics.mean(rows), 1),
+        "typo_hit_rate": round(hits / typos, 4) if typos else None,
+    }
+
+
+async def bench(members: int, runs: int, limit: int, min_similarity: float, seed: int) -> dict:
+    import asyncpg
+    from core.config import DATABASE_URL
+
+    if not DATABASE_URL:
+        raise SystemExit("DATABASE_URL must point at a Postgres with the sql/ scripts loaded")
+
+    rng = random.Random(seed)
+    names = _synthetic_names(members, rng)
+    queries = _queries(names, rng)
+    family_id = str(uuid.uuid4())
+
+    connection = await asyncpg.connect(DATABASE_URL)
+    try:
+        await connection.execute(
+            "INSERT INTO families (id, family_name, admin_user_id, family_password_encrypted) VALUES ($1, $2, $3, 'bench')",
+            uuid.UUID(family_id), f"search-bench-{family_id[:8]}", uuid.uuid4()
+        )
+        await connection.copy_records_to_table(
+            "family_members",
+            records=[(uuid.uuid4(), uuid.UUID(family_id), name) for name in names],
+            columns=["id", "family_id", "name"]
+        )
+        await connection.execute("ANALYZE family_members")
+
+        family = uuid.UUID(family_id)
+        ilike_args = lambda query: [family, f"%{query}%"]
+        rpc_args = lambda query: [family, query, limit, min_similarity]
+        sample = [family, f"%{queries['last_name'][0][0]}%"]
+
+        results = {}
+        transaction = connection.transaction()
+        await transaction.start()
+        try:
+            await connection.execute("DROP INDEX IF EXISTS idx_family_members_family_name_trgm")
+            results["ilike_btree"] = await _time(connection, _ILIKE, ilike_args, queries, runs)
+            results["ilike_btree"]["plan"] = await _plan(connection, _ILIKE, sample)
+        finally:
+            await transaction.rollback()
+
+        results["ilike_trgm"] = await _time(connection, _ILIKE, ilike_args, queries, runs)
+        results["ilike_trgm"]["plan"] = await _plan(connection, _ILIKE, sample)
+        results["ranked_rpc"] = await _time(connection, _RPC, rpc_args, queries, runs)
+        return results
+    finally:
+        await connection.execute("DELETE FROM families WHERE id = $1", uuid.UUID(family_id))
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark family member name search")
+    parser.add_argument("--members", type=int, default=100000, help="Members in the synthetic family")
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per query")
+    parser.add_argument("--limit", type=int, default=MEMBER_SEARCH_DEFAULT_LIMIT, help="Ranked results per search")
+    parser.add_argument("--min-similarity", type=float, default=MEMBER_SEARCH_MIN_SIMILARITY)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "members": args.members,
+        "runs": args.runs,
+        "limit": args.limit,
+        "min_similarity": args.min_similarity,
+        "results": asyncio.run(bench(args.members, args.runs, args.limit, args.min_similarity, args.seed)),
+    }
+
+    print(f"Member search, {args.members} members, {args.runs} runs per query")
+    for name, stats in results["results"].items():
+        typo = "-" if stats["typo_hit_rate"] is None else f"{stats['typo_hit_rate']:.0%}"
+        print(
+            f"  {name:12s} p50 {stats['p50_ms']:>9} ms  p99 {stats['p99_ms']:>9} ms  "
+            f"rows {stats['mean_rows']:>8}  typos found {typo:>5}"
+        )
+        if "plan" in stats:
+            print(f"  {'':12s} plan: {' > '.join(stats['plan']['nodes'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+JWT signing key ring with key IDs and a public JWKS
+
+With JWT_ALGORITHM=EdDSA or ES256, tokens are signed with the private key
+named by JWT_ACTIVE_KID from JWT_SIGNING_KEYS_DIR (one <kid>.pem per key).
+Every key in the directory stays published in /.well-known/jwks.json and
+accepted for verification, so a new key can be introduced before it is
+made active and an old one kept until its tokens have expired.
+
+Switching from HS256: set JWT_ACCEPT_LEGACY_HS256=True and
+JWT_LEGACY_HS256_UNTIL to the switch time plus ACCESS_TOKEN_EXPIRATION_MINUTES
+so tokens already issued keep working; HS256 tokens are refused after that
+time, and the setting should then be removed.
+
+Generate a key for rotation:
+    python -m core.signing_keys --algorithm EdDSA --kid 2026-10 --out keys/
+"""
+
+import argparse
+import os
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm
+
+from core.config import (
+    JWT_ACCEPT_LEGACY_HS256,
+    JWT_ACTIVE_KID,
+    JWT_ALGORITHM,
+    JWT_LEGACY_HS256_UNTIL,
+    JWT_SECRET_KEY,
+    JWT_SIGNING_KEYS_DIR,
+)
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+LEGACY_ALGORITHM = "HS256"
+
+
+class SigningKey:
+    """A single asymmetric key pair identified by kid"""
+
+    def __init__(self, kid: str, algorithm: str, private_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+
+    def to_jwk(self) -> dict:
+        if self.algorithm == "EdDSA":
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = ECAlgorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+def generate_private_key(algorithm: str):
+    """Create a new private key for the given JWT algorithm"""
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == "ES256":
+        return ec.generate_private_key(ec.SECP256R1())
+    raise ValueError(f"Unsupported signing algorithm: {algorithm}")
+
+
+class KeyRing:
+    """Signs tokens with the active key and verifies against any known key"""
+
+    def __init__(
+        self,
+        algorithm: str,
+        keys: Optional[dict] = None,
+        active_kid: Optional[str] = None,
+        legacy_secret: Optional[str] = None,
+        legacy_until: Optional[datetime] = None,
+    ):
+        self.algorithm = algorithm
+        self.keys: dict = keys or {}
+        self.active_kid = active_kid
+        self.legacy_secret = legacy_secret
+        # End of the HS256 migration window when signing with an asymmetric key
+        self.legacy_until = legacy_until
+
+        if self.algorithm in ASYMMETRIC_ALGORITHMS and self.active_kid not in self.keys:
+            raise ValueError(f"Active signing key '{self.active_kid}' not found")
+
+    def sign(self, payload: dict) -> str:
+        """Encode and sign a JWT with the active key"""
+        if self.algorithm in ASYMMETRIC_ALGORITHMS:
+            key = self.keys[self.active_kid]
+            return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+        return jwt.encode(payload, self.legacy_secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        """
+        Verify a JWT against the key named in its header
+
+        Raises:
+            jwt.InvalidTokenError: If the key is unknown or the token is invalid
+        """
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+
+        if algorithm == LEGACY_ALGORITHM:
+            if not self.legacy_secret:
+                raise jwt.InvalidTokenError("HS256 tokens are not accepted")
+            if self.legacy_until and datetime.now(timezone.utc) >= self.legacy_until:
+                raise jwt.InvalidTokenError("HS256 tokens are no longer accepted")
+            return jwt.decode(token, self.legacy_secret, algorithms=[LEGACY_ALGORITHM])
+
+        key = self.keys.get(header.get("kid"))
+        if key is None or key.algorithm != algorithm:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        """Public keys in JWKS format (never includes the HS256 secret)"""
+        return {"keys": [key.to_jwk() for key in self.keys.values()]}
+
+
+def load_keys(directory: str, algorithm: str) -> dict:
+    """Load every <kid>.pem private key in a directory"""
+    keys = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".pem"):
+            continue
+        with open(os.path.join(directory, filename), "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        kid = filename[:-len(".pem")]
+        keys[kid] = SigningKey(kid, algorithm, private_key)
+    return keys
+
+
+def _legacy_window(enabled: bool, until: Optional[str]) -> Optional[datetime]:
+    """End of the HS256 migration window, or None if HS256 isn't accepted"""
+    if not enabled:
+        return None
+    if not until:
+        print("Warning: JWT_ACCEPT_LEGACY_HS256 needs JWT_LEGACY_HS256_UNTIL, not accepting HS256 tokens")
+        return None
+    end = datetime.fromisoformat(until)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= datetime.now(timezone.utc):
+        print("Warning: JWT_LEGACY_HS256_UNTIL has passed, turn JWT_ACCEPT_LEGACY_HS256 off")
+    return end
+
+
+_key_ring: KeyRing = None
+
+
+def get_key_ring() -> KeyRing:
+    """Get or create the shared key ring from configuration"""
+    global _key_ring
+    if _key_ring is None:
+        if JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS:
+            if JWT_SIGNING_KEYS_DIR:
+                keys = load_keys(JWT_SIGNING_KEYS_DIR, JWT_ALGORITHM)
+                active_kid = JWT_ACTIVE_KID or (sorted(keys)[-1] if keys else None)
+            else:
+                # Development fallback: tokens won't verify across workers or restarts
+                print("Warning: JWT_SIGNING_KEYS_DIR not set, using an ephemeral signing key")
+                active_kid = f"ephemeral-{secrets.token_hex(4)}"
+                keys = {active_kid: SigningKey(active_kid, JWT_ALGORITHM, generate_private_key(JWT_ALGORITHM))}
+            legacy_until = _legacy_window(JWT_ACCEPT_LEGACY_HS256, JWT_LEGACY_HS256_UNTIL)
+            _key_ring = KeyRing(
+                JWT_ALGORITHM,
+                keys=keys,
+                active_kid=active_kid,
+                legacy_secret=JWT_SECRET_KEY if legacy_until else None,
+                legacy_until=legacy_until,
+            )
+        else:
+            _key_ring = KeyRing(JWT_ALGORITHM, legacy_secret=JWT_SECRET_KEY)
+    return _key_ring
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a JWT signing key")
+    parser.add_argument("--algorithm", choices=ASYMMETRIC_ALGORITHMS, default="EdDSA")
+    parser.add_argument("--kid", required=True, help="Key ID; the file is written as <kid>.pem")
+    parser.add_argument("--out", default=".", help="Directory to write the key to")
+    args = parser.parse_args()
+
+    private_key = generate_private_key(args.algorithm)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{args.kid}.pem")
+    with open(path, "wb") as f:
+        f.write(pem)
+    os.chmod(path, 0o600)
+    print(f"Wrote {args.algorithm} signing key {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Name matching helpers shared by member search
+Trigrams follow pg_trgm's rules (lower-cased alphanumeric words, padded with
+two spaces in front and one behind), so scores computed here agree with
+similarity() in sql/member_search.sql.
+"""
+
+import re
+from typing import List
+
+_WORD = re.compile(r"[^\W_]+")
+
+# Rank of each match type, best first, as ordered by search_family_members()
+MATCH_TYPES = ("exact", "prefix", "substring", "fuzzy")
+
+
+def words(text: str) -> List[str]:
+    """Lower-cased alphanumeric words, as pg_trgm splits them"""
+    return _WORD.findall(text.lower())
+
+
+def trigrams(text: str) -> set:
+    grams = set()
+    for word in words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): shared trigrams over all trigrams"""
+    a_grams, b_grams = trigrams(a), trigrams(b)
+    if not a_grams or not b_grams:
+        return 0.0
+    return len(a_grams & b_grams) / len(a_grams | b_grams)
+
+
+def match_type(name: str, query: str) -> str:
+    name, query = name.lower(), query.strip().lower()
+    if name == query:
+        return "exact"
+    if name.startswith(query):
+        return "prefix"
+    if query in name:
+        return "substring"
+    return "fuzzy"
+
+
+def highlights(name: str, query: str, min_similarity: float = 0.3) -> List[List[int]]:
+    """
+    [start, end) character ranges of name to highlight for query
+
+    Each query word is highlighted where it occurs in the name; a word that
+    doesn't occur (a typo) highlights the most similar word of the name instead.
+    """
+    lowered = name.lower()
+    if len(lowered) != len(name):
+        # Lower-casing changed the length, so offsets wouldn't line up
+        return []
+    words = [(match.start(), match.end()) for match in _WORD.finditer(name)]
+    spans = []
+    for token in query.lower().split():
+        start = lowered.find(token)
+        if start >= 0:
+            while start >= 0:
+                spans.append([start, start + len(token)])
+                start = lowered.find(token, start + len(token))
+            continue
+        scored = [(similarity(token, name[start:end]), start, end) for start, end in words]
+        if scored:
+            score, start, end = max(scored, key=lambda candidate: candidate[0])
+            if score >= min_similarity:
+                spans.append([start, end])
+
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
@@ -0,0 +1,117 @@
+"""
+Shared JWT verifier with a bounded cache of verified claims
+Tokens are verified once and their claims reused until they expire,
+so polling dashboards don't re-run signature checks on every request
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+from core.config import TOKEN_CACHE_SIZE
+from core.signing_keys import LEGACY_ALGORITHM, KeyRing, get_key_ring
+
+
+class TokenError(Exception):
+    """Raised when a token is expired or invalid"""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class TokenVerifier:
+    """Verify JWTs, caching decoded claims by token digest until exp"""
+
+    def __init__(self, key_ring: KeyRing, max_size: int = 10000):
+        self.key_ring = key_ring
+        self.max_size = max_size
+        self._cache: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _decode(self, token: str) -> dict:
+        try:
+            return self.key_ring.decode(token)
+        except jwt.ExpiredSignatureError:
+            raise TokenError("Token expired")
+        except jwt.InvalidTokenError:
+            raise TokenError("Invalid token")
+
+    def verify(self, token: str) -> dict:
+        """
+        Return the token's claims, verifying the signature only on a cache miss
+
+        Raises:
+            TokenError: If the token is expired or invalid
+        """
+        key = self._digest(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > now:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._cache[key]
+            self.misses += 1
+
+        claims = self._decode(token)
+
+        # Tokens without exp are verified every time rather than cached forever
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)):
+            expires_at = float(expires_at)
+            # Legacy HS256 tokens stop verifying when the migration window closes
+            legacy_until = self.key_ring.legacy_until
+            if legacy_until and jwt.get_unverified_header(token).get("alg") == LEGACY_ALGORITHM:
+                expires_at = min(expires_at, legacy_until.timestamp())
+            with self._lock:
+                self._cache[key] = (claims, expires_at)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+        return claims
+
+    def invalidate(self, token: str):
+        """Drop a token from the cache"""
+        with self._lock:
+            self._cache.pop(self._digest(token), None)
+
+    def metrics(self) -> dict:
+        """Cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_token_verifier: TokenVerifier = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Get or create the shared token verifier"""
+    global _token_verifier
+    if _token_verifier is None:
+        _token_verifier = TokenVerifier(get_key_ring(), max_size=TOKEN_CACHE_SIZE)
+    return _token_verifier
@@ -0,0 +1,85 @@
+"""
+Request-scoped identity map
+Services given a UnitOfWork read each row at most once per request: repeated
+(and concurrent) reads of the same row are served from the map, and rows
+returned by writes replace what was read. FastAPI caches dependencies per
+request, so every service built in one request shares the same instance.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+# Totals across requests in this worker
+_stats = {"reads": 0, "deduplicated": 0, "requests": 0}
+
+
+def _column_set(columns: str) -> frozenset:
+    return frozenset(column.strip() for column in columns.split(",") if column.strip())
+
+
+class UnitOfWork:
+    """Identity map keyed by (table, row id) for one request"""
+
+    def __init__(self):
+        self._rows: dict = {}
+        self._pending: dict = {}
+        _stats["requests"] += 1
+
+    def _lookup(self, table: str, row_id: str, wanted: frozenset):
+        entry = self._rows.get((table, row_id))
+        if entry is None:
+            return False, None
+        row, columns = entry
+        if "*" in columns or wanted <= columns:
+            return True, row
+        return False, None
+
+    async def get(self, table: str, row_id: str, columns: str,
+                  loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """
+        Return the row from the map, or await loader() once and remember it
+
+        A cached row satisfies any read whose columns it already has, so a
+        detail read followed by an access check costs one query.
+        """
+        wanted = _column_set(columns)
+        found, row = self._lookup(table, row_id, wanted)
+        if found:
+            _stats["deduplicated"] += 1
+            return row
+
+        key = (table, row_id, wanted)
+        pending = self._pending.get(key)
+        if pending is not None:
+            _stats["deduplicated"] += 1
+            return await pending
+
+        _stats["reads"] += 1
+        future = asyncio.ensure_future(loader())
+        self._pending[key] = future
+        try:
+            row = await future
+        finally:
+            self._pending.pop(key, None)
+        self.put(table, row_id, row, columns)
+        return row
+
+    def put(self, table: str, row_id: str, row: Optional[dict], columns: str = "*"):
+        """Remember a row (e.g. as returned by a write); None records that it doesn't exist"""
+        self._rows[(table, row_id)] = (row, _column_set(columns))
+
+    def forget(self, table: str, row_id: str):
+        self._rows.pop((table, row_id), None)
+
+
+def get_unit_of_work() -> UnitOfWork:
+    """FastAPI dependency: one UnitOfWork per request"""
+    return UnitOfWork()
+
+
+def unit_of_work_metrics() -> dict:
+    lookups = _stats["reads"] + _stats["deduplicated"]
+    return {
+        **_stats,
+        "dedup_ratio": round(_stats["deduplicated"] / lookups, 4) if lookups else 0.0,
+    }
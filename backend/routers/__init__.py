@@ -5,6 +5,8 @@ from . import user_router
 from . import family_router
 from . import family_member_router
 from . import health_router
+from . import well_known_router
+from . import job_router
 
 __all__ = [
     'auth_router',
@@ -12,5 +14,6 @@ __all__ = [
     'user_router',
     'family_router',
     'family_member_router',
-    'health_router'
+    'health_router',
+    'well_known_router'
 ]
@@ -6,23 +6,37 @@ New Authentication Router for the redesigned auth system:
 - Family Member login with family credentials
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Header
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query, Request, BackgroundTasks
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-import jwt
 from datetime import datetime, timedelta
+import uuid
 from supabase import Client
 
-from core.database import get_supabase_client
-from core.config import SUPERADMIN_USERNAME, SUPERADMIN_PASSWORD, JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
-from core.encryption import EncryptionService, PasswordHashingService
+from core.database import execute, get_supabase_client
+from core.projections import projection
+from core.config import SUPERADMIN_USERNAME, SUPERADMIN_PASSWORD, ACCESS_TOKEN_EXPIRATION_MINUTES
+from core.crypto_executor import verify_password_async, hash_password_async
+from core.encryption import PasswordHashingService
+from core.crypto_admission import AdmissionRejected, get_admission_controller
+from core.jobs import get_job_runner, job_accepted
+from core.signing_keys import get_key_ring
+from core.token_verifier import TokenError, get_token_verifier
+from core.revocation import get_revocation_filter
 from services.admin_onboarding_service import AdminOnboardingService
+from services.token_service import TokenService
+from services.family_member_service import FamilyMemberService
+from services.family_service import FamilyService, invalidate_family_cache
 from schemas.user import (
     SuperAdminLoginRequest,
     AdminOnboardingRequest,
     AdminApprovalRequest,
+    AdminPasswordChangeRequest,
     FamilyMemberLoginRequest,
     LoginRequest,
+    RefreshTokenRequest,
+    LogoutRequest,
     UserResponse,
 )
 
@@ -31,31 +45,56 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 # Helper function to create JWT token
 def create_access_token(user_id: str, email: str, role: str, family_id: Optional[str] = None) -> str:
-    """Create JWT token for authenticated user"""
+    """Create short-lived JWT access token for authenticated user"""
+    now = datetime.utcnow()
     payload = {
         "user_id": user_id,
         "email": email,
         "role": role,
         "family_id": family_id,
-        "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
+        "jti": str(uuid.uuid4()),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_EXPIRATION_MINUTES)
     }
-    token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    token = get_key_ring().sign(payload)
     return token
 
 
+async def issue_tokens(user_id: str, email: str, role: str, family_id: Optional[str] = None) -> dict:
+    """Create an access token plus a rotating refresh token"""
+    access_token = create_access_token(user_id=user_id, email=email, role=role, family_id=family_id)
+    token_service = TokenService(get_supabase_client())
+    refresh_token = await token_service.issue_refresh_token({
+        "user_id": user_id,
+        "email": email,
+        "role": role,
+        "family_id": family_id
+    })
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+    }
+
+
 def verify_token(token: str) -> dict:
-    """Verify and decode JWT token"""
+    """Verify and decode JWT token (cached until the token expires)"""
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=401, detail="Token expired")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        return get_token_verifier().verify(token)
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=e.detail)
 
 
-def get_auth_user(authorization: Optional[str] = Header(None)) -> dict:
-    """Extract user from Authorization header"""
+async def get_auth_user(request: Request, authorization: Optional[str] = Header(None)) -> dict:
+    """
+    Extract user from Authorization header
+    The principal is stored on request.state so the token is parsed once per request
+    """
+    cached_user = getattr(request.state, "auth_user", None)
+    if cached_user is not None:
+        return cached_user
+    
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header required")
     
@@ -64,9 +103,56 @@ def get_auth_user(authorization: Optional[str] = Header(None)) -> dict:
         if scheme.lower() != "bearer":
             raise HTTPException(status_code=401, detail="Invalid authorization scheme")
         
-        return verify_token(token)
+        user = verify_token(token)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
+    
+    if get_revocation_filter().is_revoked(user.get("jti")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    
+    request.state.auth_user = user
+    return user
+
+
+async def verify_login_password(
+    password: str,
+    password_hash: str,
+    http_request: Request,
+    family_key: Optional[str] = None
+) -> bool:
+    """
+    Verify a login password through the crypto admission controller
+    Sheds load with 429/503 + Retry-After instead of queueing indefinitely
+    """
+    client_ip = http_request.client.host if http_request.client else None
+    try:
+        async with get_admission_controller().admit(client_ip=client_ip, family_key=family_key):
+            return await verify_password_async(password, password_hash)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def rehash_stored_password(table: str, row_id: str, column: str, password: str, old_hash: str):
+    """
+    Background task: re-hash a verified password with the current parameters
+    Only replaces old_hash (the hash the password was verified against), so a
+    password change made meanwhile is kept. Failures are logged only; the old
+    hash keeps working
+    """
+    try:
+        new_hash = await hash_password_async(password)
+        supabase = get_supabase_client()
+        response = await execute(
+            supabase.table(table).update({column: new_hash}).eq("id", row_id).eq(column, old_hash)
+        )
+        if table == "families" and response.data:
+            invalidate_family_cache(family_id=row_id)
+    except Exception as e:
+        print(f"Warning: Failed to rehash {table}.{column} for {row_id}: {str(e)}")
 
 
 # ==================== SUPERADMIN LOGIN ====================
@@ -85,7 +171,9 @@ async def superadmin_login(request: SuperAdminLoginRequest):
     Response:
         {
             "access_token": "jwt_token",
+            "refresh_token": "opaque_token",
             "token_type": "bearer",
+            "expires_in": 900,
             "user": {user_data},
             "message": "Login successful"
         }
@@ -106,16 +194,15 @@ async def superadmin_login(request: SuperAdminLoginRequest):
             "family_id": None
         }
         
-        # Generate JWT token
-        access_token = create_access_token(
+        # Generate access + refresh tokens
+        tokens = await issue_tokens(
             user_id="superadmin",
             email="admin@apnaparivar.com",
             role="super_admin"
         )
         
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **tokens,
             "user": superadmin_data,
             "message": "SuperAdmin login successful"
         }
@@ -247,7 +334,7 @@ async def check_admin_status(request_id: str):
 # ==================== FAMILY ADMIN LOGIN ====================
 
 @router.post("/admin/login")
-async def admin_login(request: LoginRequest):
+async def admin_login(request: LoginRequest, http_request: Request, background_tasks: BackgroundTasks):
     """
     Family admin login with email and password
     Only works if admin is approved
@@ -261,7 +348,9 @@ async def admin_login(request: LoginRequest):
     Response:
         {
             "access_token": "jwt_token",
+            "refresh_token": "opaque_token",
             "token_type": "bearer",
+            "expires_in": 900,
             "user": {user_data}
         }
     """
@@ -269,7 +358,7 @@ async def admin_login(request: LoginRequest):
         supabase = get_supabase_client()
         
         # Get user by email
-        user_response = supabase.table("users").select("*").eq("email", request.email).eq("role", "family_admin").execute()
+        user_response = await execute(supabase.table("users").select(projection("users", "login")).eq("email", request.email).eq("role", "family_admin"))
         
         if not user_response.data:
             raise HTTPException(
@@ -294,23 +383,30 @@ async def admin_login(request: LoginRequest):
         
         # Verify password
         password_hash = user_data.get("password_hash")
-        if not PasswordHashingService.verify_password(request.password, password_hash):
+        if not await verify_login_password(request.password, password_hash, http_request):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
         
-        # Generate JWT token
-        access_token = create_access_token(
+        # Upgrade outdated hash parameters after the response is sent
+        if PasswordHashingService.needs_rehash(password_hash):
+            background_tasks.add_task(
+                rehash_stored_password, "users", user_data.get("id"), "password_hash", request.password, password_hash
+            )
+        
+        # Generate access + refresh tokens
+        tokens = await issue_tokens(
             user_id=user_data.get("id"),
             email=user_data.get("email"),
             role=user_data.get("role"),
             family_id=user_data.get("family_id")
         )
         
+        # The login projection includes the password hash; never return it
+        user_data = {key: value for key, value in user_data.items() if key != "password_hash"}
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **tokens,
             "user": user_data,
             "message": "Login successful"
         }
@@ -324,10 +420,110 @@ async def admin_login(request: LoginRequest):
         )
 
 
+@router.post("/admin/change-password")
+async def change_admin_password(
+    request: AdminPasswordChangeRequest,
+    current_user: dict = Depends(get_auth_user)
+):
+    """
+    Family admin changes their password
+    The data keys of the admin's families are rewrapped with the new password
+    first, so the family password stays retrievable; if the password itself
+    can't be stored afterwards, they are rewrapped back
+    
+    Request:
+        {
+            "current_password": "SecurePassword123",
+            "new_password": "NewSecurePassword456",
+            "confirm_password": "NewSecurePassword456"
+        }
+    
+    Response:
+        {
+            "message": "Password changed successfully",
+            "rotated_count": 1,
+            "migrated_count": 0,
+            "total": 1
+        }
+    """
+    try:
+        if current_user.get("role") != "family_admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only family admins can change their password here"
+            )
+        
+        if request.new_password != request.confirm_password:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Passwords do not match"
+            )
+        
+        if len(request.new_password) < 8:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Password must be at least 8 characters"
+            )
+        
+        supabase = get_supabase_client()
+        user_id = current_user.get("user_id")
+        user_response = await execute(supabase.table("users").select(projection("users", "password")).eq("id", user_id))
+        if not user_response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        
+        password_hash = user_response.data[0].get("password_hash")
+        if not await verify_password_async(request.current_password, password_hash):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid current password"
+            )
+        
+        family_service = FamilyService(supabase)
+        rotation = await family_service.rotate_family_keys(user_id, request.current_password, request.new_password)
+        
+        # Only replace the hash the password was verified against, so two
+        # concurrent changes can't leave the keys wrapped with the losing one
+        new_hash = await hash_password_async(request.new_password)
+        try:
+            response = await execute(
+                supabase.table("users").update({"password_hash": new_hash}).eq("id", user_id).eq("password_hash", password_hash)
+            )
+            stored = bool(response.data)
+        except Exception:
+            await family_service.rotate_family_keys(user_id, request.new_password, request.current_password)
+            raise
+        if not stored:
+            await family_service.rotate_family_keys(user_id, request.new_password, request.current_password)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Password was changed meanwhile, please try again"
+            )
+        
+        return {
+            "message": "Password changed successfully",
+            **rotation
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error changing password: {str(e)}"
+        )
+
+
 # ==================== FAMILY MEMBER LOGIN ====================
 
 @router.post("/member/login")
-async def family_member_login(request: FamilyMemberLoginRequest):
+async def family_member_login(
+    request: FamilyMemberLoginRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks
+):
     """
     Family member login with email + family name + family password
     
@@ -341,54 +537,52 @@ async def family_member_login(request: FamilyMemberLoginRequest):
     Response:
         {
             "access_token": "jwt_token",
+            "refresh_token": "opaque_token",
             "token_type": "bearer",
+            "expires_in": 900,
             "user": {user_data}
         }
     """
     try:
         supabase = get_supabase_client()
         
-        # Get family by name
-        family_response = supabase.table("families").select("*").eq("family_name", request.family_name).execute()
+        # Get family by name (cached, login columns only)
+        family_data = await FamilyService(supabase).get_family_for_login(request.family_name)
         
-        if not family_response.data:
+        if not family_data:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid family name or credentials"
             )
         
-        family_data = family_response.data[0]
         family_id = family_data.get("id")
         
         # Verify family password using hash
         family_password_hash = family_data.get("family_password_hash")
         if family_password_hash:
-            if not PasswordHashingService.verify_password(request.family_password, family_password_hash):
+            if not await verify_login_password(
+                request.family_password,
+                family_password_hash,
+                http_request,
+                family_key=family_id
+            ):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid credentials or not a member of this family"
                 )
+            if PasswordHashingService.needs_rehash(family_password_hash):
+                background_tasks.add_task(
+                    rehash_stored_password, "families", family_id, "family_password_hash", request.family_password,
+                    family_password_hash
+                )
         else:
             # Fallback: if hash doesn't exist, skip password verification for backward compatibility
             # But this should be fixed in production
             pass
         
-        # Check if member exists in family_members table with this email
-        members_response = supabase.table("family_members").select("*").eq("family_id", family_id).execute()
-        
-        if not members_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid credentials or not a member of this family"
-            )
-        
-        # Find member with matching email in relationships
-        member_data = None
-        for member in members_response.data:
-            relationships = member.get("relationships", {})
-            if isinstance(relationships, dict) and relationships.get("email") == request.email:
-                member_data = member
-                break
+        # Indexed lookup on (family_id, email)
+        member_service = FamilyMemberService(supabase)
+        member_data = await member_service.get_family_member_by_email(family_id, request.email)
         
         if not member_data:
             raise HTTPException(
@@ -407,8 +601,8 @@ async def family_member_login(request: FamilyMemberLoginRequest):
             "approval_status": "approved"
         }
         
-        # Generate JWT token for family member
-        access_token = create_access_token(
+        # Generate access + refresh tokens for family member
+        tokens = await issue_tokens(
             user_id=member_data.get("id"),  # Use member_id as user_id
             email=member_email,
             role="family_user",
@@ -416,8 +610,7 @@ async def family_member_login(request: FamilyMemberLoginRequest):
         )
         
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **tokens,
             "user": user_data,
             "message": "Login successful"
         }
@@ -539,6 +732,7 @@ async def get_all_requests(current_user: dict = Depends(get_auth_user)):
 @router.post("/admin/request/approve")
 async def approve_admin_request(
     request: AdminApprovalRequest,
+    background: bool = Query(False, description="Approve in a background job and return 202 with its ID"),
     current_user: dict = Depends(get_auth_user)
 ):
     """
@@ -559,6 +753,9 @@ async def approve_admin_request(
             "family_id": "uuid",
             "email": "admin@family.com"
         }
+    
+    With ?background=true: 202 {"job_id", "status", "status_url"}, and the
+    response above becomes the job's result.
     """
     try:
         # Check if user is SuperAdmin
@@ -574,6 +771,14 @@ async def approve_admin_request(
                 detail="Invalid action"
             )
         
+        if background:
+            job = await get_job_runner().submit(
+                "admin_approval",
+                {"request_id": request.request_id, "superadmin_user_id": current_user.get("user_id")},
+                created_by=current_user.get("user_id")
+            )
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job_accepted(job))
+        
         supabase = get_supabase_client()
         service = AdminOnboardingService(supabase)
         
@@ -680,6 +885,8 @@ async def verify_auth_token(authorization: Optional[str] = Header(None)):
             raise HTTPException(status_code=401, detail="Invalid authorization header format")
         
         payload = verify_token(token)
+        if get_revocation_filter().is_revoked(payload.get("jti")):
+            raise HTTPException(status_code=401, detail="Token revoked")
         
         return {
             "user_id": payload.get("user_id"),
@@ -697,10 +904,67 @@ async def verify_auth_token(authorization: Optional[str] = Header(None)):
         )
 
 
+@router.post("/refresh")
+async def refresh_tokens(request: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access token and refresh token
+    The presented refresh token is rotated and cannot be used again
+    
+    Request:
+        {
+            "refresh_token": "opaque_token"
+        }
+    
+    Response:
+        {
+            "access_token": "jwt_token",
+            "refresh_token": "new_opaque_token",
+            "token_type": "bearer",
+            "expires_in": 900
+        }
+    """
+    try:
+        token_service = TokenService(get_supabase_client())
+        user, new_refresh_token = await token_service.rotate_refresh_token(request.refresh_token)
+        
+        access_token = create_access_token(
+            user_id=user.get("user_id"),
+            email=user.get("email"),
+            role=user.get("role"),
+            family_id=user.get("family_id")
+        )
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": new_refresh_token,
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_EXPIRATION_MINUTES * 60
+        }
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Token refresh failed: {str(e)}"
+        )
+
+
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_auth_user)):
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    current_user: dict = Depends(get_auth_user)
+):
     """
-    Logout user (client-side token deletion is also recommended)
+    Logout user: revokes the current access token and, if given, the refresh token chain
+    
+    Request (optional):
+        {
+            "refresh_token": "opaque_token"
+        }
     
     Response:
         {
@@ -708,6 +972,17 @@ async def logout(current_user: dict = Depends(get_auth_user)):
             "status": "success"
         }
     """
+    try:
+        token_service = TokenService(get_supabase_client())
+        await token_service.revoke_access_token(current_user)
+        if request and request.refresh_token:
+            await token_service.revoke_refresh_token(request.refresh_token)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Logout failed: {str(e)}"
+        )
+    
     return {
         "message": "Logout successful",
         "status": "success"
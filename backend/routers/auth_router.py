@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr
 from supabase import Client
-from core.database import get_supabase_client
+from core.database import call, execute, get_supabase_client
+from core.projections import projection
 from schemas.user import UserResponse
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -43,7 +44,7 @@ async def signup(request: SignupRequest):
         supabase: Client = get_supabase_client()
         
         # Check if user already exists in our database
-        user_check = supabase.table("users").select("*").eq("email", request.email).execute()
+        user_check = await execute(supabase.table("users").select(projection("users", "exists")).eq("email", request.email))
         if user_check.data:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -52,7 +53,7 @@ async def signup(request: SignupRequest):
         
         # Send magic link via Supabase OTP with should_create_user=True
         # This will both create the auth user and trigger the magic link email
-        response = supabase.auth.sign_in_with_otp({
+        response = await call(supabase.auth.sign_in_with_otp, {
             "email": request.email,
             "options": {
                 "email_redirect_to": "http://localhost:3000/auth/callback",
@@ -103,7 +104,7 @@ async def send_magic_link(request: EmailRequest):
         
         # Send magic link via Supabase OTP (One-Time Password via email)
         # Note: The redirect_to URL will have the token appended as #access_token, #refresh_token, #type
-        response = supabase.auth.sign_in_with_otp({
+        response = await call(supabase.auth.sign_in_with_otp, {
             "email": request.email,
             "options": {
                 "email_redirect_to": "http://localhost:3000/auth/callback",  # Frontend callback URL
@@ -148,7 +149,7 @@ async def verify_magic_link(request: MagicLinkVerificationRequest):
         supabase: Client = get_supabase_client()
         
         # Verify OTP token with Supabase
-        response = supabase.auth.verify_otp({
+        response = await call(supabase.auth.verify_otp, {
             "email": request.email,
             "token": request.token,
             "type": "email"
@@ -164,7 +165,7 @@ async def verify_magic_link(request: MagicLinkVerificationRequest):
         email = response.user.email
         
         # Check if user already exists in database
-        user_response = supabase.table("users").select("*").eq("id", user_id).execute()
+        user_response = await execute(supabase.table("users").select(projection("users", "detail")).eq("id", user_id))
         user_data = user_response.data[0] if user_response.data else None
         
         # If user doesn't exist, create new user profile
@@ -176,7 +177,7 @@ async def verify_magic_link(request: MagicLinkVerificationRequest):
                 "family_id": None
             }
             
-            db_response = supabase.table("users").insert(new_user_data).execute()
+            db_response = await execute(supabase.table("users").insert(new_user_data))
             user_data = db_response.data[0] if db_response.data else new_user_data
         
         # Get session tokens
@@ -215,7 +216,7 @@ async def verify_token(token: str):
         supabase: Client = get_supabase_client()
         
         # Verify token with Supabase
-        user = supabase.auth.get_user(token)
+        user = await call(supabase.auth.get_user, token)
         
         if not user:
             raise HTTPException(
@@ -224,7 +225,7 @@ async def verify_token(token: str):
             )
         
         # Get user profile from database
-        user_response = supabase.table("users").select("*").eq("id", user.user.id).execute()
+        user_response = await execute(supabase.table("users").select(projection("users", "detail")).eq("id", user.user.id))
         user_data = user_response.data[0] if user_response.data else None
         
         if not user_data:
@@ -261,7 +262,7 @@ async def logout(token: str):
         supabase: Client = get_supabase_client()
         
         # Sign out with Supabase
-        supabase.auth.sign_out()
+        await call(supabase.auth.sign_out)
         
         return {
             "message": "Logout successful",
@@ -289,7 +290,7 @@ async def get_current_user(token: str):
         supabase: Client = get_supabase_client()
         
         # Verify token
-        user = supabase.auth.get_user(token)
+        user = await call(supabase.auth.get_user, token)
         
         if not user:
             raise HTTPException(
@@ -298,7 +299,7 @@ async def get_current_user(token: str):
             )
         
         # Get user profile
-        user_response = supabase.table("users").select("*").eq("id", user.user.id).execute()
+        user_response = await execute(supabase.table("users").select(projection("users", "detail")).eq("id", user.user.id))
         user_data = user_response.data[0] if user_response.data else None
         
         if not user_data:
@@ -336,7 +337,7 @@ async def refresh_token(refresh_token: str):
         supabase: Client = get_supabase_client()
         
         # Refresh session
-        response = supabase.auth.refresh_session(refresh_token)
+        response = await call(supabase.auth.refresh_session, refresh_token)
         
         if not response or not response.session:
             raise HTTPException(
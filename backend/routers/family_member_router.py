@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import JSONResponse
 from typing import List, Optional
+from core.config import (
+    MEMBER_PAGE_DEFAULT_LIMIT, MEMBER_PAGE_MAX_LIMIT, MEMBER_SEARCH_DEFAULT_LIMIT, MEMBER_SEARCH_MAX_LIMIT
+)
 from core.database import get_supabase_client
+from core.pagination import page_headers
+from core.projections import fields_query
+from core.unit_of_work import UnitOfWork, get_unit_of_work
 from schemas.user import (
     FamilyMemberCreate, 
     FamilyMemberResponse, 
+    FamilyMemberSummary,
+    FamilyMemberSearchResult,
     FamilyMemberUpdate,
     BulkFamilyMemberCreate,
     BulkFamilyMemberResponse
@@ -12,10 +21,10 @@ from services.family_member_service import FamilyMemberService
 
 router = APIRouter(prefix="/api/family-members", tags=["family-members"])
 
-async def get_family_member_service():
+async def get_family_member_service(uow: UnitOfWork = Depends(get_unit_of_work)):
     """Dependency to get family member service"""
     supabase = get_supabase_client()
-    return FamilyMemberService(supabase)
+    return FamilyMemberService(supabase, uow)
 
 @router.post("/bulk/create", response_model=BulkFamilyMemberResponse, status_code=status.HTTP_201_CREATED)
 async def bulk_create_family_members(
@@ -80,40 +89,65 @@ async def create_family_member(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.get("/{member_id}", response_model=FamilyMemberResponse)
-async def get_family_member(member_id: str, service: FamilyMemberService = Depends(get_family_member_service)):
+async def get_family_member(
+    member_id: str,
+    columns: Optional[str] = Depends(fields_query("family_members", "detail")),
+    service: FamilyMemberService = Depends(get_family_member_service)
+):
     """Get family member by ID"""
     try:
-        member = await service.get_family_member_by_id(member_id)
+        member = await service.get_family_member_by_id(member_id, columns=columns)
         if not member:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
-        return member
+        return JSONResponse(content=member) if columns else member
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/family/{family_id}", response_model=List[FamilyMemberResponse])
+@router.get("/family/{family_id}", response_model=List[FamilyMemberSummary])
 async def get_family_members(
     family_id: str,
+    response: Response,
+    limit: int = Query(MEMBER_PAGE_DEFAULT_LIMIT, ge=1, le=MEMBER_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    sort: str = Query("name", pattern="^(name|created_at)$"),
+    include_total: bool = Query(False, description="Return the member count in X-Total-Count"),
+    columns: Optional[str] = Depends(fields_query("family_members", "list")),
     service: FamilyMemberService = Depends(get_family_member_service)
 ):
-    """Get all members in a family"""
+    """Get a page of members in a family, ordered by (sort, id)"""
     try:
-        members = await service.get_family_members(family_id)
-        return members
+        page = await service.get_family_members_page(
+            family_id, limit, cursor=cursor, sort=sort, columns=columns, include_total=include_total
+        )
+        headers = page_headers(page["next_cursor"], page["total"])
+        if columns:
+            return JSONResponse(content=page["items"], headers=headers)
+        response.headers.update(headers)
+        return page["items"]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/search/", response_model=List[FamilyMemberResponse])
+@router.get("/search/", response_model=List[FamilyMemberSearchResult])
 async def search_family_members(
     family_id: str = Query(...),
-    query: str = Query(...),
+    query: str = Query(..., max_length=200),
+    limit: int = Query(MEMBER_SEARCH_DEFAULT_LIMIT, ge=1, le=MEMBER_SEARCH_MAX_LIMIT),
+    columns: Optional[str] = Depends(fields_query("family_members", "list")),
     service: FamilyMemberService = Depends(get_family_member_service)
 ):
-    """Search family members by name"""
+    """
+    Search family members by name, best matches first
+    
+    Tolerates typos; each result has its match type, score and the
+    highlighted ranges of its name.
+    """
     try:
-        members = await service.search_family_members(family_id, query)
-        return members
+        members = await service.search_family_members(family_id, query, columns=columns, limit=limit)
+        return JSONResponse(content=members) if columns else members
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
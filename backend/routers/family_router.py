@@ -1,25 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import asyncio
+import os
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
 from pydantic import BaseModel
 from core.database import get_supabase_client
-from core.encryption import EncryptionService, PasswordHashingService
-from schemas.user import FamilyCreate, FamilyResponse, FamilyMemberCreate, FamilyMemberResponse, FamilyMemberUpdate
+from core.config import (
+    IMPORT_MAX_UPLOAD_BYTES,
+    MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT, MEMBER_AUTOCOMPLETE_MAX_LIMIT, MEMBER_PAGE_DEFAULT_LIMIT, MEMBER_PAGE_MAX_LIMIT
+)
+from core.jobs import get_job_runner, job_accepted
+from core.crypto_executor import verify_password_async, decrypt_async, envelope_decrypt_async
+from core.pagination import page_headers
+from core.projections import fields_query, projection
+from core.unit_of_work import UnitOfWork, get_unit_of_work
+from schemas.user import (
+    FamilyCreate, FamilyResponse, FamilyMemberCreate, FamilyMemberResponse, FamilyMemberSummary, FamilyMemberUpdate,
+    MemberImportResponse, BulkFamilyMemberUpdate, BulkFamilyMemberDelete, BulkMemberChangeResponse,
+    MemberAutocompleteItem
+)
 from services.family_service import FamilyService
 from services.family_member_service import FamilyMemberService
+from services.member_export_service import EXPORT_FORMATS, MemberExportService
+from services.member_import_service import MemberImportService
+from services.user_service import UserService
 # Import get_auth_user directly - it's in a different router so no circular import
 from routers.auth_new_router import get_auth_user
 
 router = APIRouter(prefix="/api/families", tags=["families"])
 
-async def get_family_service():
+async def get_family_service(uow: UnitOfWork = Depends(get_unit_of_work)):
     """Dependency to get family service"""
     supabase = get_supabase_client()
-    return FamilyService(supabase)
+    return FamilyService(supabase, uow)
 
-async def get_family_member_service():
+async def get_family_member_service(uow: UnitOfWork = Depends(get_unit_of_work)):
     """Dependency to get family member service"""
     supabase = get_supabase_client()
-    return FamilyMemberService(supabase)
+    return FamilyMemberService(supabase, uow)
+
+async def get_user_service(uow: UnitOfWork = Depends(get_unit_of_work)):
+    """Dependency to get user service"""
+    supabase = get_supabase_client()
+    return UserService(supabase, uow)
+
+async def get_member_export_service():
+    """Dependency to get member export service"""
+    supabase = get_supabase_client()
+    return MemberExportService(supabase)
+
+async def get_member_import_service():
+    """Dependency to get member import service"""
+    supabase = get_supabase_client()
+    return MemberImportService(supabase)
 
 @router.post("/", response_model=FamilyResponse, status_code=status.HTTP_201_CREATED)
 async def create_family(family: FamilyCreate, service: FamilyService = Depends(get_family_service)):
@@ -58,7 +92,7 @@ async def get_family(
                     detail="Access Denied. You can only access your own family."
                 )
         
-        family = await service.get_family_by_id(family_id)
+        family = await service.get_family_summary_by_id(family_id)
         if not family:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family not found")
         return family
@@ -91,7 +125,7 @@ async def get_all_families(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="No family associated with your account"
                 )
-            family = await service.get_family_by_id(family_id)
+            family = await service.get_family_summary_by_id(family_id)
             if not family:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -152,13 +186,23 @@ async def create_family_member(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/{family_id}/members", response_model=List[FamilyMemberResponse])
+@router.get("/{family_id}/members", response_model=List[FamilyMemberSummary])
 async def get_family_members(
     family_id: str,
+    response: Response,
+    limit: int = Query(MEMBER_PAGE_DEFAULT_LIMIT, ge=1, le=MEMBER_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    sort: str = Query("name", pattern="^(name|created_at)$"),
+    include_total: bool = Query(False, description="Return the member count in X-Total-Count"),
+    columns: Optional[str] = Depends(fields_query("family_members", "list")),
     current_user: dict = Depends(get_auth_user),
     member_service: FamilyMemberService = Depends(get_family_member_service)
 ):
-    """Get all members in a family - SuperAdmin cannot access this"""
+    """
+    Get a page of members in a family - SuperAdmin cannot access this
+    
+    Pages are ordered by (sort, id); X-Next-Cursor is set while more follow.
+    """
     try:
         user_role = current_user.get("role")
         
@@ -178,8 +222,236 @@ async def get_family_members(
                     detail="Access Denied. You can only access your own family."
                 )
         
-        members = await member_service.get_family_members(family_id)
-        return members
+        page = await member_service.get_family_members_page(
+            family_id, limit, cursor=cursor, sort=sort, columns=columns, include_total=include_total
+        )
+        headers = page_headers(page["next_cursor"], page["total"])
+        # ?fields= responses carry only the requested columns
+        if columns:
+            return JSONResponse(content=page["items"], headers=headers)
+        response.headers.update(headers)
+        return page["items"]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/{family_id}/members/export")
+async def export_family_members(
+    family_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: dict = Depends(get_auth_user),
+    export_service: MemberExportService = Depends(get_member_export_service)
+):
+    """
+    Stream every member of a family as NDJSON or CSV - SuperAdmin cannot access this
+    
+    CSV flattens relationships and custom_fields into relationships.<key> and
+    custom_fields.<key> columns.
+    """
+    try:
+        user_role = current_user.get("role")
+        
+        # SuperAdmin cannot access family members
+        if user_role == "super_admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access Denied. SuperAdmin cannot access family details. Use the admin dashboard to manage admins."
+            )
+        
+        # Family Admin and Family User can only export their own family's members
+        if user_role in ["family_admin", "family_user"]:
+            user_family_id = current_user.get("family_id")
+            if user_family_id != family_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access Denied. You can only access your own family."
+                )
+        
+        chunks = await export_service.export(family_id, format)
+        # Read the first page before responding so a failing query is still a 500
+        first = await anext(chunks, b"")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="family-{family_id}-members.{format}"'}
+    )
+
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Upload exceeds {IMPORT_MAX_UPLOAD_BYTES} bytes"
+    )
+
+async def _spool_upload(request: Request) -> str:
+    """
+    Write the request body to a temporary file (for a background job) and return its path
+    
+    Raises:
+        HTTPException: 413 once the body passes IMPORT_MAX_UPLOAD_BYTES
+    """
+    # Refuse a declared oversize body before writing anything
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > IMPORT_MAX_UPLOAD_BYTES:
+        raise _upload_too_large()
+    
+    with tempfile.NamedTemporaryFile(prefix="member-import-", delete=False) as f:
+        try:
+            # Counted as it arrives: chunked uploads have no Content-Length
+            size = 0
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > IMPORT_MAX_UPLOAD_BYTES:
+                    raise _upload_too_large()
+                f.write(chunk)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+        return f.name
+
+@router.post("/{family_id}/members/import", response_model=MemberImportResponse)
+async def import_family_members(
+    family_id: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults from Content-Type"),
+    background: bool = Query(False, description="Run as a background job and return 202 with its ID"),
+    current_user: dict = Depends(get_auth_user),
+    service: FamilyService = Depends(get_family_service),
+    import_service: MemberImportService = Depends(get_member_import_service)
+):
+    """
+    Import members from a CSV or NDJSON request body (Family Admin only)
+    
+    The body is parsed while it uploads. Valid rows are created even if
+    others fail; rejected rows are listed by row number. With
+    ?background=true the upload is spooled to disk (at most
+    IMPORT_MAX_UPLOAD_BYTES, else 413) and imported by a job; the report
+    becomes the job's result.
+    """
+    try:
+        if current_user.get("role") != "family_admin" or current_user.get("family_id") != family_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only the family admin can import family members"
+            )
+        
+        if not format:
+            content_type = request.headers.get("content-type", "")
+            format = "ndjson" if "ndjson" in content_type or "jsonlines" in content_type else "csv"
+        
+        if not await service.get_family_by_id(family_id, columns=projection("families", "exists")):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family not found")
+        
+        if background:
+            path = await _spool_upload(request)
+            try:
+                job = await get_job_runner().submit(
+                    "member_import",
+                    {"family_id": family_id, "format": format, "path": path},
+                    family_id=family_id,
+                    created_by=current_user.get("user_id")
+                )
+            except Exception:
+                os.unlink(path)
+                raise
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job_accepted(job))
+        
+        report = await import_service.import_members(family_id, request.stream(), format)
+        if not report["message"]:
+            report["message"] = f"Imported {report['created_count']} family members, {report['failed_count']} rows failed"
+        return MemberImportResponse(**report)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Import failed: {str(e)}")
+
+def _require_family_editor(current_user: dict, family_id: str):
+    if current_user.get("role") not in ("family_admin", "family_co_admin") or current_user.get("family_id") != family_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the family admin or co-admin can change family members"
+        )
+
+@router.patch("/{family_id}/members/bulk", response_model=BulkMemberChangeResponse)
+async def bulk_update_family_members(
+    family_id: str,
+    request: BulkFamilyMemberUpdate,
+    current_user: dict = Depends(get_auth_user),
+    member_service: FamilyMemberService = Depends(get_family_member_service)
+):
+    """
+    Apply partial updates to many members (Family Admin/Co-Admin only)
+    
+    Members with identical changes share one update statement, filtered on
+    the family so members of other families come back as not_found.
+    """
+    try:
+        _require_family_editor(current_user, family_id)
+        # Only the fields given for each member are changed
+        updates = [item.model_dump(exclude_unset=True) for item in request.updates]
+        return await member_service.bulk_update_family_members(family_id, updates)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.delete("/{family_id}/members/bulk", response_model=BulkMemberChangeResponse)
+async def bulk_delete_family_members(
+    family_id: str,
+    request: BulkFamilyMemberDelete,
+    current_user: dict = Depends(get_auth_user),
+    member_service: FamilyMemberService = Depends(get_family_member_service)
+):
+    """Delete many members with one statement (Family Admin/Co-Admin only)"""
+    try:
+        _require_family_editor(current_user, family_id)
+        return await member_service.bulk_delete_family_members(family_id, request.ids)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/{family_id}/members/autocomplete", response_model=List[MemberAutocompleteItem])
+async def autocomplete_family_members(
+    family_id: str,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT, ge=1, le=MEMBER_AUTOCOMPLETE_MAX_LIMIT),
+    current_user: dict = Depends(get_auth_user),
+    member_service: FamilyMemberService = Depends(get_family_member_service)
+):
+    """
+    Name suggestions for a member picker, served from this worker's memory
+    
+    Members whose name contains every word of q; names starting with q first.
+    """
+    try:
+        if current_user.get("role") == "super_admin" or current_user.get("family_id") != family_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access Denied. You can only access your own family."
+            )
+        return await member_service.autocomplete_family_members(family_id, q, limit)
     except HTTPException:
         raise
     except Exception as e:
@@ -189,6 +461,7 @@ async def get_family_members(
 async def get_family_member(
     family_id: str,
     member_id: str,
+    columns: Optional[str] = Depends(fields_query("family_members", "detail")),
     current_user: dict = Depends(get_auth_user),
     member_service: FamilyMemberService = Depends(get_family_member_service)
 ):
@@ -212,13 +485,15 @@ async def get_family_member(
                     detail="Access Denied. You can only access your own family."
                 )
         
-        member = await member_service.get_family_member_by_id(member_id)
+        if columns and "family_id" not in columns.split(", "):
+            columns += ", family_id"
+        member = await member_service.get_family_member_by_id(member_id, columns=columns)
         if not member:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
         # Verify the member belongs to the family
         if member.get('family_id') != family_id:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
-        return member
+        return JSONResponse(content=member) if columns else member
     except HTTPException:
         raise
     except Exception as e:
@@ -233,14 +508,10 @@ async def update_family_member(
 ):
     """Update family member information (Family Admin/Co-Admin only)"""
     try:
-        # Verify the member belongs to the family
-        member = await member_service.get_family_member_by_id(member_id)
-        if not member or member.get('family_id') != family_id:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
-        
         # Filter out None values
         data_dict = update_data.model_dump(exclude_unset=True)
-        updated_member = await member_service.update_family_member(member_id, data_dict)
+        # Only matches the member if it belongs to the family, so no ownership read first
+        updated_member = await member_service.update_family_member(member_id, data_dict, family_id=family_id)
         if not updated_member:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
         return updated_member
@@ -257,12 +528,9 @@ async def delete_family_member(
 ):
     """Delete a family member (Family Admin/Co-Admin only)"""
     try:
-        # Verify the member belongs to the family
-        member = await member_service.get_family_member_by_id(member_id)
-        if not member or member.get('family_id') != family_id:
+        # Only deletes the member if it belongs to the family
+        if not await member_service.delete_family_member(member_id, family_id=family_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family member not found")
-        
-        await member_service.delete_family_member(member_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -277,7 +545,8 @@ async def get_family_password(
     family_id: str,
     request: PasswordRequest,
     current_user: dict = Depends(get_auth_user),
-    service: FamilyService = Depends(get_family_service)
+    service: FamilyService = Depends(get_family_service),
+    user_service: UserService = Depends(get_user_service)
 ):
     """Retrieve family password (requires admin password to decrypt)"""
     try:
@@ -288,23 +557,19 @@ async def get_family_password(
                 detail="Only family admin can retrieve family password"
             )
         
-        # Get family data
-        family = await service.get_family_by_id(family_id)
+        # Get family data and the admin user (to verify the password) together
+        family, user_data = await asyncio.gather(
+            service.get_family_by_id(family_id, columns=projection("families", "family_password")),
+            user_service.get_user_by_id(current_user.get("user_id"), columns=projection("users", "password"))
+        )
         if not family:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Family not found")
-        
-        # Get admin user to verify password
-        supabase = get_supabase_client()
-        user_response = supabase.table("users").select("*").eq("id", current_user.get("user_id")).execute()
-        
-        if not user_response.data:
+        if not user_data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         
-        user_data = user_response.data[0]
-        
         # Verify admin password
         password_hash = user_data.get("password_hash")
-        if not PasswordHashingService.verify_password(request.admin_password, password_hash):
+        if not await verify_password_async(request.admin_password, password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid admin password"
@@ -319,7 +584,14 @@ async def get_family_password(
             )
         
         try:
-            family_password = EncryptionService.decrypt(encrypted_family_password, request.admin_password)
+            wrapped_data_key = family.get("family_data_key_wrapped")
+            if wrapped_data_key:
+                family_password = await envelope_decrypt_async(
+                    encrypted_family_password, wrapped_data_key, request.admin_password
+                )
+            else:
+                # Families created before envelope encryption
+                family_password = await decrypt_async(encrypted_family_password, request.admin_password)
             return {
                 "family_password": family_password,
                 "message": "Family password retrieved successfully"
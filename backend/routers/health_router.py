@@ -1,4 +1,14 @@
 from fastapi import APIRouter, HTTPException, status
+from core.crypto_executor import get_crypto_executor
+from core.crypto_admission import get_admission_controller
+from core.token_verifier import get_token_verifier
+from core.revocation import get_revocation_filter
+from core.database import database_metrics, http_pool_metrics
+from core.jobs import job_metrics
+from core.unit_of_work import unit_of_work_metrics
+from services.auth_identity_service import auth_identity_cache_metrics
+from services.family_member_service import member_autocomplete_metrics
+from services.family_service import family_cache_metrics
 
 router = APIRouter(tags=["health"])
 
@@ -6,3 +16,20 @@ router = APIRouter(tags=["health"])
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "ApnaParivar Backend is running"}
+
+@router.get("/health/metrics", status_code=status.HTTP_200_OK)
+async def health_metrics():
+    """Runtime metrics for this worker"""
+    return {
+        "crypto": get_crypto_executor().metrics(),
+        "crypto_admission": get_admission_controller().metrics(),
+        "token_cache": get_token_verifier().metrics(),
+        "revocation": get_revocation_filter().metrics(),
+        "family_cache": family_cache_metrics(),
+        "auth_identity_cache": auth_identity_cache_metrics(),
+        "member_autocomplete": member_autocomplete_metrics(),
+        "unit_of_work": unit_of_work_metrics(),
+        "jobs": job_metrics(),
+        "postgrest_http": http_pool_metrics(),
+        "database": database_metrics()
+    }
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from core.jobs import get_job_runner
+from routers.auth_new_router import get_auth_user
+from schemas.user import JobResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+def can_access_job(current_user: dict, job: dict) -> bool:
+    """SuperAdmin, the submitter, or the admin of the job's family"""
+    if current_user.get("role") == "super_admin":
+        return True
+    if job.get("created_by") and job.get("created_by") == current_user.get("user_id"):
+        return True
+    return (
+        current_user.get("role") == "family_admin"
+        and job.get("family_id") is not None
+        and job.get("family_id") == current_user.get("family_id")
+    )
+
+
+async def _get_accessible_job(job_id: str, current_user: dict) -> dict:
+    job = await get_job_runner().get(job_id)
+    # Not found and not yours look the same
+    if not job or not can_access_job(current_user, job):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, current_user: dict = Depends(get_auth_user)):
+    """Get a background job's status, progress and result"""
+    try:
+        return await _get_accessible_job(job_id, current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(job_id: str, current_user: dict = Depends(get_auth_user)):
+    """Cancel a queued or running job (finished jobs are returned unchanged)"""
+    try:
+        await _get_accessible_job(job_id, current_user)
+        return await get_job_runner().cancel(job_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,63 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
 from typing import Optional
-from jose import jwt, JWTError
+from fastapi import APIRouter, Depends, HTTPException, status
 
 from core.database import get_supabase_client
-from core.config import JWT_SECRET_KEY, JWT_ALGORITHM
+from core.projections import fields_query
+from core.unit_of_work import UnitOfWork, get_unit_of_work
+# Shared with the family routes so each token is verified once and cached
+from routers.auth_new_router import get_auth_user
 from schemas.user import UserCreate, UserResponse, UserBase, CoAdminInviteRequest, CoAdminInviteResponse
 from services.user_service import UserService
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
-async def get_user_service():
+async def get_user_service(uow: UnitOfWork = Depends(get_unit_of_work)):
     """Dependency to get user service"""
     supabase = get_supabase_client()
-    return UserService(supabase)
+    return UserService(supabase, uow)
 
-def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
-    """Extract user ID from Authorization header"""
-    if not authorization:
+async def get_current_user_id(current_user: dict = Depends(get_auth_user)) -> str:
+    """Extract user ID from the verified Authorization header"""
+    user_id = current_user.get("user_id")
+    if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing authorization header"
+            detail="Invalid token payload"
         )
     
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication scheme"
-            )
-        
-        # Verify JWT token
-        try:
-            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        except JWTError as e:
-            if "expired" in str(e).lower():
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token expired"
-                )
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token"
-                )
-        
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-        
-        return user_id
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authorization header format"
-        )
+    return user_id
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
@@ -66,7 +34,7 @@ async def get_current_user(
 ):
     """Get current authenticated user profile"""
     try:
-        user = service.get_user_by_id(user_id)
+        user = await service.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         return user
@@ -84,7 +52,7 @@ async def create_self_user(
     """Create authenticated user's own profile after magic link login"""
     try:
         # Check if user already exists
-        existing_user = service.get_user_by_id(user_id)
+        existing_user = await service.get_user_by_id(user_id)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -92,7 +60,7 @@ async def create_self_user(
             )
         
         # Create user record with the authenticated user's ID
-        new_user = service.create_user(user_id, user_data.email, user_data.role or "family_user")
+        new_user = await service.create_user(user_id, user_data.email, user_data.role or "family_user")
         if not new_user:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -109,7 +77,7 @@ async def create_self_user(
 async def create_user(user: UserCreate, service: UserService = Depends(get_user_service)):
     """Create a new user (SuperAdmin only)"""
     try:
-        existing_user = service.get_user_by_email(user.email)
+        existing_user = await service.get_user_by_email(user.email)
         if existing_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
         
@@ -118,7 +86,7 @@ async def create_user(user: UserCreate, service: UserService = Depends(get_user_
         import uuid
         user_id = str(uuid.uuid4())
         
-        new_user = service.create_user(user_id, user.email, user.role)
+        new_user = await service.create_user(user_id, user.email, user.role)
         if not new_user:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
         
@@ -132,7 +100,7 @@ async def create_user(user: UserCreate, service: UserService = Depends(get_user_
 async def get_user(user_id: str, service: UserService = Depends(get_user_service)):
     """Get user by ID"""
     try:
-        user = service.get_user_by_id(user_id)
+        user = await service.get_user_by_id(user_id)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         return user
@@ -142,10 +110,14 @@ async def get_user(user_id: str, service: UserService = Depends(get_user_service
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.get("/", response_model=list)
-async def get_family_users(family_id: str, service: UserService = Depends(get_user_service)):
+async def get_family_users(
+    family_id: str,
+    columns: Optional[str] = Depends(fields_query("users", "list")),
+    service: UserService = Depends(get_user_service)
+):
     """Get all users in a family"""
     try:
-        users = service.get_family_users(family_id)
+        users = await service.get_family_users(family_id, columns=columns)
         return users
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -154,7 +126,7 @@ async def get_family_users(family_id: str, service: UserService = Depends(get_us
 async def update_user(user_id: str, update_data: dict, service: UserService = Depends(get_user_service)):
     """Update user information"""
     try:
-        updated_user = service.update_user(user_id, update_data)
+        updated_user = await service.update_user(user_id, update_data)
         if not updated_user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
         return updated_user
@@ -167,7 +139,7 @@ async def update_user(user_id: str, update_data: dict, service: UserService = De
 async def delete_user(user_id: str, service: UserService = Depends(get_user_service)):
     """Delete a user"""
     try:
-        service.delete_user(user_id)
+        await service.delete_user(user_id)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -182,7 +154,7 @@ async def invite_co_admin(
         print(f"[DEBUG] Invite co-admin request: user_id={user_id}, family_id={request.family_id}, email={request.email}")
         
         # Verify that the current user is a family_admin
-        current_user = service.get_user_by_id(user_id)
+        current_user = await service.get_user_by_id(user_id)
         print(f"[DEBUG] Current user: {current_user}")
         
         if not current_user or current_user.get("role") != "family_admin":
@@ -199,14 +171,14 @@ async def invite_co_admin(
             )
         
         # Check if user already exists
-        existing_user = service.get_user_by_email(request.email)
+        existing_user = await service.get_user_by_email(request.email)
         print(f"[DEBUG] Existing user check: {existing_user}")
         
         if existing_user:
             # User exists, update their role if needed
             if existing_user.get("family_id") == request.family_id:
                 # Update role to co-admin
-                service.update_user(existing_user["id"], {"role": request.role})
+                await service.update_user(existing_user["id"], {"role": request.role})
                 return CoAdminInviteResponse(
                     success=True,
                     message=f"User {request.email} is now a co-admin",
@@ -223,7 +195,7 @@ async def invite_co_admin(
         new_user_id = str(uuid.uuid4())
         print(f"[DEBUG] Creating new co-admin user: {new_user_id}")
         
-        new_user = service.create_user(
+        new_user = await service.create_user(
             user_id=new_user_id,
             email=request.email,
             role=request.role,
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from core.signing_keys import get_key_ring
+
+router = APIRouter(prefix="/.well-known", tags=["well-known"])
+
+@router.get("/jwks.json")
+async def jwks(response: Response):
+    """Public keys for verifying access tokens offline"""
+    # Short cache so verifiers pick up newly introduced keys before they become active
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return get_key_ring().jwks()
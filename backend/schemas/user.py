@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel, EmailStr
 
 # User Schemas
@@ -60,7 +60,34 @@ class FamilyMemberResponse(FamilyMemberBase):
     class Config:
         from_attributes = True
 
+class FamilyMemberSummary(BaseModel):
+    """Family member as listed (custom fields only on the member detail)"""
+    id: str
+    family_id: str
+    name: str
+    photo_url: Optional[str] = None
+    relationships: dict = {}
+    created_at: str
+    updated_at: str
+
+    class Config:
+        from_attributes = True
+
 # Bulk Family Member Operations
+class FamilyMemberSearchResult(FamilyMemberSummary):
+    """Family member search hit, best first"""
+    match: str  # exact, prefix, substring, fuzzy
+    score: float  # Trigram similarity of name and query, 0-1
+    highlights: List[List[int]] = []  # [start, end) ranges of name that matched
+
+class MemberAutocompleteItem(BaseModel):
+    """Family member name suggestion"""
+    id: str
+    name: str
+    photo_url: Optional[str] = None
+    match: str  # exact, prefix, substring, words (every word of q, in another order)
+    highlights: List[List[int]] = []  # [start, end) ranges of name that matched
+
 class BulkFamilyMemberCreate(BaseModel):
     """Schema for creating multiple family members at once"""
     members: List[FamilyMemberCreate]
@@ -72,6 +99,59 @@ class BulkFamilyMemberResponse(BaseModel):
     failed_count: int
     member_ids: List[str]
     message: Optional[str] = None
+
+class MemberImportError(BaseModel):
+    """A rejected import row (1-based, not counting the CSV header)"""
+    row: int
+    error: str
+
+class FamilyMemberBulkUpdateItem(FamilyMemberUpdate):
+    """Partial update of one member; only the fields given are changed"""
+    id: str
+
+class BulkFamilyMemberUpdate(BaseModel):
+    updates: List[FamilyMemberBulkUpdateItem]
+
+class BulkFamilyMemberDelete(BaseModel):
+    ids: List[str]
+
+class BulkMemberOutcome(BaseModel):
+    id: str
+    status: str  # updated, deleted, not_found, failed
+    error: Optional[str] = None
+
+class BulkMemberChangeResponse(BaseModel):
+    """Per-ID outcome of a bulk update or delete"""
+    requested_count: int
+    succeeded_count: int
+    not_found_count: int
+    failed_count: int
+    results: List[BulkMemberOutcome]
+
+class JobResponse(BaseModel):
+    """Status of a background job"""
+    id: str
+    job_type: str
+    status: str
+    family_id: Optional[str] = None
+    progress_done: int = 0
+    progress_total: Optional[int] = None
+    attempts: int = 0
+    max_attempts: int = 1
+    cancel_requested: bool = False
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class MemberImportResponse(BaseModel):
+    """Result of a streamed family member import"""
+    created_count: int
+    failed_count: int
+    errors: List[MemberImportError]
+    errors_truncated: bool = False
+    message: Optional[str] = None
     
 # Auth Schemas
 class LoginRequest(BaseModel):
@@ -84,6 +164,14 @@ class AuthResponse(BaseModel):
     token_type: str
     user: UserResponse
 
+class RefreshTokenRequest(BaseModel):
+    """Exchange a refresh token for a new token pair"""
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    """Optional refresh token to revoke on logout"""
+    refresh_token: Optional[str] = None
+
 # SuperAdmin Login
 class SuperAdminLoginRequest(BaseModel):
     """SuperAdmin login with hardcoded credentials"""
@@ -108,6 +196,12 @@ class AdminOnboardingResponse(BaseModel):
     family_password: Optional[str] = None  # Only shown on creation
     rejection_reason: Optional[str] = None
 
+class AdminPasswordChangeRequest(BaseModel):
+    """Family admin password change; the family data keys are rewrapped with it"""
+    current_password: str
+    new_password: str
+    confirm_password: str
+
 # Family Member Login
 class FamilyMemberLoginRequest(BaseModel):
     """Family member login with email + family name + family password"""
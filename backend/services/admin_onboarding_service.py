@@ -3,12 +3,24 @@ Service for managing admin onboarding requests
 Handles creation, approval, and rejection of family admin requests
 """
 
+import asyncio
 from typing import Optional, List
 from supabase import Client
+from core.database import call, execute, get_supabase_client, is_missing_function
+from core.jobs import JobContext, job_handler
+from core.projections import projection
 from datetime import datetime
-from core.encryption import EncryptionService, PasswordHashingService
+from core.crypto_executor import envelope_encrypt_async, hash_password_async
+from services.auth_identity_service import AuthIdentityService
+from services.family_member_service import FamilyMemberService
+from services.family_service import invalidate_family_cache
 import uuid
 
+# Set once a worker learns approve_admin_request() isn't installed (sql/approve_admin_request.sql)
+_approval_rpc_missing = False
+# Set once a worker learns register_admin_request() isn't installed (sql/register_admin_request.sql)
+_registration_rpc_missing = False
+
 
 class AdminOnboardingService:
     """Service for managing admin onboarding workflow"""
@@ -38,136 +50,158 @@ class AdminOnboardingService:
             Created request data
         """
         try:
-            # Check if family_name already exists
-            family_check = self.supabase.table("families").select("*").eq("family_name", family_name).execute()
-            if family_check.data:
-                raise ValueError("Family name already exists")
-            
-            # Check if email is already requested or registered
-            email_check = self.supabase.table("admin_onboarding_requests").select("*").eq("email", email).eq("status", "pending").execute()
-            if email_check.data:
-                raise ValueError("Request already exists for this email")
-            
-            # Note: We don't check if email exists in auth or users table here
-            # because the user might be trying to register with an existing auth email
-            # This will be handled during approval
-            
             # Validate family password (minimum requirements)
             if len(family_password) < 4:
                 raise ValueError("Family password must be at least 4 characters long")
             
-            # Encrypt family password using admin password as key
-            encrypted_family_password = EncryptionService.encrypt(family_password, admin_password)
-            
-            # Also hash the family password for verification during member login
-            # This allows us to verify without needing the admin password
-            family_password_hash = PasswordHashingService.hash_password(family_password)
+            # The uniqueness pre-checks (fail fast, before creating the auth user) and the
+            # three key derivations are independent, so run them all at once:
+            # - family password encrypted under a per-family data key wrapped by the admin password
+            # - family password hash, to verify member logins without the admin password
+            # - admin password hash for storage
+            # Note: We don't check if email exists in auth or users table here
+            # because the user might be trying to register with an existing auth email
+            (
+                family_check,
+                email_check,
+                (encrypted_family_password, family_data_key_wrapped),
+                family_password_hash,
+                password_hash
+            ) = await asyncio.gather(
+                execute(self.supabase.table("families").select(projection("families", "exists")).eq("family_name", family_name)),
+                execute(self.supabase.table("admin_onboarding_requests").select(projection("admin_onboarding_requests", "exists")).eq("email", email).eq("status", "pending")),
+                envelope_encrypt_async(family_password, admin_password),
+                hash_password_async(family_password),
+                hash_password_async(admin_password)
+            )
             
-            # Hash the admin password for storage
-            password_hash = PasswordHashingService.hash_password(admin_password)
+            if family_check.data:
+                raise ValueError("Family name already exists")
+            if email_check.data:
+                raise ValueError("Request already exists for this email")
             
             # Create the Supabase Auth user immediately (not waiting for approval)
             # This way the user exists in auth.users and we can create them in users table
+            identities = AuthIdentityService(self.supabase)
             try:
-                created = self.supabase.auth.admin.create_user({
+                created = await call(self.supabase.auth.admin.create_user, {
                     "email": email,
                     "password": admin_password,
                     "email_confirm": True,
                 })
                 user_id = created.user.id
+                identities.remember(email, user_id)
             except Exception as create_error:
                 error_str = str(create_error).lower()
-                # If email already exists in auth, try to find the user ID
+                # If email already exists in auth, resolve the existing user's ID
                 if "already" in error_str and ("registered" in error_str or "exists" in error_str):
-                    # Try to get the auth user by listing and searching
-                    try:
-                        list_response = self.supabase.auth.admin.list_users()
-                        auth_user = None
-                        
-                        # Handle different response structures
-                        users_list = []
-                        if hasattr(list_response, "users"):
-                            users_list = list_response.users
-                        elif hasattr(list_response, "data"):
-                            if hasattr(list_response.data, "users"):
-                                users_list = list_response.data.users
-                            elif isinstance(list_response.data, list):
-                                users_list = list_response.data
-                        
-                        # Search for user by email
-                        for u in users_list:
-                            user_email = getattr(u, "email", None) or u.get("email") if isinstance(u, dict) else None
-                            if user_email == email:
-                                auth_user = u
-                                break
-                        
-                        if auth_user:
-                            # Extract user ID
-                            if hasattr(auth_user, "id"):
-                                user_id = auth_user.id
-                            elif isinstance(auth_user, dict):
-                                user_id = auth_user.get("id")
-                            else:
-                                raise ValueError(f"Could not extract user ID from auth user object")
-                        else:
-                            raise ValueError(
-                                f"Email {email} is already registered in authentication system, "
-                                "but we cannot retrieve the user ID. Please contact support."
-                            )
-                    except Exception as list_error:
+                    user_id = await identities.get_user_id_by_email(email)
+                    if not user_id:
                         raise ValueError(
-                            f"Email {email} is already registered. Cannot retrieve user ID: {str(list_error)}"
+                            f"Email {email} is already registered in authentication system, "
+                            "but we cannot retrieve the user ID. Please contact support."
                         )
                 else:
                     raise ValueError(f"Failed to create auth user: {str(create_error)}")
             
-            # Create user record in users table with pending status
-            # This way the user exists from registration, not just after approval
-            user_data = {
-                "id": user_id,
-                "email": email,
-                "full_name": full_name,
-                "role": "family_admin",
-                "approval_status": "pending",
-                "password_hash": password_hash,
-                "family_id": None  # Will be set after approval
-            }
-            
-            # Check if user already exists (in case of duplicate registration attempt)
-            existing_user = self.supabase.table("users").select("*").eq("id", user_id).execute()
-            if existing_user.data:
-                raise ValueError("User already exists. Please check your approval status or contact support.")
-            
-            user_response = self.supabase.table("users").insert(user_data).execute()
-            
-            if not user_response.data:
-                raise Exception("Failed to create user record")
-            
-            # Create the onboarding request
-            request_data = {
-                "email": email,
-                "full_name": full_name,
-                "family_name": family_name,
-                "family_password_encrypted": encrypted_family_password,
-                "family_password_hash": family_password_hash,  # Store hash for verification
-                "user_id": user_id,  # Link to the user we just created
-                "status": "pending"
+            request_id = await self._register_request(
+                user_id=user_id,
+                email=email,
+                full_name=full_name,
+                family_name=family_name,
+                password_hash=password_hash,
+                encrypted_family_password=encrypted_family_password,
+                family_data_key_wrapped=family_data_key_wrapped,
+                family_password_hash=family_password_hash
+            )
+            return {
+                "request_id": request_id,
+                "status": "pending",
+                "message": "Admin onboarding request created. Awaiting SuperAdmin approval."
             }
-            
-            response = self.supabase.table("admin_onboarding_requests").insert(request_data).execute()
-            
-            if response.data:
-                return {
-                    "request_id": response.data[0].get("id"),
-                    "status": "pending",
-                    "message": "Admin onboarding request created. Awaiting SuperAdmin approval."
-                }
-            else:
-                raise Exception("Failed to create request")
         
         except Exception as e:
             raise Exception(f"Error creating onboarding request: {str(e)}")
     
+    async def _register_request(
+        self,
+        user_id: str,
+        email: str,
+        full_name: str,
+        family_name: str,
+        password_hash: str,
+        encrypted_family_password: str,
+        family_data_key_wrapped: str,
+        family_password_hash: str
+    ) -> str:
+        """
+        Insert the pending user and the onboarding request, atomically via
+        register_admin_request() when it is installed
+        
+        Returns:
+            The new request ID
+        """
+        global _registration_rpc_missing
+        
+        if not _registration_rpc_missing:
+            try:
+                response = await execute(self.supabase.rpc("register_admin_request", {
+                    "p_user_id": user_id,
+                    "p_email": email,
+                    "p_full_name": full_name,
+                    "p_family_name": family_name,
+                    "p_password_hash": password_hash,
+                    "p_family_password_encrypted": encrypted_family_password,
+                    "p_family_data_key_wrapped": family_data_key_wrapped,
+                    "p_family_password_hash": family_password_hash
+                }))
+                return response.data.get("request_id")
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise ValueError(getattr(e, "message", None) or str(e))
+                print("Warning: register_admin_request() not installed, using separate inserts")
+                _registration_rpc_missing = True
+        
+        # Create user record in users table with pending status
+        # This way the user exists from registration, not just after approval
+        user_data = {
+            "id": user_id,
+            "email": email,
+            "full_name": full_name,
+            "role": "family_admin",
+            "approval_status": "pending",
+            "password_hash": password_hash,
+            "family_id": None  # Will be set after approval
+        }
+        
+        # Check if user already exists (in case of duplicate registration attempt)
+        existing_user = await execute(self.supabase.table("users").select(projection("users", "exists")).eq("id", user_id))
+        if existing_user.data:
+            raise ValueError("User already exists. Please check your approval status or contact support.")
+        
+        user_response = await execute(self.supabase.table("users").insert(user_data))
+        
+        if not user_response.data:
+            raise Exception("Failed to create user record")
+        
+        # Create the onboarding request
+        request_data = {
+            "email": email,
+            "full_name": full_name,
+            "family_name": family_name,
+            "family_password_encrypted": encrypted_family_password,
+            "family_data_key_wrapped": family_data_key_wrapped,
+            "family_password_hash": family_password_hash,  # Store hash for verification
+            "user_id": user_id,  # Link to the user we just created
+            "status": "pending"
+        }
+        
+        response = await execute(self.supabase.table("admin_onboarding_requests").insert(request_data))
+        
+        if not response.data:
+            raise Exception("Failed to create request")
+        return response.data[0].get("id")
+    
     async def get_pending_requests(self) -> List[dict]:
         """
         Get all pending admin onboarding requests
@@ -176,7 +210,7 @@ class AdminOnboardingService:
             List of pending requests
         """
         try:
-            response = self.supabase.table("admin_onboarding_requests").select("*").eq("status", "pending").order("requested_at", desc=True).execute()
+            response = await execute(self.supabase.table("admin_onboarding_requests").select(projection("admin_onboarding_requests", "list")).eq("status", "pending").order("requested_at", desc=True))
             
             # Remove sensitive fields like encrypted passwords before returning
             requests = []
@@ -204,7 +238,7 @@ class AdminOnboardingService:
             List of all requests
         """
         try:
-            response = self.supabase.table("admin_onboarding_requests").select("*").order("requested_at", desc=True).execute()
+            response = await execute(self.supabase.table("admin_onboarding_requests").select(projection("admin_onboarding_requests", "list")).order("requested_at", desc=True))
             
             # Remove sensitive fields like encrypted passwords before returning
             requests = []
@@ -224,18 +258,20 @@ class AdminOnboardingService:
         except Exception as e:
             raise Exception(f"Error fetching all requests: {str(e)}")
     
-    async def get_request_by_id(self, request_id: str) -> Optional[dict]:
+    async def get_request_by_id(self, request_id: str, columns: Optional[str] = None) -> Optional[dict]:
         """
         Get a specific onboarding request by ID
         
         Args:
             request_id: The request ID
+            columns: Projection to select (detail columns if omitted)
         
         Returns:
             Request data or None
         """
         try:
-            response = self.supabase.table("admin_onboarding_requests").select("*").eq("id", request_id).execute()
+            columns = columns or projection("admin_onboarding_requests", "detail")
+            response = await execute(self.supabase.table("admin_onboarding_requests").select(columns).eq("id", request_id))
             return response.data[0] if response.data else None
         
         except Exception as e:
@@ -257,9 +293,39 @@ class AdminOnboardingService:
         Returns:
             Success response with user and family data
         """
+        global _approval_rpc_missing
+        
+        # Note: If superadmin_user_id is "superadmin" (not a UUID), set reviewed_by to NULL
+        # since superadmin doesn't exist in the users table
+        reviewed_by = None if superadmin_user_id == "superadmin" else superadmin_user_id
+        
+        if not _approval_rpc_missing:
+            try:
+                # One round trip, one transaction
+                response = await execute(self.supabase.rpc("approve_admin_request", {
+                    "p_request_id": request_id,
+                    "p_reviewed_by": reviewed_by
+                }))
+                result = response.data
+                invalidate_family_cache(family_id=result.get("family_id"), family_name=result.get("family_name"))
+                return result
+            except Exception as e:
+                if not is_missing_function(e):
+                    message = getattr(e, "message", None) or str(e)
+                    # RAISE EXCEPTION in the function: the request itself can't be approved
+                    if (getattr(e, "code", None) or getattr(e, "sqlstate", None)) == "P0001":
+                        raise ValueError(message)
+                    raise Exception(f"Error approving request: {message}")
+                print("Warning: approve_admin_request() not installed, using multi-call approval")
+                _approval_rpc_missing = True
+        
+        return await self._approve_request_multi_call(request_id, reviewed_by)
+    
+    async def _approve_request_multi_call(self, request_id: str, reviewed_by: Optional[str]) -> dict:
+        """Approval as separate PostgREST calls (no atomicity; fallback for databases without the RPC)"""
         try:
             # Get the request
-            request = await self.get_request_by_id(request_id)
+            request = await self.get_request_by_id(request_id, columns=projection("admin_onboarding_requests", "approval"))
             if not request:
                 raise ValueError("Request not found")
             
@@ -278,7 +344,7 @@ class AdminOnboardingService:
                 raise ValueError("Request is missing user_id. This should have been created during registration.")
             
             # Verify the user exists in our users table (should exist from registration)
-            existing_user = self.supabase.table("users").select("*").eq("id", user_id).execute()
+            existing_user = await execute(self.supabase.table("users").select(projection("users", "login")).eq("id", user_id))
             
             if not existing_user.data:
                 raise ValueError(f"User with ID {user_id} not found in users table. This should not happen.")
@@ -305,14 +371,18 @@ class AdminOnboardingService:
                 "family_name": family_name,
                 "admin_user_id": user_id,
                 "family_password_encrypted": encrypted_family_password,
+                "family_data_key_wrapped": request.get("family_data_key_wrapped"),
                 "family_password_hash": family_password_hash  # Store hash for member login verification
             }
             
-            family_response = self.supabase.table("families").insert(family_data).execute()
+            family_response = await execute(self.supabase.table("families").insert(family_data))
             
             if not family_response.data:
                 raise Exception("Failed to create family")
             
+            # Drop any cached "family not found" for this name
+            invalidate_family_cache(family_id=family_id, family_name=family_name)
+            
             # Update the user record with approved status and family_id
             # User already exists from registration, just update their status
             update_data = {
@@ -321,7 +391,7 @@ class AdminOnboardingService:
                 "approval_status": "approved",
                 "password_hash": password_hash  # Update password hash in case it changed
             }
-            user_response = self.supabase.table("users").update(update_data).eq("id", user_id).execute()
+            user_response = await execute(self.supabase.table("users").update(update_data).eq("id", user_id))
             
             if not user_response.data:
                 raise Exception("Failed to update user approval status")
@@ -336,20 +406,17 @@ class AdminOnboardingService:
                     "role": "family_admin",
                     "email": email
                 },
-                "custom_fields": {"user_id": user_id}
+                "custom_fields": {"user_id": user_id},
+                "email": FamilyMemberService.normalize_email(email)
             }
             
-            member_response = self.supabase.table("family_members").insert(admin_member_data).execute()
+            member_response = await execute(self.supabase.table("family_members").insert(admin_member_data))
             
             if not member_response.data:
                 # Log but don't fail - still allow approval even if member creation fails
                 print(f"Warning: Failed to create family member record for admin {email}")
             
             # Update the request status to approved
-            # Note: If superadmin_user_id is "superadmin" (not a UUID), set reviewed_by to NULL
-            # since superadmin doesn't exist in the users table
-            reviewed_by = None if superadmin_user_id == "superadmin" else superadmin_user_id
-            
             update_data = {
                 "status": "approved",
                 "user_id": user_id,
@@ -357,7 +424,7 @@ class AdminOnboardingService:
                 "reviewed_at": datetime.utcnow().isoformat()
             }
             
-            request_update_response = self.supabase.table("admin_onboarding_requests").update(update_data).eq("id", request_id).execute()
+            request_update_response = await execute(self.supabase.table("admin_onboarding_requests").update(update_data).eq("id", request_id))
 
             # Ensure the request record was actually updated. If not, raise so callers can handle it
             if not request_update_response.data:
@@ -414,7 +481,7 @@ class AdminOnboardingService:
                 "reviewed_at": datetime.utcnow().isoformat()
             }
             
-            request_update_response = self.supabase.table("admin_onboarding_requests").update(update_data).eq("id", request_id).execute()
+            request_update_response = await execute(self.supabase.table("admin_onboarding_requests").update(update_data).eq("id", request_id))
 
             if not request_update_response.data:
                 raise Exception("Failed to update onboarding request status to rejected")
@@ -455,3 +522,15 @@ class AdminOnboardingService:
         
         except Exception as e:
             raise Exception(f"Error getting request status: {str(e)}")
+
+
+def _approval_retryable(error: Exception) -> bool:
+    # Only the single-transaction RPC is safe to run again after a failure
+    return not _approval_rpc_missing and not isinstance(error, ValueError)
+
+
+@job_handler("admin_approval", max_attempts=3, retry_on=_approval_retryable)
+async def run_admin_approval_job(context: JobContext, payload: dict) -> dict:
+    """Background approval of an admin onboarding request"""
+    service = AdminOnboardingService(get_supabase_client())
+    return await service.approve_request(payload["request_id"], payload["superadmin_user_id"])
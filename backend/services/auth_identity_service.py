@@ -0,0 +1,91 @@
+"""
+Resolve Supabase auth users by email
+Uses the auth_user_id_by_email() database function (an indexed lookup on
+auth.users, see sql/auth_user_lookup.sql). Without it, falls back to
+paging through auth.admin.list_users(), which is linear but, unlike a
+single list_users() call, does not miss users beyond the first page.
+"""
+
+from typing import Optional
+from supabase import Client
+
+from core.cache import TTLCache
+from core.config import AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS
+from core.database import call, execute, is_missing_function
+
+# GoTrue caps per_page at 1000
+LIST_USERS_PAGE_SIZE = 1000
+
+# Per-worker email -> auth user ID cache (auth user IDs never change for an email)
+auth_user_id_cache = TTLCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS, name="auth_user_by_email")
+
+# Set once a worker learns auth_user_id_by_email() isn't installed
+_lookup_rpc_missing = False
+
+
+def auth_identity_cache_metrics() -> dict:
+    return auth_user_id_cache.metrics()
+
+
+class AuthIdentityService:
+    """Service for looking up auth users by email"""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        return email.strip().lower()
+
+    async def get_user_id_by_email(self, email: str) -> Optional[str]:
+        """
+        Get the auth user ID registered for an email
+
+        Returns:
+            The user ID, or None if no auth user has this email
+        """
+        email = self.normalize_email(email)
+        cached = auth_user_id_cache.get(email)
+        if cached:
+            return cached
+
+        try:
+            user_id = await self._lookup(email)
+        except Exception as e:
+            raise Exception(f"Error resolving auth user: {str(e)}")
+
+        # Only cache hits: a miss may be followed by a registration
+        if user_id:
+            auth_user_id_cache.set(email, user_id)
+        return user_id
+
+    async def _lookup(self, email: str) -> Optional[str]:
+        global _lookup_rpc_missing
+
+        if not _lookup_rpc_missing:
+            try:
+                response = await execute(self.supabase.rpc("auth_user_id_by_email", {"p_email": email}))
+                return str(response.data) if response.data else None
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                print("Warning: auth_user_id_by_email() not installed, paging through list_users")
+                _lookup_rpc_missing = True
+
+        return await self._scan(email)
+
+    async def _scan(self, email: str) -> Optional[str]:
+        """Page through every auth user until the email is found"""
+        page = 1
+        while True:
+            users = await call(self.supabase.auth.admin.list_users, page=page, per_page=LIST_USERS_PAGE_SIZE)
+            for user in users or []:
+                if (getattr(user, "email", None) or "").lower() == email:
+                    return str(user.id)
+            if not users or len(users) < LIST_USERS_PAGE_SIZE:
+                return None
+            page += 1
+
+    def remember(self, email: str, user_id: str):
+        """Cache a freshly created auth user"""
+        auth_user_id_cache.set(self.normalize_email(email), str(user_id))
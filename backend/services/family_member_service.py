@@ -1,11 +1,58 @@
-from typing import Optional, List
+import asyncio
+import json
+import uuid
+from typing import AsyncIterator, Optional, List
 from supabase import Client
+from core.autocomplete import MemberAutocomplete
+from core.config import (
+    MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT, MEMBER_AUTOCOMPLETE_MAX_FAMILIES,
+    MEMBER_AUTOCOMPLETE_MAX_MEMBERS, MEMBER_AUTOCOMPLETE_TTL_SECONDS, MEMBER_BULK_MAX_CONCURRENCY,
+    MEMBER_BULK_MAX_IDS, MEMBER_SEARCH_DEFAULT_LIMIT, MEMBER_SEARCH_MIN_SIMILARITY, POSTGREST_MAX_ROWS
+)
+from core.database import execute, is_data_error, is_missing_function
+from core.pagination import SORT_KEYS, decode_cursor, encode_cursor
+from core.projections import projection
+from core.text_search import MATCH_TYPES, highlights, match_type, similarity
+from core.unit_of_work import UnitOfWork
+
+# Set once a worker learns family_member_field_keys() isn't installed
+_field_keys_rpc_missing = False
+_search_rpc_missing = False
+
+# Per-worker name index; member writes through this service keep it current
+member_autocomplete = MemberAutocomplete(
+    MEMBER_AUTOCOMPLETE_MAX_FAMILIES, MEMBER_AUTOCOMPLETE_MAX_MEMBERS, MEMBER_AUTOCOMPLETE_TTL_SECONDS
+)
+_AUTOCOMPLETE_COLUMNS = [column.strip() for column in projection("family_members", "autocomplete").split(",")]
+
+
+def _autocomplete_entries(members: List[dict]) -> List[dict]:
+    return [{column: member.get(column) for column in _AUTOCOMPLETE_COLUMNS} for member in members]
+
+
+def member_autocomplete_metrics() -> dict:
+    return member_autocomplete.metrics()
 
 class FamilyMemberService:
     """Service for family member management"""
     
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: Client, uow: Optional[UnitOfWork] = None):
         self.supabase = supabase
+        self.uow = uow
+    
+    @staticmethod
+    def normalize_email(email: Optional[str]) -> Optional[str]:
+        """Normalize a member email for the indexed email column"""
+        if not email or not isinstance(email, str):
+            return None
+        return email.strip().lower() or None
+    
+    @staticmethod
+    def email_from_relationships(relationships) -> Optional[str]:
+        """Extract the normalized login email stored in a member's relationships"""
+        if not isinstance(relationships, dict):
+            return None
+        return FamilyMemberService.normalize_email(relationships.get("email"))
     
     async def create_bulk_family_members(self, family_id: str, members_data: List[dict]) -> dict:
         """Create multiple family members in bulk (optimized for batch operations)
@@ -31,21 +78,24 @@ class FamilyMemberService:
                 if not member.get('name') or not str(member.get('name')).strip():
                     raise ValueError(f"Member {idx + 1}: Name is required")
                 
+                relationships = member.get('relationships', {})
                 prepared_members.append({
                     "family_id": family_id,
                     "name": str(member.get('name', '')).strip(),
                     "photo_url": member.get('photo_url') or None,
-                    "relationships": member.get('relationships', {}),
-                    "custom_fields": member.get('custom_fields', {})
+                    "relationships": relationships,
+                    "custom_fields": member.get('custom_fields', {}),
+                    "email": self.email_from_relationships(relationships)
                 })
             
             # Insert all members in bulk
-            response = self.supabase.table("family_members").insert(prepared_members).execute()
+            response = await execute(self.supabase.table("family_members").insert(prepared_members))
             
             if not response.data:
                 raise Exception("Failed to create family members")
             
             created_members = response.data
+            member_autocomplete.upsert(family_id, _autocomplete_entries(created_members))
             return {
                 "success": True,
                 "created_count": len(created_members),
@@ -66,54 +116,445 @@ class FamilyMemberService:
                 "name": name,
                 "photo_url": photo_url,
                 "relationships": relationships,
-                "custom_fields": custom_fields
+                "custom_fields": custom_fields,
+                "email": self.email_from_relationships(relationships)
             }
-            response = self.supabase.table("family_members").insert(data).execute()
+            response = await execute(self.supabase.table("family_members").insert(data))
             member = response.data[0] if response.data else None
             
             if not member:
                 raise Exception("Failed to create family member")
             
+            member_autocomplete.upsert(family_id, _autocomplete_entries([member]))
             return member
         except Exception as e:
             raise Exception(f"Error creating family member: {str(e)}")
     
-    async def get_family_member_by_id(self, member_id: str) -> dict:
-        """Get family member by ID"""
+    async def get_family_member_by_id(self, member_id: str, columns: Optional[str] = None) -> dict:
+        """Get family member by ID (detail columns unless a projection is given)"""
+        columns = columns or projection("family_members", "detail")
+        
+        async def load():
+            response = await execute(self.supabase.table("family_members").select(columns).eq("id", member_id))
+            return response.data[0] if response.data else None
+        
         try:
-            response = self.supabase.table("family_members").select("*").eq("id", member_id).execute()
+            if self.uow:
+                return await self.uow.get("family_members", member_id, columns, load)
+            return await load()
+        except Exception as e:
+            raise Exception(f"Error fetching family member: {str(e)}")
+    
+    async def get_family_member_by_email(self, family_id: str, email: str) -> Optional[dict]:
+        """Get a family member by login email (indexed point lookup)"""
+        try:
+            normalized_email = self.normalize_email(email)
+            if not normalized_email:
+                return None
+            response = await execute(self.supabase.table("family_members").select(projection("family_members", "login")).eq("family_id", family_id).eq("email", normalized_email).limit(1))
             return response.data[0] if response.data else None
         except Exception as e:
             raise Exception(f"Error fetching family member: {str(e)}")
     
-    async def get_family_members(self, family_id: str) -> List[dict]:
-        """Get all members in a family"""
+    async def get_family_members(self, family_id: str, columns: Optional[str] = None) -> List[dict]:
+        """Get all members in a family (list columns unless a projection is given)"""
         try:
-            response = self.supabase.table("family_members").select("*").eq("family_id", family_id).execute()
+            columns = columns or projection("family_members", "list")
+            response = await execute(self.supabase.table("family_members").select(columns).eq("family_id", family_id))
             return response.data if response.data else []
         except Exception as e:
             raise Exception(f"Error fetching family members: {str(e)}")
     
-    async def search_family_members(self, family_id: str, search_query: str) -> List[dict]:
-        """Search family members by name"""
+    async def get_family_members_page(
+        self,
+        family_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort: str = "name",
+        columns: Optional[str] = None,
+        include_total: bool = False
+    ) -> dict:
+        """
+        Get one page of a family's members in (sort, id) order
+        
+        Args:
+            cursor: next_cursor of the previous page, or None for the first page
+            include_total: Also count all members of the family
+        
+        Returns:
+            {"items": [...], "next_cursor": str or None, "total": int or None}
+        
+        Raises:
+            ValueError: Unknown sort column or invalid cursor
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Cannot sort by {sort}")
+        after = decode_cursor(cursor, sort) if cursor else None
+        
+        columns = columns or projection("family_members", "list")
+        selected = {column.strip() for column in columns.split(",")}
+        # The sort key is needed for the cursor even when ?fields= leaves it out
+        query_columns = columns if sort in selected or "*" in selected else f"{columns},{sort}"
+        
+        def members():
+            return self.supabase.table("family_members").select(query_columns).eq("family_id", family_id)
+        
+        async def fetch_rows() -> List[dict]:
+            # One extra row tells whether another page follows; PostgREST would
+            # silently cut a request past max-rows, so ask for at most that
+            wanted = min(limit + 1, POSTGREST_MAX_ROWS)
+            if after is None:
+                response = await execute(members().order(sort).order("id").limit(wanted))
+                return response.data or []
+            # (sort, id) > (value, id): the rest of the tied value first, then later values
+            value, after_id = after
+            response = await execute(members().eq(sort, value).gt("id", after_id).order("id").limit(wanted))
+            rows = response.data or []
+            if len(rows) < wanted:
+                response = await execute(
+                    members().gt(sort, value).order(sort).order("id").limit(wanted - len(rows))
+                )
+                rows += response.data or []
+            return rows
+        
+        async def count_members() -> Optional[int]:
+            response = await execute(
+                self.supabase.table("family_members").select("id", count="exact").eq("family_id", family_id).limit(1)
+            )
+            return response.count
+        
         try:
-            response = self.supabase.table("family_members").select("*").eq("family_id", family_id).ilike("name", f"%{search_query}%").execute()
-            return response.data if response.data else []
+            if include_total:
+                rows, total = await asyncio.gather(fetch_rows(), count_members())
+            else:
+                rows, total = await fetch_rows(), None
+        except Exception as e:
+            raise Exception(f"Error fetching family members: {str(e)}")
+        
+        items = rows[:limit]
+        # Without room for the look-ahead row, a full response may have more behind it
+        more = len(rows) > limit or (limit + 1 > POSTGREST_MAX_ROWS and len(rows) == POSTGREST_MAX_ROWS)
+        next_cursor = encode_cursor(sort, items[-1]) if more else None
+        if query_columns != columns:
+            items = [{key: value for key, value in item.items() if key != sort} for item in items]
+        return {"items": items, "next_cursor": next_cursor, "total": total}
+    
+    async def iter_family_members(
+        self, family_id: str, page_size: int, columns: Optional[str] = None
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Yield a family's members a keyset page at a time, in (name, id) order
+        
+        The next page is fetched while the caller consumes the current one,
+        so at most two pages are held in memory.
+        """
+        page = await self.get_family_members_page(family_id, page_size, columns=columns)
+        while True:
+            following = None
+            if page["next_cursor"]:
+                following = asyncio.ensure_future(
+                    self.get_family_members_page(family_id, page_size, cursor=page["next_cursor"], columns=columns)
+                )
+            try:
+                if page["items"]:
+                    yield page["items"]
+            except BaseException:
+                if following:
+                    following.cancel()
+                raise
+            if not following:
+                return
+            page = await following
+    
+    async def get_field_keys(self, family_id: str, page_size: int) -> List[str]:
+        """
+        Sorted relationships.<key> / custom_fields.<key> names used in a family
+        
+        Uses family_member_field_keys() (sql/member_export.sql), falling back to
+        reading every member's relationships and custom_fields.
+        """
+        global _field_keys_rpc_missing
+        
+        if not _field_keys_rpc_missing:
+            try:
+                response = await execute(self.supabase.rpc("family_member_field_keys", {"p_family_id": family_id}))
+                return [row["field"] for row in response.data or []]
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise Exception(f"Error fetching member fields: {getattr(e, 'message', None) or str(e)}")
+                print("Warning: family_member_field_keys() not installed, scanning members for export fields")
+                _field_keys_rpc_missing = True
+        
+        keys = set()
+        async for members in self.iter_family_members(family_id, page_size, projection("family_members", "field_keys")):
+            for member in members:
+                for column in ("relationships", "custom_fields"):
+                    if isinstance(member.get(column), dict):
+                        keys.update(f"{column}.{key}" for key in member[column])
+        return sorted(keys)
+    
+    async def search_family_members(
+        self,
+        family_id: str,
+        search_query: str,
+        columns: Optional[str] = None,
+        limit: int = MEMBER_SEARCH_DEFAULT_LIMIT,
+        min_similarity: float = MEMBER_SEARCH_MIN_SIMILARITY
+    ) -> List[dict]:
+        """
+        Search family members by name, best matches first
+        
+        Uses search_family_members() (sql/member_search.sql), which also finds
+        names within min_similarity of the query, so typos still match. Without
+        it, falls back to a substring match ranked here. Each result carries
+        "match" (exact, prefix, substring or fuzzy), "score" (trigram
+        similarity, 0-1) and "highlights" ([start, end) ranges of the name).
+        """
+        global _search_rpc_missing
+        
+        search_query = search_query.strip()
+        if not search_query:
+            return []
+        wanted = [column.strip() for column in (columns or projection("family_members", "list")).split(",")]
+        
+        members = None
+        if not _search_rpc_missing:
+            try:
+                response = await execute(self.supabase.rpc("search_family_members", {
+                    "p_family_id": family_id,
+                    "p_query": search_query,
+                    "p_limit": limit,
+                    "p_min_similarity": min_similarity
+                }))
+                members = response.data or []
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise Exception(f"Error searching family members: {getattr(e, 'message', None) or str(e)}")
+                print("Warning: search_family_members() not installed, falling back to substring search")
+                _search_rpc_missing = True
+        
+        if members is None:
+            members = await self._search_by_substring(family_id, search_query, wanted, limit)
+        
+        results = []
+        for member in members:
+            result = {column: member[column] for column in wanted if column in member}
+            result["match"] = member["match"]
+            result["score"] = round(float(member["score"]), 4)
+            result["highlights"] = highlights(member["name"], search_query, min_similarity)
+            results.append(result)
+        return results
+    
+    async def _search_by_substring(self, family_id: str, search_query: str, wanted: List[str], limit: int) -> List[dict]:
+        """ILIKE search without the RPC: reads every matching member, ranks and trims them here"""
+        try:
+            pattern = search_query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            columns = ", ".join(wanted + [column for column in ("id", "name") if column not in wanted])
+            response = await execute(
+                self.supabase.table("family_members").select(columns)
+                .eq("family_id", family_id).ilike("name", f"%{pattern}%")
+            )
         except Exception as e:
             raise Exception(f"Error searching family members: {str(e)}")
+        members = response.data or []
+        for member in members:
+            member["match"] = match_type(member["name"], search_query)
+            member["score"] = similarity(member["name"], search_query)
+        members.sort(key=lambda member: (
+            MATCH_TYPES.index(member["match"]), -member["score"], member["name"], str(member["id"])
+        ))
+        return members[:limit]
     
-    async def update_family_member(self, member_id: str, update_data: dict) -> dict:
-        """Update family member information"""
+    async def autocomplete_family_members(
+        self, family_id: str, query: str, limit: int = MEMBER_AUTOCOMPLETE_DEFAULT_LIMIT
+    ) -> List[dict]:
+        """
+        Members whose name contains every word of query, from the in-memory index
+        
+        The family is indexed on first use (one keyset scan of its members);
+        later keystrokes are answered without touching the database. Each
+        result carries "match" and "highlights" like search results.
+        """
+        async def load() -> List[dict]:
+            members = []
+            # The largest page that still fits one response with its look-ahead row
+            async for page in self.iter_family_members(
+                family_id, POSTGREST_MAX_ROWS - 1, projection("family_members", "autocomplete")
+            ):
+                members.extend(page)
+            return members
+        
+        index = await member_autocomplete.index(family_id, load)
+        results = []
+        for member in index.search(query, limit):
+            match = match_type(member["name"], query)
+            results.append({
+                **member,
+                # Every word of the query occurs, just not as one run
+                "match": "words" if match == "fuzzy" else match,
+                "highlights": highlights(member["name"], query)
+            })
+        return results
+    
+    async def update_family_member(self, member_id: str, update_data: dict, family_id: Optional[str] = None) -> dict:
+        """Update family member information
+        
+        With family_id the write only matches a member of that family, so
+        callers can skip reading the member first to check ownership.
+        
+        Returns:
+            The updated member, or None if no (owned) member matched
+        """
         try:
-            response = self.supabase.table("family_members").update(update_data).eq("id", member_id).execute()
-            return response.data[0] if response.data else None
+            # Keep the indexed email column in step with relationships.email
+            if "relationships" in update_data:
+                update_data = {
+                    **update_data,
+                    "email": self.email_from_relationships(update_data.get("relationships"))
+                }
+            query = self.supabase.table("family_members").update(update_data).eq("id", member_id)
+            if family_id:
+                query = query.eq("family_id", family_id)
+            response = await execute(query)
+            member = response.data[0] if response.data else None
+            if member:
+                member_autocomplete.upsert(member.get("family_id") or family_id, _autocomplete_entries([member]))
+            if self.uow:
+                if member:
+                    self.uow.put("family_members", member_id, member)
+                else:
+                    self.uow.forget("family_members", member_id)
+            return member
         except Exception as e:
             raise Exception(f"Error updating family member: {str(e)}")
     
-    async def delete_family_member(self, member_id: str) -> bool:
-        """Delete a family member"""
+    @staticmethod
+    def _bulk_report(results: dict, succeeded: str) -> dict:
+        outcomes = list(results.values())
+        return {
+            "requested_count": len(outcomes),
+            "succeeded_count": sum(1 for outcome in outcomes if outcome["status"] == succeeded),
+            "not_found_count": sum(1 for outcome in outcomes if outcome["status"] == "not_found"),
+            "failed_count": sum(1 for outcome in outcomes if outcome["status"] == "failed"),
+            "results": outcomes
+        }
+    
+    @staticmethod
+    def _check_bulk_ids(member_ids: List[str], results: dict) -> List[str]:
+        """Record invalid and repeated IDs as failed; return the IDs to act on"""
+        if len(member_ids) > MEMBER_BULK_MAX_IDS:
+            raise ValueError(f"Cannot change more than {MEMBER_BULK_MAX_IDS} members in a single request")
+        valid = []
+        for member_id in member_ids:
+            if member_id in results:
+                results[member_id] = {"id": member_id, "status": "failed", "error": "ID given more than once"}
+                continue
+            try:
+                uuid.UUID(member_id)
+            except ValueError:
+                results[member_id] = {"id": member_id, "status": "failed", "error": "Invalid member ID"}
+                continue
+            results[member_id] = None
+            valid.append(member_id)
+        return [member_id for member_id in valid if results[member_id] is None]
+    
+    async def bulk_update_family_members(self, family_id: str, updates: List[dict]) -> dict:
+        """Apply partial updates to many members of a family
+        
+        Members getting the same changes are updated by one statement filtered on
+        the IDs and the family, so ownership needs no separate read. IDs outside
+        the family come back as not_found. A statement rejected for its data
+        (e.g. a duplicate member email) is retried per member to find the culprit.
+        
+        Args:
+            updates: Dicts with "id" and the fields to change
+        
+        Returns:
+            Counts plus a per-ID outcome (updated, not_found or failed)
+        """
+        results = {}
+        patches = {str(update.get("id")): {k: v for k, v in update.items() if k != "id"} for update in updates}
+        member_ids = self._check_bulk_ids([str(update.get("id")) for update in updates], results)
+        
+        # Group members by identical changes: one statement per group
+        groups = {}
+        for member_id in member_ids:
+            patch = patches[member_id]
+            if not patch:
+                results[member_id] = {"id": member_id, "status": "failed", "error": "No fields to update"}
+                continue
+            if "relationships" in patch:
+                patch = {**patch, "email": self.email_from_relationships(patch["relationships"])}
+            key = json.dumps(patch, sort_keys=True, default=str)
+            groups.setdefault(key, (patch, []))[1].append(member_id)
+        
+        slots = asyncio.Semaphore(MEMBER_BULK_MAX_CONCURRENCY)
+        updated_rows = []
+        
+        async def apply(patch: dict, ids: List[str]):
+            try:
+                async with slots:
+                    response = await execute(
+                        self.supabase.table("family_members").update(patch)
+                        .in_("id", ids).eq("family_id", family_id)
+                    )
+            except Exception as e:
+                if is_data_error(e) and len(ids) > 1:
+                    await asyncio.gather(*(apply(patch, [member_id]) for member_id in ids))
+                    return
+                for member_id in ids:
+                    results[member_id] = {"id": member_id, "status": "failed", "error": getattr(e, "message", None) or str(e)}
+                return
+            updated_rows.extend(response.data or [])
+            updated = {str(row["id"]) for row in response.data or []}
+            for member_id in ids:
+                results[member_id] = {"id": member_id, "status": "updated" if member_id in updated else "not_found"}
+                if self.uow:
+                    self.uow.forget("family_members", member_id)
+        
+        await asyncio.gather(*(apply(patch, ids) for patch, ids in groups.values()))
+        member_autocomplete.upsert(family_id, _autocomplete_entries(updated_rows))
+        return self._bulk_report(results, "updated")
+    
+    async def bulk_delete_family_members(self, family_id: str, member_ids: List[str]) -> dict:
+        """Delete many members of a family with one statement filtered on the IDs and the family
+        
+        Returns:
+            Counts plus a per-ID outcome (deleted, not_found or failed)
+        """
+        results = {}
+        # Deleting a member twice is harmless, so repeats are dropped rather than failed
+        ids = self._check_bulk_ids(list(dict.fromkeys(str(member_id) for member_id in member_ids)), results)
+        if ids:
+            try:
+                response = await execute(
+                    self.supabase.table("family_members").delete().in_("id", ids).eq("family_id", family_id)
+                )
+            except Exception as e:
+                raise Exception(f"Error deleting family members: {str(e)}")
+            deleted = {str(row["id"]) for row in response.data or []}
+            member_autocomplete.remove(family_id, list(deleted))
+            for member_id in ids:
+                results[member_id] = {"id": member_id, "status": "deleted" if member_id in deleted else "not_found"}
+                if self.uow:
+                    self.uow.forget("family_members", member_id)
+        return self._bulk_report(results, "deleted")
+    
+    async def delete_family_member(self, member_id: str, family_id: Optional[str] = None) -> bool:
+        """Delete a family member (only from family_id when given)
+        
+        Returns:
+            True if a member was deleted
+        """
         try:
-            self.supabase.table("family_members").delete().eq("id", member_id).execute()
-            return True
+            query = self.supabase.table("family_members").delete().eq("id", member_id)
+            if family_id:
+                query = query.eq("family_id", family_id)
+            response = await execute(query)
+            if response.data:
+                member_autocomplete.remove(family_id or response.data[0].get("family_id"), [member_id])
+            if self.uow:
+                self.uow.forget("family_members", member_id)
+            return bool(response.data)
         except Exception as e:
             raise Exception(f"Error deleting family member: {str(e)}")
@@ -1,33 +1,91 @@
 from typing import Optional
 from supabase import Client
+from core.database import execute
+from core.cache import TTLCache
+from core.config import FAMILY_CACHE_SIZE, FAMILY_CACHE_TTL_SECONDS
+from core.crypto_executor import decrypt_async, envelope_encrypt_async, rewrap_data_keys_async
+from core.projections import projection
+from core.unit_of_work import UnitOfWork
+
+# Per-worker caches; writes through FamilyService / AdminOnboardingService invalidate them
+family_by_name_cache = TTLCache(FAMILY_CACHE_SIZE, FAMILY_CACHE_TTL_SECONDS, name="family_by_name")
+family_by_id_cache = TTLCache(FAMILY_CACHE_SIZE, FAMILY_CACHE_TTL_SECONDS, name="family_by_id")
+
+
+def invalidate_family_cache(family_id: Optional[str] = None, family_name: Optional[str] = None):
+    """Drop cached family lookups by id and/or name"""
+    if family_id:
+        family_by_id_cache.pop(family_id)
+        family_by_name_cache.pop_where(lambda _, family: bool(family) and family.get("id") == family_id)
+    if family_name:
+        family_by_name_cache.pop(family_name)
+
+
+def family_cache_metrics() -> dict:
+    return {
+        "by_name": family_by_name_cache.metrics(),
+        "by_id": family_by_id_cache.metrics()
+    }
 
 class FamilyService:
     """Service for family management"""
     
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: Client, uow: Optional[UnitOfWork] = None):
         self.supabase = supabase
+        self.uow = uow
     
     async def create_family(self, family_name: str) -> dict:
         """Create a new family"""
         try:
             data = {"family_name": family_name}
-            response = self.supabase.table("families").insert(data).execute()
+            response = await execute(self.supabase.table("families").insert(data))
+            invalidate_family_cache(family_name=family_name)
             return response.data[0] if response.data else None
         except Exception as e:
             raise Exception(f"Error creating family: {str(e)}")
     
-    async def get_family_by_id(self, family_id: str) -> dict:
-        """Get family by ID"""
+    async def get_family_by_id(self, family_id: str, columns: Optional[str] = None) -> dict:
+        """Get family by ID (detail columns unless a projection is given)"""
+        columns = columns or projection("families", "detail")
+        
+        async def load():
+            response = await execute(self.supabase.table("families").select(columns).eq("id", family_id))
+            return response.data[0] if response.data else None
+        
         try:
-            response = self.supabase.table("families").select("*").eq("id", family_id).execute()
+            if self.uow:
+                return await self.uow.get("families", family_id, columns, load)
+            return await load()
+        except Exception as e:
+            raise Exception(f"Error fetching family: {str(e)}")
+    
+    async def get_family_for_login(self, family_name: str) -> Optional[dict]:
+        """Resolve a family by name with only the columns member login needs (cached)"""
+        async def load():
+            response = await execute(self.supabase.table("families").select(projection("families", "login")).eq("family_name", family_name))
             return response.data[0] if response.data else None
+        
+        try:
+            return await family_by_name_cache.get_or_load(family_name, load)
         except Exception as e:
             raise Exception(f"Error fetching family: {str(e)}")
     
-    async def get_all_families(self) -> list:
+    async def get_family_summary_by_id(self, family_id: str) -> Optional[dict]:
+        """Get non-sensitive family columns for access checks and responses (cached)"""
+        async def load():
+            response = await execute(self.supabase.table("families").select(projection("families", "access_check")).eq("id", family_id))
+            return response.data[0] if response.data else None
+        
+        try:
+            return await family_by_id_cache.get_or_load(family_id, load)
+        except Exception as e:
+            raise Exception(f"Error fetching family: {str(e)}")
+    
+    async def get_all_families(self, columns: Optional[str] = None) -> list:
         """Get all families (SuperAdmin only)"""
         try:
-            response = self.supabase.table("families").select("*").execute()
+            columns = columns or projection("families", "list")
+            response = await execute(self.supabase.table("families").select(columns))
             return response.data if response.data else []
         except Exception as e:
             raise Exception(f"Error fetching families: {str(e)}")
@@ -35,15 +93,72 @@ class FamilyService:
     async def update_family(self, family_id: str, update_data: dict) -> dict:
         """Update family information"""
         try:
-            response = self.supabase.table("families").update(update_data).eq("id", family_id).execute()
-            return response.data[0] if response.data else None
+            response = await execute(self.supabase.table("families").update(update_data).eq("id", family_id))
+            invalidate_family_cache(family_id=family_id, family_name=update_data.get("family_name"))
+            family = response.data[0] if response.data else None
+            if self.uow:
+                self.uow.forget("families", family_id)
+            return family
         except Exception as e:
             raise Exception(f"Error updating family: {str(e)}")
     
     async def delete_family(self, family_id: str) -> bool:
         """Delete a family"""
         try:
-            self.supabase.table("families").delete().eq("id", family_id).execute()
+            await execute(self.supabase.table("families").delete().eq("id", family_id))
+            invalidate_family_cache(family_id=family_id)
+            if self.uow:
+                self.uow.forget("families", family_id)
             return True
         except Exception as e:
             raise Exception(f"Error deleting family: {str(e)}")
+
+    async def rotate_family_keys(self, admin_user_id: str, old_password: str, new_password: str) -> dict:
+        """Rewrap the data keys of every family owned by an admin after a password change
+        
+        Envelope-encrypted families only get their wrapped data key replaced;
+        the encrypted family password itself is untouched. Families still on
+        the legacy format are migrated to envelope encryption on the way.
+        
+        Args:
+            admin_user_id: The admin whose families should be rotated
+            old_password: The admin's current password
+            new_password: The admin's new password
+        
+        Returns:
+            Dictionary with rotated, migrated and total counts
+        """
+        try:
+            response = await execute(self.supabase.table("families").select(
+                projection("families", "key_rotation")
+            ).eq("admin_user_id", admin_user_id))
+            families = response.data or []
+            
+            enveloped = [f for f in families if f.get("family_data_key_wrapped")]
+            legacy = [f for f in families if not f.get("family_data_key_wrapped")]
+            
+            # One batched rewrap for all enveloped families
+            if enveloped:
+                rewrapped = await rewrap_data_keys_async(
+                    [f["family_data_key_wrapped"] for f in enveloped], old_password, new_password
+                )
+                for family, wrapped_key in zip(enveloped, rewrapped):
+                    await execute(self.supabase.table("families").update(
+                        {"family_data_key_wrapped": wrapped_key}
+                    ).eq("id", family["id"]))
+            
+            for family in legacy:
+                family_password = await decrypt_async(family["family_password_encrypted"], old_password)
+                encrypted, wrapped_key = await envelope_encrypt_async(family_password, new_password)
+                await execute(self.supabase.table("families").update({
+                    "family_password_encrypted": encrypted,
+                    "family_data_key_wrapped": wrapped_key
+                }).eq("id", family["id"]))
+            
+            return {
+                "rotated_count": len(enveloped),
+                "migrated_count": len(legacy),
+                "total": len(families)
+            }
+        except Exception as e:
+            raise Exception(f"Error rotating family keys: {str(e)}")
@@ -0,0 +1,89 @@
+"""
+Streaming family member export
+Rows are read a keyset page at a time and written out page by page, so an
+export holds at most two pages in memory whatever the size of the family.
+"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, List
+from supabase import Client
+
+from core.config import EXPORT_PAGE_SIZE
+from core.projections import projection
+from services.family_member_service import FamilyMemberService
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Leading characters a spreadsheet would evaluate as a formula
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_BASE_COLUMNS = ["id", "name", "photo_url", "created_at", "updated_at"]
+
+
+def _csv_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    value = str(value)
+    if value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class MemberExportService:
+    """Service for exporting a family's members"""
+
+    def __init__(self, supabase: Client, page_size: int = EXPORT_PAGE_SIZE):
+        self.members = FamilyMemberService(supabase)
+        self.page_size = page_size
+
+    def _pages(self, family_id: str) -> AsyncIterator[List[dict]]:
+        return self.members.iter_family_members(family_id, self.page_size, projection("family_members", "export"))
+
+    async def export(self, family_id: str, export_format: str) -> AsyncIterator[bytes]:
+        """
+        Yield the export as encoded chunks, one per page of members
+
+        Raises:
+            ValueError: Unknown export format
+        """
+        if export_format == "ndjson":
+            return self._ndjson(family_id)
+        if export_format == "csv":
+            return self._csv(family_id, await self.members.get_field_keys(family_id, self.page_size))
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    async def _ndjson(self, family_id: str) -> AsyncIterator[bytes]:
+        async for members in self._pages(family_id):
+            yield "".join(
+                json.dumps(member, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+                for member in members
+            ).encode()
+
+    async def _csv(self, family_id: str, field_keys: List[str]) -> AsyncIterator[bytes]:
+        """relationships and custom_fields become one column per key, e.g. relationships.spouse"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(_BASE_COLUMNS + field_keys)
+        fields = [key.split(".", 1) for key in field_keys]
+
+        async for members in self._pages(family_id):
+            for member in members:
+                row = [_csv_cell(member.get(column)) for column in _BASE_COLUMNS]
+                for column, key in fields:
+                    values = member.get(column)
+                    row.append(_csv_cell(values.get(key) if isinstance(values, dict) else None))
+                writer.writerow(row)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # Header only, for a family without members
+        if buffer.tell():
+            yield buffer.getvalue().encode()
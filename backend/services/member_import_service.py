@@ -0,0 +1,313 @@
+"""
+Streaming family member import
+The request body is decoded and parsed as it arrives, validated row by row
+and inserted in chunks with a bounded number of inserts in flight, so
+memory depends on the chunk size and concurrency, not on the file size.
+"""
+
+import asyncio
+import codecs
+import csv
+import json
+import os
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from supabase import Client
+
+from core.config import IMPORT_CHUNK_SIZE, IMPORT_MAX_CONCURRENCY, IMPORT_MAX_ERRORS, IMPORT_MAX_RECORD_BYTES
+from core.database import execute, get_supabase_client, is_data_error
+from core.jobs import JobContext, job_handler
+from schemas.user import FamilyMemberCreate
+from services.family_member_service import FamilyMemberService, member_autocomplete
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Export metadata columns, ignored on import
+_IGNORED_COLUMNS = {"id", "family_id", "email", "created_at", "updated_at"}
+
+# Leading characters the CSV export escapes with a quote
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_column(header: str) -> Optional[str]:
+    """
+    Map a CSV header to name, photo_url, relationships.<key> or custom_fields.<key>
+
+    Accepts the export's headers as well as the bulk-import template's
+    ("Name", "Photo URL", "Relationship: spouse", "Email", bare custom field names).
+    """
+    header = header.strip().lstrip("\ufeff")
+    lowered = header.lower()
+    if lowered == "name":
+        return "name"
+    if lowered in ("photo_url", "photo url"):
+        return "photo_url"
+    if lowered in ("email", "email address"):
+        return "relationships.email"
+    if lowered.startswith("relationship:"):
+        return "relationships." + header.split(":", 1)[1].strip()
+    if lowered in _IGNORED_COLUMNS or not header:
+        return None
+    if header.startswith(("relationships.", "custom_fields.")):
+        return header
+    return "custom_fields." + header
+
+
+def _csv_value(value: str) -> str:
+    value = value.strip()
+    # Undo the export's formula escaping
+    if value.startswith("'") and value[1:2] and value[1:2] in _FORMULA_PREFIXES:
+        return value[1:]
+    return value
+
+
+def _member_from_csv(columns: List[Optional[str]], values: List[str]) -> dict:
+    member = {"relationships": {}, "custom_fields": {}}
+    for column, value in zip(columns, values):
+        value = _csv_value(value)
+        if column is None or not value:
+            continue
+        if "." in column:
+            group, key = column.split(".", 1)
+            member[group][key] = value
+        else:
+            member[column] = value
+    return member
+
+
+async def _lines(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[str]:
+    """Decode UTF-8 chunks and yield complete lines"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            lines = pending.split("\n")
+            pending = lines.pop()
+            if len(pending) > max_bytes:
+                raise ValueError(f"Line longer than {max_bytes} bytes")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise ValueError("Import file is not valid UTF-8")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _csv_records(lines: AsyncIterator[str], max_bytes: int) -> AsyncIterator[List[str]]:
+    """Yield parsed CSV records; a quoted field may span lines"""
+    record = None
+    async for line in lines:
+        record = line if record is None else record + "\n" + line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            if len(record) > max_bytes:
+                raise ValueError(f"CSV record longer than {max_bytes} bytes")
+            continue
+        if record.strip():
+            yield next(csv.reader([record]))
+        record = None
+    if record is not None and record.strip():
+        yield next(csv.reader([record]))
+
+
+class MemberImportService:
+    """Service for importing members into a family from CSV or NDJSON"""
+
+    def __init__(self, supabase: Client, chunk_size: int = IMPORT_CHUNK_SIZE,
+                 max_concurrency: int = IMPORT_MAX_CONCURRENCY, max_errors: int = IMPORT_MAX_ERRORS):
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.max_errors = max_errors
+
+    async def _rows(self, chunks: AsyncIterator[bytes], import_format: str) -> AsyncIterator[Tuple[int, object, Optional[str]]]:
+        """Yield (row number, parsed member, parse error) for every record"""
+        lines = _lines(chunks, IMPORT_MAX_RECORD_BYTES)
+        if import_format == "ndjson":
+            row = 0
+            async for line in lines:
+                if not line.strip():
+                    continue
+                row += 1
+                try:
+                    member = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield row, None, f"Invalid JSON: {e.msg}"
+                    continue
+                yield row, member, None
+            return
+
+        records = _csv_records(lines, IMPORT_MAX_RECORD_BYTES)
+        header = await anext(records, None)
+        if header is None:
+            raise ValueError("CSV must have a header row")
+        columns = [_csv_column(column) for column in header]
+        if "name" not in columns:
+            raise ValueError("CSV header must include a name column")
+        row = 0
+        async for values in records:
+            row += 1
+            yield row, _member_from_csv(columns, values), None
+
+    @staticmethod
+    def _validate(family_id: str, member) -> dict:
+        """Return the row to insert, or raise ValueError"""
+        if not isinstance(member, dict):
+            raise ValueError("Row must be a JSON object")
+        try:
+            member = FamilyMemberCreate.model_validate(member)
+        except ValidationError as e:
+            raise ValueError("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+        name = member.name.strip()
+        if not name:
+            raise ValueError("Name is required")
+        return {
+            "family_id": family_id,
+            "name": name,
+            "photo_url": member.photo_url or None,
+            "relationships": member.relationships,
+            "custom_fields": member.custom_fields,
+            "email": FamilyMemberService.email_from_relationships(member.relationships)
+        }
+
+    def _fail(self, report: dict, row: int, error: str):
+        report["failed_count"] += 1
+        if len(report["errors"]) < self.max_errors:
+            report["errors"].append({"row": row, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    async def _insert(self, rows: List[dict]):
+        # Only the count is needed back, not the inserted rows
+        await execute(self.supabase.table("family_members").insert(rows, returning="minimal"))
+
+    async def _insert_chunk(self, chunk: List[Tuple[int, dict]], report: dict):
+        """Insert a chunk; if the database rejects it, retry row by row to find the bad rows"""
+        try:
+            await self._insert([data for _, data in chunk])
+            report["created_count"] += len(chunk)
+            return
+        except Exception as e:
+            if not is_data_error(e) or len(chunk) == 1:
+                for row, _ in chunk:
+                    self._fail(report, row, getattr(e, "message", None) or str(e))
+                return
+
+        for row, data in chunk:
+            try:
+                await self._insert([data])
+                report["created_count"] += 1
+            except Exception as e:
+                self._fail(report, row, getattr(e, "message", None) or str(e))
+
+    async def _insert_and_report(self, chunk: List[Tuple[int, dict]], report: dict, progress):
+        await self._insert_chunk(chunk, report)
+        if progress:
+            await progress(report)
+
+    async def import_members(
+        self,
+        family_id: str,
+        chunks: AsyncIterator[bytes],
+        import_format: str,
+        progress: Optional[Callable[[dict], Awaitable[None]]] = None
+    ) -> dict:
+        """
+        Import members from a CSV or NDJSON byte stream
+
+        Valid rows are inserted even when others fail. CSV uses the export's
+        columns (name, photo_url, relationships.<key>, custom_fields.<key>);
+        NDJSON has one FamilyMemberCreate object per line. progress, if given,
+        is awaited with the report so far after every chunk is inserted.
+
+        A file that turns unreadable part way (bad UTF-8, an overlong record)
+        stops the import; rows already inserted stay and "message" says why.
+
+        Returns:
+            {"created_count", "failed_count", "errors": [{"row", "error"}], "errors_truncated", "message"}
+
+        Raises:
+            ValueError: Unknown format, or a file that is unreadable before its first row
+        """
+        if import_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format: {import_format}")
+
+        report = {"created_count": 0, "failed_count": 0, "errors": [], "errors_truncated": False, "message": None}
+        rows_read = 0
+        in_flight = set()
+        chunk = []
+
+        async def submit(rows):
+            nonlocal in_flight
+            # Stop reading the body while max_concurrency inserts are running
+            if len(in_flight) >= self.max_concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            in_flight.add(asyncio.ensure_future(self._insert_and_report(rows, report, progress)))
+
+        try:
+            try:
+                async for row, member, error in self._rows(chunks, import_format):
+                    rows_read = row
+                    if error:
+                        self._fail(report, row, error)
+                        continue
+                    try:
+                        chunk.append((row, self._validate(family_id, member)))
+                    except ValueError as e:
+                        self._fail(report, row, str(e))
+                        continue
+                    if len(chunk) >= self.chunk_size:
+                        await submit(chunk)
+                        chunk = []
+            except ValueError as e:
+                if not rows_read:
+                    raise
+                report["message"] = f"Import stopped after row {rows_read}: {e}"
+            if chunk:
+                await submit(chunk)
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+        finally:
+            # Too many new names to patch in; re-index the family on next use
+            member_autocomplete.invalidate(family_id)
+
+        return report
+
+
+async def _file_chunks(path: str, size: int = 65536) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, size):
+            yield chunk
+
+
+def _delete_spooled_upload(payload: dict):
+    try:
+        os.unlink(payload["path"])
+    except FileNotFoundError:
+        pass
+
+
+@job_handler("member_import", cleanup=_delete_spooled_upload)
+async def run_member_import_job(context: JobContext, payload: dict) -> dict:
+    """
+    Background import of a spooled upload; the runner deletes the file afterwards
+
+    Not retried: rows inserted before a failure would be imported twice.
+    """
+    service = MemberImportService(get_supabase_client())
+
+    async def progress(report: dict):
+        await context.progress(report["created_count"] + report["failed_count"])
+
+    return await service.import_members(
+        payload["family_id"], _file_chunks(payload["path"]), payload["format"], progress=progress
+    )
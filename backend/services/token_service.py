@@ -0,0 +1,200 @@
+"""
+Service for refresh tokens and access-token revocation
+Refresh tokens are opaque random strings stored only as SHA-256 hashes;
+each use rotates the token, and reuse of a rotated token revokes the
+whole chain it belongs to.
+"""
+
+import asyncio
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from supabase import Client
+
+from core.config import REFRESH_TOKEN_EXPIRATION_DAYS, REVOCATION_SYNC_SECONDS
+from core.database import execute, get_supabase_client
+from core.projections import projection
+from core.revocation import get_revocation_filter
+
+
+class TokenService:
+    """Service for issuing, rotating and revoking tokens"""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    @staticmethod
+    def _hash(refresh_token: str) -> str:
+        return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+    async def issue_refresh_token(self, user: dict, chain_id: Optional[str] = None) -> str:
+        """
+        Create and store a new refresh token for a user
+
+        Args:
+            user: Token subject with user_id, email, role and family_id
+            chain_id: Rotation chain to continue (new chain if omitted)
+
+        Returns:
+            The raw refresh token (only its hash is stored)
+        """
+        try:
+            refresh_token = secrets.token_urlsafe(32)
+            expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRATION_DAYS)
+            data = {
+                "token_hash": self._hash(refresh_token),
+                "chain_id": chain_id or str(uuid.uuid4()),
+                "user_id": user.get("user_id"),
+                "email": user.get("email"),
+                "role": user.get("role"),
+                "family_id": user.get("family_id"),
+                "expires_at": expires_at.isoformat()
+            }
+            response = await execute(self.supabase.table("refresh_tokens").insert(data))
+            if not response.data:
+                raise Exception("Failed to store refresh token")
+            return refresh_token
+        except Exception as e:
+            raise Exception(f"Error issuing refresh token: {str(e)}")
+
+    async def _current_subject(self, stored: dict) -> Optional[dict]:
+        """
+        Reload a refresh token's subject, or None if it no longer has access
+
+        Role and family come from the current users / family_members row, not
+        from the copy taken at login, so a demoted admin or a deleted member
+        can't keep refreshing with old privileges.
+        """
+        role = stored.get("role")
+        user_id = stored.get("user_id")
+        if role == "super_admin":
+            # Configured credentials, no row to re-check
+            return {"user_id": user_id, "email": stored.get("email"), "role": role, "family_id": None}
+
+        if role == "family_user":
+            # Member logins use the family member's ID as user_id
+            response = await execute(
+                self.supabase.table("family_members").select(projection("family_members", "login"))
+                .eq("id", user_id).eq("family_id", stored.get("family_id"))
+            )
+            if response.data:
+                member = response.data[0]
+                relationships = member.get("relationships")
+                email = relationships.get("email") if isinstance(relationships, dict) else None
+                return {
+                    "user_id": member["id"],
+                    "email": email or stored.get("email"),
+                    "role": "family_user",
+                    "family_id": member["family_id"]
+                }
+
+        response = await execute(
+            self.supabase.table("users").select(projection("users", "token_subject")).eq("id", user_id)
+        )
+        if not response.data or response.data[0].get("approval_status") != "approved":
+            return None
+        user = response.data[0]
+        return {"user_id": user["id"], "email": user.get("email"), "role": user.get("role"), "family_id": user.get("family_id")}
+
+    async def rotate_refresh_token(self, refresh_token: str) -> tuple[dict, str]:
+        """
+        Exchange a refresh token for a new one, for the subject's current role and family
+
+        Returns:
+            Tuple of (token subject, new raw refresh token)
+
+        Raises:
+            ValueError: If the token is unknown, expired, revoked or reused, or
+                its subject was deleted or is no longer approved (the chain is revoked)
+        """
+        response = await execute(self.supabase.table("refresh_tokens").select(projection("refresh_tokens", "rotation")).eq("token_hash", self._hash(refresh_token)))
+        if not response.data:
+            raise ValueError("Invalid refresh token")
+
+        stored = response.data[0]
+        now = datetime.now(timezone.utc)
+
+        if stored.get("revoked_at"):
+            if stored.get("replaced_by"):
+                # A rotated token was presented again: assume theft, kill the chain
+                await self.revoke_chain(stored["chain_id"])
+            raise ValueError("Refresh token has been revoked")
+
+        if datetime.fromisoformat(stored["expires_at"]) <= now:
+            raise ValueError("Refresh token expired")
+
+        user = await self._current_subject(stored)
+        if user is None:
+            await self.revoke_chain(stored["chain_id"])
+            raise ValueError("Refresh token subject no longer has access")
+
+        new_token = await self.issue_refresh_token(user, chain_id=stored["chain_id"])
+
+        # Only succeeds for the first concurrent rotation of this token
+        update_response = await execute(self.supabase.table("refresh_tokens").update({
+            "revoked_at": now.isoformat(),
+            "replaced_by": self._hash(new_token)
+        }).eq("id", stored["id"]).is_("revoked_at", "null"))
+
+        if not update_response.data:
+            await self.revoke_chain(stored["chain_id"])
+            raise ValueError("Refresh token has been revoked")
+
+        return user, new_token
+
+    async def revoke_refresh_token(self, refresh_token: str) -> None:
+        """Revoke the chain a refresh token belongs to (logout)"""
+        try:
+            response = await execute(self.supabase.table("refresh_tokens").select(projection("refresh_tokens", "chain")).eq("token_hash", self._hash(refresh_token)))
+            if response.data:
+                await self.revoke_chain(response.data[0]["chain_id"])
+        except Exception as e:
+            raise Exception(f"Error revoking refresh token: {str(e)}")
+
+    async def revoke_chain(self, chain_id: str) -> None:
+        """Revoke every live token in a rotation chain"""
+        await execute(self.supabase.table("refresh_tokens").update({
+            "revoked_at": datetime.now(timezone.utc).isoformat()
+        }).eq("chain_id", chain_id).is_("revoked_at", "null"))
+
+    async def revoke_access_token(self, claims: dict) -> None:
+        """
+        Revoke an access token until its natural expiry
+        Takes effect immediately in this worker and in others on their next sync
+        """
+        jti = claims.get("jti")
+        exp = claims.get("exp")
+        if not jti or not exp:
+            return
+        get_revocation_filter().revoke(jti, float(exp))
+        try:
+            await execute(self.supabase.table("revoked_tokens").upsert({
+                "jti": jti,
+                "expires_at": datetime.fromtimestamp(exp, timezone.utc).isoformat()
+            }))
+        except Exception as e:
+            raise Exception(f"Error revoking access token: {str(e)}")
+
+    async def load_revoked_access_tokens(self) -> dict:
+        """Fetch jti -> expiry (epoch seconds) for revocations that are still live"""
+        now = datetime.now(timezone.utc).isoformat()
+        response = await execute(self.supabase.table("revoked_tokens").select("jti, expires_at").gt("expires_at", now))
+        return {
+            row["jti"]: datetime.fromisoformat(row["expires_at"]).timestamp()
+            for row in response.data or []
+        }
+
+
+async def sync_revocations_forever():
+    """Periodically refresh this worker's revocation filter from the database"""
+    revocation_filter = get_revocation_filter()
+    while True:
+        try:
+            service = TokenService(get_supabase_client())
+            entries = await service.load_revoked_access_tokens()
+            revocation_filter.replace(entries)
+        except Exception as e:
+            print(f"Warning: Revocation sync failed: {str(e)}")
+        await asyncio.sleep(REVOCATION_SYNC_SECONDS)
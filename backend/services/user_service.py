@@ -1,13 +1,17 @@
 from typing import Optional
 from supabase import Client
+from core.database import execute
+from core.projections import projection
+from core.unit_of_work import UnitOfWork
 
 class UserService:
     """Service for user management"""
     
-    def __init__(self, supabase: Client):
+    def __init__(self, supabase: Client, uow: Optional[UnitOfWork] = None):
         self.supabase = supabase
+        self.uow = uow
     
-    def create_user(self, user_id: str, email: str, role: str, family_id: Optional[str] = None) -> dict:
+    async def create_user(self, user_id: str, email: str, role: str, family_id: Optional[str] = None) -> dict:
         """Create a new user"""
         try:
             data = {
@@ -16,47 +20,58 @@ class UserService:
                 "role": role,
                 "family_id": family_id
             }
-            response = self.supabase.table("users").insert(data).execute()
+            response = await execute(self.supabase.table("users").insert(data))
             return response.data[0] if response.data else None
         except Exception as e:
             raise Exception(f"Error creating user: {str(e)}")
     
-    def get_user_by_id(self, user_id: str) -> dict:
-        """Get user by ID"""
-        try:
-            response = self.supabase.table("users").select("*").eq("id", user_id).execute()
+    async def get_user_by_id(self, user_id: str, columns: Optional[str] = None) -> dict:
+        """Get user by ID (detail columns unless a projection is given)"""
+        columns = columns or projection("users", "detail")
+        
+        async def load():
+            response = await execute(self.supabase.table("users").select(columns).eq("id", user_id))
             return response.data[0] if response.data else None
+        
+        try:
+            if self.uow:
+                return await self.uow.get("users", user_id, columns, load)
+            return await load()
         except Exception as e:
             raise Exception(f"Error fetching user: {str(e)}")
     
-    def get_user_by_email(self, email: str) -> dict:
-        """Get user by email"""
+    async def get_user_by_email(self, email: str, columns: Optional[str] = None) -> dict:
+        """Get user by email (detail columns unless a projection is given)"""
         try:
-            response = self.supabase.table("users").select("*").eq("email", email).execute()
+            columns = columns or projection("users", "detail")
+            response = await execute(self.supabase.table("users").select(columns).eq("email", email))
             return response.data[0] if response.data else None
         except Exception as e:
             raise Exception(f"Error fetching user: {str(e)}")
     
-    def get_family_users(self, family_id: str) -> list:
+    async def get_family_users(self, family_id: str, columns: Optional[str] = None) -> list:
         """Get all users in a family"""
         try:
-            response = self.supabase.table("users").select("*").eq("family_id", family_id).execute()
+            columns = columns or projection("users", "list")
+            response = await execute(self.supabase.table("users").select(columns).eq("family_id", family_id))
             return response.data if response.data else []
         except Exception as e:
             raise Exception(f"Error fetching family users: {str(e)}")
     
-    def update_user(self, user_id: str, update_data: dict) -> dict:
+    async def update_user(self, user_id: str, update_data: dict) -> dict:
         """Update user information"""
         try:
-            response = self.supabase.table("users").update(update_data).eq("id", user_id).execute()
+            response = await execute(self.supabase.table("users").update(update_data).eq("id", user_id))
+            if self.uow:
+                self.uow.forget("users", user_id)
             return response.data[0] if response.data else None
         except Exception as e:
             raise Exception(f"Error updating user: {str(e)}")
     
-    def delete_user(self, user_id: str) -> bool:
+    async def delete_user(self, user_id: str) -> bool:
         """Delete a user"""
         try:
-            self.supabase.table("users").delete().eq("id", user_id).execute()
+            await execute(self.supabase.table("users").delete().eq("id", user_id))
             return True
         except Exception as e:
             raise Exception(f"Error deleting user: {str(e)}")
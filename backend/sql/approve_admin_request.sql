@@ -0,0 +1,84 @@
+-- Transactional admin approval
+-- Does the whole approval (family, admin user, admin member, request status)
+-- in one transaction and one round trip; the backend calls it via rpc() and
+-- falls back to the multi-call path when the function is not installed.
+-- Run this in Supabase SQL Editor
+
+CREATE OR REPLACE FUNCTION approve_admin_request(p_request_id UUID, p_reviewed_by UUID DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_request admin_onboarding_requests%ROWTYPE;
+    v_user users%ROWTYPE;
+    v_family_id UUID := gen_random_uuid();
+    v_member_id UUID;
+BEGIN
+    SELECT * INTO v_request FROM admin_onboarding_requests WHERE id = p_request_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Request not found';
+    END IF;
+    IF v_request.status <> 'pending' THEN
+        RAISE EXCEPTION 'Request is not pending (status: %)', v_request.status;
+    END IF;
+    IF v_request.user_id IS NULL THEN
+        RAISE EXCEPTION 'Request is missing user_id. This should have been created during registration.';
+    END IF;
+
+    SELECT * INTO v_user FROM users WHERE id = v_request.user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'User with ID % not found in users table. This should not happen.', v_request.user_id;
+    END IF;
+    IF v_user.approval_status IS DISTINCT FROM 'pending' THEN
+        RAISE EXCEPTION 'User is not pending (status: %)', v_user.approval_status;
+    END IF;
+    IF v_user.password_hash IS NULL THEN
+        RAISE EXCEPTION 'User password hash not found in registration';
+    END IF;
+
+    INSERT INTO families (id, family_name, admin_user_id, family_password_encrypted, family_data_key_wrapped, family_password_hash)
+    VALUES (
+        v_family_id, v_request.family_name, v_request.user_id, v_request.family_password_encrypted,
+        v_request.family_data_key_wrapped, v_request.family_password_hash
+    );
+
+    UPDATE users
+    SET family_id = v_family_id, role = 'family_admin', approval_status = 'approved', updated_at = CURRENT_TIMESTAMP
+    WHERE id = v_request.user_id;
+
+    INSERT INTO family_members (family_id, name, photo_url, relationships, custom_fields, email)
+    VALUES (
+        v_family_id, v_request.full_name, NULL,
+        jsonb_build_object('role', 'family_admin', 'email', v_request.email),
+        jsonb_build_object('user_id', v_request.user_id),
+        NULLIF(lower(trim(v_request.email)), '')
+    )
+    RETURNING id INTO v_member_id;
+
+    UPDATE admin_onboarding_requests
+    SET status = 'approved', reviewed_by = p_reviewed_by, reviewed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+    WHERE id = p_request_id;
+
+    RETURN jsonb_build_object(
+        'message', 'Admin request approved successfully',
+        'status', 'approved',
+        'user_id', v_request.user_id,
+        'family_id', v_family_id,
+        'email', v_request.email,
+        'family_name', v_request.family_name,
+        'admin_member_id', v_member_id
+    );
+END;
+$$;
+
+-- Only the backend (service role) may approve requests
+REVOKE ALL ON FUNCTION approve_admin_request(UUID, UUID) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION approve_admin_request(UUID, UUID) TO service_role;
+    END IF;
+END
+$$;
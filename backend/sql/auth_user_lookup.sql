@@ -0,0 +1,62 @@
+-- Indexed auth user lookup by email
+-- auth_user_emails mirrors auth.users (lower-cased email -> user id) and is
+-- kept in sync by a trigger, so registration can resolve an existing auth
+-- user with a primary-key lookup instead of scanning admin.list_users().
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS auth_user_emails (
+    email TEXT PRIMARY KEY,
+    user_id UUID NOT NULL UNIQUE
+);
+
+-- Only reachable through auth_user_id_by_email()
+ALTER TABLE auth_user_emails ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION sync_auth_user_email()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM auth_user_emails WHERE user_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.email IS NOT NULL THEN
+        INSERT INTO auth_user_emails (email, user_id)
+        VALUES (lower(trim(NEW.email)), NEW.id)
+        ON CONFLICT (email) DO UPDATE SET user_id = EXCLUDED.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS on_auth_user_email_change ON auth.users;
+CREATE TRIGGER on_auth_user_email_change
+    AFTER INSERT OR UPDATE OF email OR DELETE ON auth.users
+    FOR EACH ROW EXECUTE FUNCTION sync_auth_user_email();
+
+-- Backfill existing auth users
+INSERT INTO auth_user_emails (email, user_id)
+SELECT lower(trim(email)), id FROM auth.users WHERE email IS NOT NULL
+ON CONFLICT (email) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION auth_user_id_by_email(p_email TEXT)
+RETURNS UUID
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT user_id FROM auth_user_emails WHERE email = lower(trim(p_email))
+$$;
+
+-- Only the backend (service role) may resolve emails to user IDs
+REVOKE ALL ON FUNCTION auth_user_id_by_email(TEXT) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION auth_user_id_by_email(TEXT) TO service_role;
+    END IF;
+END
+$$;
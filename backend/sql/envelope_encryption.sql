@@ -0,0 +1,13 @@
+-- Envelope encryption for family passwords
+-- family_password_encrypted holds base64(nonce + ciphertext + tag) encrypted
+-- with a random per-family data key; family_data_key_wrapped holds that data
+-- key wrapped by a key derived from the admin password.
+-- Rows with a NULL family_data_key_wrapped use the legacy format and are
+-- migrated by FamilyService.rotate_family_keys.
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE families ADD COLUMN IF NOT EXISTS family_data_key_wrapped TEXT;
+ALTER TABLE admin_onboarding_requests ADD COLUMN IF NOT EXISTS family_data_key_wrapped TEXT;
+
+COMMENT ON COLUMN families.family_data_key_wrapped IS 'Per-family data key wrapped with a key derived from the admin password: base64(salt + nonce + wrapped_key)';
+COMMENT ON COLUMN admin_onboarding_requests.family_data_key_wrapped IS 'Per-family data key wrapped with a key derived from the admin password: base64(salt + nonce + wrapped_key)';
@@ -0,0 +1,34 @@
+-- Background jobs
+-- One row per job submitted to the backend's job runner (core/jobs.py), so
+-- any worker can report a job's status and progress and pass on a
+-- cancellation to the worker running it.
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    job_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'retrying', 'succeeded', 'failed', 'cancelled')),
+    family_id UUID REFERENCES families(id) ON DELETE CASCADE,
+    created_by TEXT,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 1,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_family_created ON jobs(family_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_unfinished ON jobs(job_type, status)
+    WHERE status IN ('queued', 'running', 'retrying');
+
+-- Only the backend (service role) reads and writes jobs
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE jobs IS 'Background jobs run by the backend, with progress and outcome';
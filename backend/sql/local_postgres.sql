@@ -0,0 +1,17 @@
+-- Local Postgres bootstrap for DATA_BACKEND=postgres
+-- Stands in for the parts of Supabase that schema.sql depends on, so the
+-- schema and migrations can be loaded into the docker-compose postgres.
+-- Runs first on a fresh volume (see docker-compose.yml); not needed on Supabase.
+
+CREATE SCHEMA IF NOT EXISTS auth;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email TEXT UNIQUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID
+LANGUAGE sql STABLE AS $$
+    SELECT NULLIF(current_setting('request.jwt.claim.sub', true), '')::UUID
+$$;
@@ -0,0 +1,9 @@
+-- Columns the backend uses that were added on Supabase outside schema.sql
+-- Runs after schema.sql when bootstrapping the docker-compose postgres.
+
+ALTER TABLE families ADD COLUMN IF NOT EXISTS family_password_hash TEXT;
+ALTER TABLE admin_onboarding_requests ADD COLUMN IF NOT EXISTS family_password_hash TEXT;
+
+-- Auth users live in Supabase, not in the local auth.users stand-in
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_id_fkey;
+ALTER TABLE admin_onboarding_requests DROP CONSTRAINT IF EXISTS admin_onboarding_requests_user_id_fkey;
@@ -0,0 +1,22 @@
+-- Indexed member identity for family member login
+-- family_members.email mirrors lower(trim(relationships->>'email')) and is
+-- maintained by FamilyMemberService on create, bulk create and update, so
+-- member login is a single (family_id, email) index lookup.
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE family_members ADD COLUMN IF NOT EXISTS email TEXT;
+
+-- Backfill existing rows
+UPDATE family_members
+SET email = NULLIF(lower(trim(relationships->>'email')), '')
+WHERE email IS DISTINCT FROM NULLIF(lower(trim(relationships->>'email')), '');
+
+-- Review duplicates before creating the unique index:
+-- SELECT family_id, email, count(*) FROM family_members
+-- WHERE email IS NOT NULL GROUP BY family_id, email HAVING count(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_family_members_family_email
+    ON family_members(family_id, email)
+    WHERE email IS NOT NULL;
+
+COMMENT ON COLUMN family_members.email IS 'Normalized login email (lower-cased relationships.email), unique per family';
@@ -0,0 +1,35 @@
+-- Family member export
+-- CSV exports flatten relationships and custom_fields into one column per
+-- key, so the header needs every key used in the family before the first
+-- row is streamed. family_member_field_keys() collects them in the database
+-- instead of the backend reading every member twice.
+-- Run this in Supabase SQL Editor
+
+CREATE OR REPLACE FUNCTION family_member_field_keys(p_family_id UUID)
+RETURNS TABLE (field TEXT)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT DISTINCT 'relationships.' || key
+    FROM family_members m,
+        jsonb_object_keys(CASE WHEN jsonb_typeof(m.relationships) = 'object' THEN m.relationships ELSE '{}' END) AS key
+    WHERE m.family_id = p_family_id
+    UNION
+    SELECT DISTINCT 'custom_fields.' || key
+    FROM family_members m,
+        jsonb_object_keys(CASE WHEN jsonb_typeof(m.custom_fields) = 'object' THEN m.custom_fields ELSE '{}' END) AS key
+    WHERE m.family_id = p_family_id
+    ORDER BY 1
+$$;
+
+-- Only the backend (service role) may call it
+REVOKE ALL ON FUNCTION family_member_field_keys(UUID) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION family_member_field_keys(UUID) TO service_role;
+    END IF;
+END
+$$;
@@ -0,0 +1,18 @@
+-- Keyset pagination for family member lists
+-- Members are listed a page at a time ordered by (name, id) or
+-- (created_at, id) within a family; these composite indexes serve both the
+-- family_id filter and the sort, so each page is an index range scan.
+-- Run this in Supabase SQL Editor
+
+-- created_at is a sort key, so it must never be NULL
+UPDATE family_members SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL;
+ALTER TABLE family_members ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_family_members_family_name_id
+    ON family_members(family_id, name, id);
+
+CREATE INDEX IF NOT EXISTS idx_family_members_family_created_id
+    ON family_members(family_id, created_at, id);
+
+-- Covered by the composite indexes above
+DROP INDEX IF EXISTS idx_family_members_family_id;
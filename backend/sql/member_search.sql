@@ -0,0 +1,111 @@
+-- Ranked family member search
+-- ILIKE '%query%' can't use the btree index on name, so the old search read
+-- every member of the family and returned them unranked. A trigram GIN index
+-- serves both substring and similarity matches, and search_family_members()
+-- ranks exact, prefix and substring matches above fuzzy ones (typos such as
+-- "Rajsh" for "Rajesh"), best first, up to a limit.
+-- Run this in Supabase SQL Editor
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- Lets family_id share the GIN index with the name trigrams
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+CREATE INDEX IF NOT EXISTS idx_family_members_family_name_trgm
+    ON family_members USING gin (family_id, name gin_trgm_ops);
+
+-- Name lookups are always within a family: the trigram index above and
+-- (family_id, name, id) from member_pagination.sql cover them
+DROP INDEX IF EXISTS idx_family_members_name;
+
+-- Returns every public family_members column, so ?fields= works as on the
+-- member list; dropped first because CREATE OR REPLACE can't change the columns
+DROP FUNCTION IF EXISTS search_family_members(UUID, TEXT, INTEGER, REAL);
+
+CREATE OR REPLACE FUNCTION search_family_members(
+    p_family_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_min_similarity REAL DEFAULT 0.3
+)
+RETURNS TABLE (
+    id UUID,
+    family_id UUID,
+    name TEXT,
+    photo_url TEXT,
+    relationships JSONB,
+    custom_fields JSONB,
+    email TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    match TEXT,
+    score REAL
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public, extensions
+AS $$
+DECLARE
+    v_query TEXT := lower(btrim(coalesce(p_query, '')));
+    v_escaped TEXT;
+    v_limit INTEGER := least(greatest(coalesce(p_limit, 20), 1), 100);
+    v_found INTEGER;
+BEGIN
+    IF v_query = '' THEN
+        RETURN;
+    END IF;
+    v_escaped := replace(replace(replace(v_query, '\', '\\'), '%', '\%'), '_', '\_');
+
+    -- Names containing the query rank above every fuzzy match, so score those
+    -- first and look for typos only if they don't fill the limit: a common
+    -- name has thousands of fuzzy neighbours that would all be scored
+    RETURN QUERY
+    SELECT r.id, r.family_id, r.name, r.photo_url, r.relationships, r.custom_fields, r.email,
+        r.created_at, r.updated_at, r.match, r.score
+    FROM (
+        SELECT m.*,
+            CASE
+                WHEN lower(m.name) = v_query THEN 'exact'
+                WHEN m.name ILIKE v_escaped || '%' THEN 'prefix'
+                ELSE 'substring'
+            END AS match,
+            greatest(similarity(m.name, v_query), word_similarity(v_query, m.name)) AS score
+        FROM family_members m
+        WHERE m.family_id = p_family_id
+            AND m.name ILIKE '%' || v_escaped || '%'
+    ) r
+    ORDER BY
+        CASE r.match WHEN 'exact' THEN 0 WHEN 'prefix' THEN 1 ELSE 2 END,
+        r.score DESC, r.name, r.id
+    LIMIT v_limit;
+
+    GET DIAGNOSTICS v_found = ROW_COUNT;
+    IF v_found >= v_limit THEN
+        RETURN;
+    END IF;
+
+    -- Threshold of the index-backed <% operator, for this transaction only
+    PERFORM set_config('pg_trgm.word_similarity_threshold', p_min_similarity::TEXT, true);
+
+    RETURN QUERY
+    SELECT m.id, m.family_id, m.name, m.photo_url, m.relationships, m.custom_fields, m.email,
+        m.created_at, m.updated_at, 'fuzzy'::TEXT,
+        greatest(similarity(m.name, v_query), word_similarity(v_query, m.name))
+    FROM family_members m
+    WHERE m.family_id = p_family_id
+        AND v_query <% m.name
+        AND m.name NOT ILIKE '%' || v_escaped || '%'
+    ORDER BY 11 DESC, m.name, m.id
+    LIMIT v_limit - v_found;
+END;
+$$;
+
+-- Only the backend (service role) may call it
+REVOKE ALL ON FUNCTION search_family_members(UUID, TEXT, INTEGER, REAL) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION search_family_members(UUID, TEXT, INTEGER, REAL) TO service_role;
+    END IF;
+END
+$$;
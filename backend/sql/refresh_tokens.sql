@@ -0,0 +1,37 @@
+-- Refresh tokens and access-token revocation
+-- Access tokens are short-lived; refresh tokens rotate on every use and are
+-- stored only as SHA-256 hashes. Revoked access-token IDs (jti) are synced
+-- into each worker's in-memory revocation filter.
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    token_hash TEXT NOT NULL UNIQUE,
+    chain_id UUID NOT NULL,
+    user_id TEXT NOT NULL,
+    email TEXT,
+    role TEXT NOT NULL,
+    family_id UUID,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE,
+    replaced_by TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti TEXT PRIMARY KEY,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_chain_id ON refresh_tokens(chain_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+COMMENT ON TABLE refresh_tokens IS 'Rotating refresh tokens (hashed); reuse of a rotated token revokes its whole chain';
+COMMENT ON TABLE revoked_tokens IS 'Revoked access-token IDs kept until the token would have expired';
+COMMENT ON COLUMN refresh_tokens.user_id IS 'Token subject: users.id, family_members.id for member logins, or superadmin';
+
+-- Housekeeping (run periodically)
+-- DELETE FROM refresh_tokens WHERE expires_at < now() - interval '7 days';
+-- DELETE FROM revoked_tokens WHERE expires_at < now();
@@ -0,0 +1,75 @@
+-- Atomic admin registration
+-- Checks family-name / email / user uniqueness and inserts the pending user
+-- and the onboarding request in one transaction. The unique indexes below
+-- back the checks up against concurrent registrations; the backend calls
+-- the function via rpc() and falls back to separate inserts without it.
+-- Run this in Supabase SQL Editor
+
+-- At most one pending request per email and per family name
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_requests_pending_email
+    ON admin_onboarding_requests(lower(email))
+    WHERE status = 'pending';
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admin_requests_pending_family_name
+    ON admin_onboarding_requests(family_name)
+    WHERE status = 'pending';
+
+CREATE OR REPLACE FUNCTION register_admin_request(
+    p_user_id UUID,
+    p_email TEXT,
+    p_full_name TEXT,
+    p_family_name TEXT,
+    p_password_hash TEXT,
+    p_family_password_encrypted TEXT,
+    p_family_data_key_wrapped TEXT,
+    p_family_password_hash TEXT
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_request_id UUID;
+BEGIN
+    IF EXISTS (SELECT 1 FROM families WHERE family_name = p_family_name) THEN
+        RAISE EXCEPTION 'Family name already exists';
+    END IF;
+    IF EXISTS (SELECT 1 FROM admin_onboarding_requests WHERE lower(email) = lower(p_email) AND status = 'pending') THEN
+        RAISE EXCEPTION 'Request already exists for this email';
+    END IF;
+    IF EXISTS (SELECT 1 FROM users WHERE id = p_user_id) THEN
+        RAISE EXCEPTION 'User already exists. Please check your approval status or contact support.';
+    END IF;
+
+    BEGIN
+        INSERT INTO users (id, email, full_name, role, approval_status, password_hash, family_id)
+        VALUES (p_user_id, p_email, p_full_name, 'family_admin', 'pending', p_password_hash, NULL);
+
+        INSERT INTO admin_onboarding_requests (
+            email, full_name, family_name, family_password_encrypted,
+            family_data_key_wrapped, family_password_hash, user_id, status
+        )
+        VALUES (
+            p_email, p_full_name, p_family_name, p_family_password_encrypted,
+            p_family_data_key_wrapped, p_family_password_hash, p_user_id, 'pending'
+        )
+        RETURNING id INTO v_request_id;
+    EXCEPTION WHEN unique_violation THEN
+        -- Lost a race with a concurrent registration for the same email or family name
+        RAISE EXCEPTION 'A registration for this email or family name is already pending';
+    END;
+
+    RETURN jsonb_build_object('request_id', v_request_id);
+END;
+$$;
+
+-- Only the backend (service role) may register requests
+REVOKE ALL ON FUNCTION register_admin_request(UUID, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT) FROM PUBLIC;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION register_admin_request(UUID, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT, TEXT) TO service_role;
+    END IF;
+END
+$$;
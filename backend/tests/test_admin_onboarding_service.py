@@ -0,0 +1,260 @@
+"""
+Admin approval: the approve_admin_request() RPC and the multi-call fallback
+must agree
+
+Error mapping and fallback run against a stubbed Supabase client. The
+equivalence test runs both paths on the same seeded rows in a real database
+with the sql/ scripts loaded, and is skipped unless TEST_DATABASE_URL is set.
+
+Run from backend/: python -m unittest discover tests
+"""
+
+import os
+import re
+import unittest
+import uuid
+
+from postgrest.exceptions import APIError
+
+import services.admin_onboarding_service as onboarding
+from services.admin_onboarding_service import AdminOnboardingService
+
+SQL_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "approve_admin_request.sql")
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    """Enough of a PostgREST query builder for approval: select/insert/update + eq"""
+
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.values = None
+        self.filters = {}
+
+    def select(self, *columns):
+        return self
+
+    def insert(self, values):
+        self.action, self.values = "insert", values
+        return self
+
+    def update(self, values):
+        self.action, self.values = "update", values
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        if self.action == "insert":
+            row = {"id": str(uuid.uuid4()), **self.values}
+            rows.append(row)
+            return _Response([row])
+        matched = [row for row in rows if all(row.get(k) == v for k, v in self.filters.items())]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.values)
+        return _Response([dict(row) for row in matched])
+
+
+class _Rpc:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def execute(self):
+        if self.error:
+            raise self.error
+        return _Response(self.result)
+
+
+class _Client:
+    def __init__(self, rpc_result=None, rpc_error=None):
+        self.rpc_result = rpc_result
+        self.rpc_error = rpc_error
+        self.rpc_calls = []
+        self.tables = {
+            "admin_onboarding_requests": [{
+                "id": "request-1",
+                "status": "pending",
+                "email": "admin@example.com",
+                "full_name": "Asha Rao",
+                "family_name": "Rao",
+                "user_id": "user-1",
+                "family_password_encrypted": "encrypted",
+                "family_password_hash": "family-hash",
+            }],
+            "users": [{"id": "user-1", "approval_status": "pending", "password_hash": "hash"}],
+        }
+
+    def table(self, name: str):
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict):
+        self.rpc_calls.append((name, params))
+        return _Rpc(self.rpc_result, self.rpc_error)
+
+
+def _rpc_result_keys() -> set:
+    """Keys of the jsonb object approve_admin_request() returns"""
+    with open(SQL_PATH) as f:
+        sql = f.read()
+    returned = sql[sql.rindex("RETURN jsonb_build_object("):]
+    returned = returned[:returned.index(");")]
+    return set(re.findall(r"^\s*'(\w+)',", returned, re.MULTILINE))
+
+
+class ApproveRequestTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        onboarding._approval_rpc_missing = False
+
+    def tearDown(self):
+        onboarding._approval_rpc_missing = False
+
+    async def test_rpc_result_is_returned_as_is(self):
+        rpc_result = {key: f"{key}-value" for key in _rpc_result_keys()}
+        client = _Client(rpc_result=rpc_result)
+        result = await AdminOnboardingService(client).approve_request("request-1", "superadmin")
+        self.assertEqual(result, rpc_result)
+        self.assertEqual(client.rpc_calls, [
+            ("approve_admin_request", {"p_request_id": "request-1", "p_reviewed_by": None})
+        ])
+
+    async def test_raised_exception_becomes_value_error(self):
+        client = _Client(rpc_error=APIError({"message": "Request is not pending", "code": "P0001"}))
+        with self.assertRaisesRegex(ValueError, "Request is not pending"):
+            await AdminOnboardingService(client).approve_request("request-1", "user-9")
+        self.assertFalse(onboarding._approval_rpc_missing)
+
+    async def test_other_rpc_errors_are_not_value_errors(self):
+        client = _Client(rpc_error=APIError({"message": "deadlock detected", "code": "40P01"}))
+        with self.assertRaises(Exception) as raised:
+            await AdminOnboardingService(client).approve_request("request-1", "user-9")
+        self.assertNotIsInstance(raised.exception, ValueError)
+        self.assertFalse(onboarding._approval_rpc_missing)
+
+    async def test_missing_function_falls_back_to_multi_call(self):
+        client = _Client(rpc_error=APIError({"message": "Could not find the function", "code": "PGRST202"}))
+        result = await AdminOnboardingService(client).approve_request("request-1", "user-9")
+
+        self.assertTrue(onboarding._approval_rpc_missing)
+        self.assertEqual(set(result), _rpc_result_keys())
+        self.assertEqual(client.tables["admin_onboarding_requests"][0]["status"], "approved")
+        self.assertEqual(client.tables["admin_onboarding_requests"][0]["reviewed_by"], "user-9")
+        self.assertEqual(client.tables["users"][0]["role"], "family_admin")
+
+        # Later approvals skip the RPC
+        client.rpc_calls.clear()
+        client.tables["admin_onboarding_requests"][0]["status"] = "pending"
+        client.tables["users"][0]["approval_status"] = "pending"
+        await AdminOnboardingService(client).approve_request("request-1", "user-9")
+        self.assertEqual(client.rpc_calls, [])
+
+
+
+# Fixed seed, so both paths start from identical rows
+REVIEWER_ID = "00000000-0000-0000-0000-00000000a001"
+ADMIN_ID = "00000000-0000-0000-0000-00000000a002"
+ADMIN_EMAIL = "approval-test-admin@example.com"
+FAMILY_NAME = "Approval Test Family"
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL not set")
+class ApprovalPathsAgreeTest(unittest.IsolatedAsyncioTestCase):
+    """Both approval paths, one after the other, from the same seeded rows"""
+
+    async def asyncSetUp(self):
+        import asyncpg
+        from core.postgres import PostgresClient, _init_connection
+
+        self.pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, init=_init_connection)
+        self.client = PostgresClient(self.pool)
+        onboarding._approval_rpc_missing = False
+        await self._clean()
+
+    async def asyncTearDown(self):
+        await self._clean()
+        await self.pool.close()
+        onboarding._approval_rpc_missing = False
+
+    async def _clean(self):
+        async with self.pool.acquire() as connection:
+            await connection.execute("DELETE FROM admin_onboarding_requests WHERE user_id = $1", ADMIN_ID)
+            await connection.execute("DELETE FROM families WHERE family_name = $1", FAMILY_NAME)
+            await connection.execute("DELETE FROM users WHERE id = ANY($1::uuid[])", [ADMIN_ID, REVIEWER_ID])
+
+    async def _seed(self) -> str:
+        request_id = str(uuid.uuid4())
+        async with self.pool.acquire() as connection:
+            await connection.execute(
+                "INSERT INTO users (id, email, role, approval_status) VALUES ($1, 'approval-test-reviewer@example.com', 'super_admin', 'approved')",
+                REVIEWER_ID
+            )
+            await connection.execute(
+                "INSERT INTO users (id, email, role, approval_status, full_name, password_hash) VALUES ($1, $2, 'family_user', 'pending', 'Asha Rao', 'password-hash')",
+                ADMIN_ID, ADMIN_EMAIL
+            )
+            await connection.execute(
+                """
+                INSERT INTO admin_onboarding_requests (id, email, full_name, family_name, family_password_encrypted,
+                    family_password_hash, family_data_key_wrapped, user_id)
+                VALUES ($1, $2, 'Asha Rao', $3, 'encrypted-password', 'family-hash', 'wrapped-key', $4)
+                """,
+                request_id, ADMIN_EMAIL, FAMILY_NAME, ADMIN_ID
+            )
+        return request_id
+
+    async def _approve(self, use_rpc: bool) -> dict:
+        """Approve a freshly seeded request; the result and every row it wrote, minus generated values"""
+        request_id = await self._seed()
+        service = AdminOnboardingService(self.client)
+        if use_rpc:
+            result = await service.approve_request(request_id, REVIEWER_ID)
+        else:
+            result = await service._approve_request_multi_call(request_id, REVIEWER_ID)
+
+        generated = ("id", "created_at", "updated_at", "requested_at", "reviewed_at")
+        async with self.pool.acquire() as connection:
+            family = await connection.fetchrow("SELECT * FROM families WHERE family_name = $1", FAMILY_NAME)
+            user = await connection.fetchrow("SELECT * FROM users WHERE id = $1", ADMIN_ID)
+            members = await connection.fetch("SELECT * FROM family_members WHERE family_id = $1", family["id"])
+            request = await connection.fetchrow("SELECT * FROM admin_onboarding_requests WHERE id = $1", request_id)
+
+        self.assertEqual(result["family_id"], family["id"])
+        self.assertEqual(user["family_id"], family["id"])
+        self.assertEqual([member["id"] for member in members], [result["admin_member_id"]])
+        self.assertIsNotNone(request["reviewed_at"])
+
+        without = lambda row, *keys: {key: value for key, value in row.items() if key not in generated + keys}
+        state = {
+            "result": without(result, "family_id", "admin_member_id"),
+            "family": without(family),
+            "user": without(user, "family_id"),
+            "members": [without(member, "family_id") for member in members],
+            "request": without(request),
+        }
+        await self._clean()
+        return state
+
+    async def test_rpc_and_multi_call_write_the_same_rows(self):
+        via_rpc = await self._approve(use_rpc=True)
+        self.assertFalse(onboarding._approval_rpc_missing, "approve_admin_request() is not installed")
+        via_multi_call = await self._approve(use_rpc=False)
+
+        self.assertEqual(via_rpc["result"]["status"], "approved")
+        self.assertEqual(via_rpc["user"]["role"], "family_admin")
+        for part in ("result", "family", "user", "members", "request"):
+            self.assertEqual(via_rpc[part], via_multi_call[part], part)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ import { ProtectedRoute } from '@/lib/protected-route';
 import { useParams } from 'next/navigation';
 import Link from 'next/link';
 import { getAllFamilies } from '@/lib/family-service';
+import { authFetch } from '@/lib/api';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -38,11 +39,10 @@ export default function CoAdminsPage() {
       setSuccess('');
 
       // Call backend to invite co-admin
-      const response = await fetch(`${API_BASE_URL}/api/users/invite-co-admin`, {
+      const response = await authFetch(`${API_BASE_URL}/api/users/invite-co-admin`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
         },
         body: JSON.stringify({
           email,
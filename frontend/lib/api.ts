@@ -1,4 +1,4 @@
-import axios, { AxiosInstance } from 'axios';
+import axios, { AxiosInstance, InternalAxiosRequestConfig } from 'axios';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -19,18 +19,84 @@ apiClient.interceptors.request.use((config) => {
   return config;
 });
 
+// One refresh at a time: concurrent 401s wait for the same rotation,
+// since a refresh token can only be used once
+let refreshing: Promise<string | null> | null = null;
+
+async function refreshAccessToken(): Promise<string | null> {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    return null;
+  }
+  try {
+    const response = await axios.post(`${API_BASE_URL}/api/auth/refresh`, {
+      refresh_token: refreshToken,
+    });
+    localStorage.setItem('access_token', response.data.access_token);
+    localStorage.setItem('refresh_token', response.data.refresh_token);
+    return response.data.access_token;
+  } catch {
+    return null;
+  }
+}
+
+// Rotate the refresh token, sharing one rotation between concurrent callers
+function refreshOnce(): Promise<string | null> {
+  refreshing = refreshing || refreshAccessToken().finally(() => {
+    refreshing = null;
+  });
+  return refreshing;
+}
+
+// Refresh token missing, expired or revoked: back to the login page
+function endSession(): void {
+  localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user');
+  window.location.href = '/login';
+}
+
+function withToken(init: RequestInit, token: string | null): RequestInit {
+  const headers = new Headers(init.headers);
+  if (token) {
+    headers.set('Authorization', `Bearer ${token}`);
+  }
+  return { ...init, headers };
+}
+
+// fetch() with the stored access token; on 401 refreshes it and retries once
+export async function authFetch(url: string, init: RequestInit = {}): Promise<Response> {
+  if (typeof window === 'undefined') {
+    return fetch(url, init);
+  }
+  const response = await fetch(url, withToken(init, localStorage.getItem('access_token')));
+  if (response.status !== 401) {
+    return response;
+  }
+  const token = await refreshOnce();
+  if (!token) {
+    endSession();
+    return response;
+  }
+  return fetch(url, withToken(init, token));
+}
+
 // Handle errors
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      // Token expired or invalid
-      if (typeof window !== 'undefined') {
-        localStorage.removeItem('access_token');
-        localStorage.removeItem('refresh_token');
-        localStorage.removeItem('user');
-        window.location.href = '/login';
+  async (error) => {
+    const request = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
+    if (error.response?.status === 401 && typeof window !== 'undefined') {
+      // Access token expired: rotate the refresh token and retry once
+      if (request && !request._retried) {
+        request._retried = true;
+        const token = await refreshOnce();
+        if (token) {
+          request.headers.Authorization = `Bearer ${token}`;
+          return apiClient(request);
+        }
       }
+      endSession();
     }
     return Promise.reject(error);
   }
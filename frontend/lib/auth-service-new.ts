@@ -9,6 +9,7 @@ import {
   AdminApprovalRequest,
   FamilyMemberLoginRequest
 } from './types';
+import { authFetch } from './api';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -145,7 +146,7 @@ export async function familyMemberLogin(
 
 export async function getPendingRequests(): Promise<PendingRequestsResponse> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/admin/requests/pending`, {
+    const response = await authFetch(`${API_BASE_URL}/api/auth/admin/requests/pending`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
@@ -169,7 +170,7 @@ export async function getAllRequests(): Promise<{
   requests: PendingAdminRequest[];
 }> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/admin/requests/all`, {
+    const response = await authFetch(`${API_BASE_URL}/api/auth/admin/requests/all`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
@@ -189,7 +190,7 @@ export async function approveAdminRequest(
   requestId: string
 ): Promise<{ message: string; status: string }> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/admin/request/approve`, {
+    const response = await authFetch(`${API_BASE_URL}/api/auth/admin/request/approve`, {
       method: 'POST',
       headers: getAuthHeaders(),
       body: JSON.stringify({
@@ -214,7 +215,7 @@ export async function rejectAdminRequest(
   rejectionReason: string
 ): Promise<{ message: string; status: string }> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/admin/request/reject`, {
+    const response = await authFetch(`${API_BASE_URL}/api/auth/admin/request/reject`, {
       method: 'POST',
       headers: getAuthHeaders(),
       body: JSON.stringify({
@@ -259,7 +260,7 @@ export async function verifyToken(token: string): Promise<UserProfile> {
 
 export async function logout(): Promise<{ message: string; status: string }> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/auth/logout`, {
+    const response = await authFetch(`${API_BASE_URL}/api/auth/logout`, {
       method: 'POST',
       headers: getAuthHeaders(),
     });
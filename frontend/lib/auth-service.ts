@@ -1,5 +1,6 @@
 // API service for authentication - communicates only with FastAPI backend
 import { AuthResponse, UserProfile } from './types';
+import { authFetch } from './api';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -72,7 +73,7 @@ export async function verifyMagicLink(email: string, token: string): Promise<Aut
 // Get current user profile
 export async function getCurrentUser(): Promise<UserProfile> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/users/me`, {
+    const response = await authFetch(`${API_BASE_URL}/api/users/me`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
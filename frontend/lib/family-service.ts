@@ -1,5 +1,6 @@
 // API service for families management
 import { Family, FamilyMember } from './types';
+import { authFetch } from './api';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -17,7 +18,7 @@ function getAuthHeaders(): HeadersInit {
 // Get all families (SuperAdmin only)
 export async function getAllFamilies(): Promise<Family[]> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
@@ -35,7 +36,7 @@ export async function getAllFamilies(): Promise<Family[]> {
 // Get family by ID
 export async function getFamily(familyId: string): Promise<Family> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
@@ -53,7 +54,7 @@ export async function getFamily(familyId: string): Promise<Family> {
 // Create new family (SuperAdmin only)
 export async function createFamily(familyName: string): Promise<Family> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families`, {
       method: 'POST',
       headers: getAuthHeaders(),
       body: JSON.stringify({ family_name: familyName }),
@@ -73,7 +74,7 @@ export async function createFamily(familyName: string): Promise<Family> {
 // Update family (Family Admin only)
 export async function updateFamily(familyId: string, updates: Partial<Family>): Promise<Family> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}`, {
       method: 'PUT',
       headers: getAuthHeaders(),
       body: JSON.stringify(updates),
@@ -93,7 +94,7 @@ export async function updateFamily(familyId: string, updates: Partial<Family>):
 // Delete family (SuperAdmin only)
 export async function deleteFamily(familyId: string): Promise<void> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}`, {
       method: 'DELETE',
       headers: getAuthHeaders(),
     });
@@ -107,19 +108,31 @@ export async function deleteFamily(familyId: string): Promise<void> {
   }
 }
 
-// Get all family members for a family
+// Get all family members for a family (the API returns them a page at a time)
 export async function getFamilyMembers(familyId: string): Promise<FamilyMember[]> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}/members`, {
-      method: 'GET',
-      headers: getAuthHeaders(),
-    });
-
-    if (!response.ok) {
-      throw new Error('Failed to fetch family members');
-    }
-
-    return await response.json();
+    const members: FamilyMember[] = [];
+    let cursor: string | null = null;
+
+    do {
+      const params = new URLSearchParams({ limit: '500' });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}/members?${params}`, {
+        method: 'GET',
+        headers: getAuthHeaders(),
+      });
+
+      if (!response.ok) {
+        throw new Error('Failed to fetch family members');
+      }
+
+      members.push(...(await response.json()));
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+
+    return members;
   } catch (error) {
     throw error;
   }
@@ -128,7 +141,7 @@ export async function getFamilyMembers(familyId: string): Promise<FamilyMember[]
 // Get family member by ID
 export async function getFamilyMember(familyId: string, memberId: string): Promise<FamilyMember> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
       method: 'GET',
       headers: getAuthHeaders(),
     });
@@ -152,7 +165,7 @@ export async function createFamilyMember(
   customFields?: Record<string, any>
 ): Promise<FamilyMember> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}/members`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}/members`, {
       method: 'POST',
       headers: getAuthHeaders(),
       body: JSON.stringify({
@@ -181,7 +194,7 @@ export async function updateFamilyMember(
   updates: Partial<FamilyMember>
 ): Promise<FamilyMember> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
       method: 'PUT',
       headers: getAuthHeaders(),
       body: JSON.stringify(updates),
@@ -204,7 +217,7 @@ export async function bulkCreateFamilyMembers(
   members: Array<Omit<FamilyMember, 'id' | 'family_id' | 'created_at' | 'updated_at'>>
 ): Promise<{ success: boolean; created_count: number; failed_count: number; member_ids: string[] }> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/family-members/bulk/create?family_id=${familyId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/family-members/bulk/create?family_id=${familyId}`, {
       method: 'POST',
       headers: getAuthHeaders(),
       body: JSON.stringify({ members }),
@@ -224,7 +237,7 @@ export async function bulkCreateFamilyMembers(
 // Delete family member
 export async function deleteFamilyMember(familyId: string, memberId: string): Promise<void> {
   try {
-    const response = await fetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
+    const response = await authFetch(`${API_BASE_URL}/api/families/${familyId}/members/${memberId}`, {
       method: 'DELETE',
       headers: getAuthHeaders(),
     });